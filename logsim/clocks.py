@@ -0,0 +1,111 @@
+"""Schedule clock edges ahead of time.
+
+Used in the Logic Simulator project so that simulation cycles in which no
+clock changes do not need to visit every clock.
+
+Classes
+-------
+ClockScheduler - keeps a priority queue of upcoming clock edges.
+"""
+import heapq
+
+
+class ClockScheduler:
+    """Keep a priority queue of upcoming clock edges.
+
+    Instead of counting every clock up by one on every cycle, the scheduler
+    works out the cycle on which each clock next changes, and keeps the clocks
+    in a heap ordered by that cycle. Each cycle then only pops the clocks that
+    change on it, giving exactly the edges Network.update_clocks() would.
+
+    The clock counters of the devices are not updated while the scheduler is
+    running. sync() writes them back, and the scheduler reloads them before
+    its next cycle. It also reloads them if devices are added or their states
+    are reset (see Devices.topology_version and Devices.state_version).
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    load(self): Builds the queue of clock edges from the clock counters.
+
+    update_clocks(self): Sets the clocks that change on this cycle to RISING
+                         or FALLING.
+
+    sync(self): Writes the current clock counters back into the devices.
+    """
+
+    def __init__(self, network):
+        """Initialise the scheduler with an empty queue."""
+        self.network = network
+        self.devices = network.devices
+
+        self.cycle = 0  # cycles run since the queue was loaded
+        self.queue = []  # heap of (cycle of next edge, device_id)
+        # Clocks whose counters are already past their half period never
+        # change, stored as (device_id, counter when loaded)
+        self.stopped_clocks = []
+        self.toggled = []  # IDs of the clocks changed on the last cycle
+        self.loaded_version = None  # (topology_version, state_version)
+
+    def load(self):
+        """Build the queue of clock edges from the clock counters."""
+        devices = self.devices
+        self.cycle = 0
+        self.queue = []
+        self.stopped_clocks = []
+        for device_id in devices.find_devices(devices.CLOCK):
+            device = devices.get_device(device_id)
+            counter = device.clock_counter
+            if counter <= device.clock_half_period:
+                # The clock changes when its counter reaches the half period
+                self.queue.append((device.clock_half_period - counter + 1,
+                                   device_id))
+            else:
+                self.stopped_clocks.append((device_id, counter))
+        heapq.heapify(self.queue)
+        self.loaded_version = (devices.topology_version,
+                               devices.state_version)
+
+    def update_clocks(self):
+        """Set the clocks that change on this cycle to RISING or FALLING."""
+        devices = self.devices
+        if self.loaded_version != (devices.topology_version,
+                                   devices.state_version):
+            self.sync()
+            self.load()
+
+        self.cycle += 1
+        self.toggled = []
+        queue = self.queue
+        while queue and queue[0][0] == self.cycle:
+            device_id = queue[0][1]
+            device = devices.get_device(device_id)
+            if device.outputs[None] == devices.HIGH:
+                device.outputs[None] = devices.FALLING
+            elif device.outputs[None] == devices.LOW:
+                device.outputs[None] = devices.RISING
+            heapq.heapreplace(queue, (self.cycle + device.clock_half_period,
+                                      device_id))
+            self.toggled.append(device_id)
+
+    def sync(self):
+        """Write the current clock counters back into the devices.
+
+        The queue is loaded again from the devices before the next cycle.
+        Nothing is written if the device states have been reset since the
+        queue was loaded, as the devices then hold the right counters.
+        """
+        devices = self.devices
+        if self.loaded_version is not None and \
+                self.loaded_version[1] == devices.state_version:
+            for next_edge, device_id in self.queue:
+                device = devices.get_device(device_id)
+                device.clock_counter = (device.clock_half_period + 1 -
+                                        (next_edge - self.cycle))
+            for device_id, counter in self.stopped_clocks:
+                devices.get_device(device_id).clock_counter = \
+                    counter + self.cycle
+        self.loaded_version = None
@@ -0,0 +1,232 @@
+"""Compile the network into a Python function.
+
+Used in the Logic Simulator project to remove the cost of interpreting the
+network (dispatching on device kinds, looking up devices and connections) from
+every simulation cycle.
+
+Classes
+-------
+CompiledEngine - executes the network with generated Python code.
+"""
+from levels import LevelizedEngine
+
+
+class CompiledEngine(LevelizedEngine):
+    """Execute the network with generated Python code.
+
+    The levelized schedule of levels.LevelizedEngine is turned into the
+    source of a single Python function, with one local variable per signal,
+    which is compiled once and then called for every simulation cycle. It
+    gives the same results as LevelizedEngine. Gates use the (x, y) rule from
+    Network.get_gate_rule(), written as bitwise operations on 0 (LOW) and
+    1 (HIGH). A cycle in which a loop or a D-type needs executing is settled
+    by the event engine, as in LevelizedEngine, so the function only executes
+    loops and D-types whose inputs have not changed.
+
+    The signals are kept in a list between cycles, and only the outputs that
+    change are copied into the Device objects (and listed in changed). The
+    function is rebuilt when devices or connections are added or removed, and
+    the signals are reloaded from the devices after a cold startup.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    build(self): Builds the levelized schedule and compiles the function.
+
+    generate_source(self): Returns the source of the cycle function.
+
+    load_state(self): Copies the signals and D-type memories of the devices
+                      into the saved state.
+
+    execute_network(self): Executes every device in the network once, in
+                           levelized order, for one simulation cycle.
+    """
+
+    def __init__(self, network):
+        """Initialise the engine with no compiled function."""
+        super().__init__(network)
+        self.slots = {}  # stores {(rank, output_id): slot}
+        self.memory_ranks = []  # ranks of D-types, in memory state order
+        self.source = ""
+        self.function = None
+        self.unconnected = False
+        self.state = []
+        self.state_version = None
+        # (device, output_id) of the outputs changed in the last cycle
+        self.changed = []
+
+    def build(self):
+        """Build the levelized schedule and compile the cycle function."""
+        super().build()
+        self.slots = {}
+        self.memory_ranks = []
+        for rank, device in enumerate(self.device_list):
+            for output_id in device.outputs:
+                self.slots[(rank, output_id)] = len(self.slots)
+            if device.device_kind == self.devices.D_TYPE:
+                self.memory_ranks.append(rank)
+        self.unconnected = any(source is None
+                               for device_sources in self.sources
+                               for input_id, source, port_id in device_sources)
+
+        self.source = self.generate_source()
+        namespace = {"SETTLE": (self.devices.LOW, self.devices.HIGH,
+                                self.devices.HIGH, self.devices.LOW,
+                                self.devices.BLANK),
+                     "CHANGED": self.changed}
+        for rank, device in enumerate(self.device_list):
+            namespace["".join(["d", str(rank)])] = device
+            namespace["".join(["o", str(rank)])] = device.outputs
+        code = compile(self.source, "<compiled network>", "exec")
+        exec(code, namespace)
+        self.function = namespace["execute_cycle"]
+        self.load_state()
+
+    def get_variable(self, rank, port_id):
+        """Return the name of the variable holding an output signal."""
+        return "".join(["v", str(self.slots[(rank, port_id)])])
+
+    def get_start(self, rank, port_id):
+        """Return the name of the variable holding a start-of-cycle signal."""
+        return "".join(["s", str(self.slots[(rank, port_id)])])
+
+    def get_memory(self, rank):
+        """Return the name of the variable holding a D-type memory."""
+        return "".join(["m", str(rank)])
+
+    def generate_device(self, rank, indent, ranks):
+        """Return the source lines that execute the device at rank."""
+        devices = self.devices
+        device = self.device_list[rank]
+        device_kind = device.device_kind
+        inputs = {}
+        for input_id, source, port_id in self.sources[rank]:
+            inputs[input_id] = (ranks[source.device_id], port_id)
+
+        if device_kind == devices.SWITCH:
+            return ["".join([indent, self.get_variable(rank, None), " = d",
+                             str(rank), ".switch_state"])]
+
+        elif device_kind == devices.CLOCK:
+            return []  # set by update_clocks before the cycle function runs
+
+        elif device_kind == devices.D_TYPE:
+            memory = self.get_memory(rank)
+            return [
+                "".join([indent, "if ",
+                         self.get_variable(*inputs[devices.CLK_ID]),
+                         " and not ", self.get_start(*inputs[devices.CLK_ID]),
+                         ":"]),
+                "".join([indent, "    ", memory, " = ",
+                         self.get_start(*inputs[devices.DATA_ID])]),
+                "".join([indent, "if ",
+                         self.get_variable(*inputs[devices.SET_ID]), ":"]),
+                "".join([indent, "    ", memory, " = 1"]),
+                "".join([indent, "if ",
+                         self.get_variable(*inputs[devices.CLEAR_ID]), ":"]),
+                "".join([indent, "    ", memory, " = 0"]),
+                "".join([indent, self.get_variable(rank, devices.Q_ID), " = ",
+                         memory]),
+                "".join([indent, self.get_variable(rank, devices.QBAR_ID),
+                         " = 1 - ", memory])]
+
+        signals = [self.get_variable(*inputs[input_id]) for input_id in inputs]
+        (x, y) = self.network.get_gate_rule(device_kind)
+        if device_kind == devices.XOR:
+            expression = " ^ ".join(signals)
+        elif x == devices.HIGH:  # every input is HIGH
+            expression = " & ".join(signals)
+        else:  # every input is LOW
+            expression = "".join(["1 - (", " | ".join(signals), ")"])
+        if y == devices.LOW:
+            expression = "".join(["1 - (", expression, ")"])
+        return ["".join([indent, self.get_variable(rank, None), " = ",
+                         expression])]
+
+    def generate_source(self):
+        """Return the source of the function that executes one cycle.
+
+        The function takes the list of saved signals and D-type memories,
+        and returns the new list.
+        """
+        ranks = {device_id: rank for rank, device_id in enumerate(self.order)}
+        starts = ["".join(["s", str(slot)]) for slot in range(len(self.slots))]
+        memories = [self.get_memory(rank) for rank in self.memory_ranks]
+        variables = ["".join(["v", str(slot)])
+                     for slot in range(len(self.slots))]
+
+        lines = ["def execute_cycle(state):"]
+        if starts or memories:
+            lines.append("".join(["    (", ", ".join(starts + memories),
+                                  ",) = state"]))
+            if starts:
+                lines.append("".join(["    (", ", ".join(variables), ",) = (",
+                                      ", ".join(starts), ",)"]))
+        for rank in self.clock_ranks:
+            lines.append("".join(["    ", self.get_variable(rank, None),
+                                  " = SETTLE[o", str(rank), "[None]]"]))
+
+        if not self.unconnected:
+            for level, block, is_loop in self.schedule:
+                for rank in block:
+                    lines.extend(self.generate_device(rank, "    ", ranks))
+
+        # Copy the changed outputs and memories into the devices
+        for (rank, output_id), slot in sorted(self.slots.items(),
+                                              key=lambda item: item[1]):
+            lines.append("".join(["    if v", str(slot), " != s", str(slot),
+                                  ":"]))
+            lines.append("".join(["        o", str(rank), "[",
+                                  repr(output_id), "] = v", str(slot)]))
+            lines.append("".join(["        CHANGED.append((d", str(rank),
+                                  ", ", repr(output_id), "))"]))
+        for rank in self.memory_ranks:
+            lines.append("".join(["    d", str(rank), ".dtype_memory = m",
+                                  str(rank)]))
+        lines.append("".join(["    return [", ", ".join(variables + memories),
+                              "]"]))
+        return "\n".join(lines) + "\n"
+
+    def load_state(self):
+        """Copy the device signals and D-type memories into the saved state."""
+        state = [None] * len(self.slots)
+        for (rank, output_id), slot in self.slots.items():
+            state[slot] = self.settle(
+                self.device_list[rank].outputs[output_id])
+        for rank in self.memory_ranks:
+            state.append(self.device_list[rank].dtype_memory)
+        self.state = state
+        self.state_version = self.devices.state_version
+
+    def execute_network(self):
+        """Execute every device once, in levelized order, for one cycle.
+
+        Return True if successful and the network settles.
+        """
+        network = self.network
+        if self.is_stale():
+            self.build()
+        elif self.state_version != self.devices.state_version:
+            self.load_state()
+        if self.unconnected:
+            network.steady_state = False
+            return False
+
+        # This sets clock signals to RISING or FALLING, where necessary
+        network.update_clocks()
+        if self.is_sequential_dirty():
+            if not self.execute_events():
+                self.state_version = None  # reload the state next cycle
+                return False
+            self.load_state()
+            return True
+        del self.changed[:]
+        self.state = self.function(self.state)
+        self.settled_version = self.devices.state_version
+        self.switch_version = self.devices.switch_version
+        network.changed_outputs = self.changed
+        network.steady_state = True
+        return True
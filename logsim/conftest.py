@@ -0,0 +1,42 @@
+"""Fixtures shared by the tests of the simulation engines."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+
+
+@pytest.fixture
+def parse_network():
+    """Return a function that parses a definition file for an engine.
+
+    The function takes the path of the file and the engine, as a function of
+    the network, and returns (devices, network).
+    """
+    def parse(path, engine):
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network)
+        scanner = Scanner(path, names)
+        parser = Parser(names, devices, network, monitors, scanner)
+        assert parser.parse_network()
+        assert network.set_engine(engine(network))
+        return devices, network
+    return parse
+
+
+@pytest.fixture
+def get_all_signals():
+    """Return a function that lists every output signal in a network.
+
+    The function takes the devices and the network.
+    """
+    def get_signals(devices, network):
+        return [network.get_output_signal(device.device_id, output_id)
+                for device in devices.devices_list
+                for output_id in device.outputs]
+    return get_signals
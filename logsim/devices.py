@@ -9,6 +9,9 @@ Device - stores device properties.
 Devices - makes and stores all the devices in the logic network.
 """
 import random
+from array import array
+
+from store import DeviceStore, pack, unpack
 
 
 class Device:
@@ -45,11 +48,20 @@ class Devices:
     """Make and store devices.
 
     This class contains many functions for making devices and ports.
-    It stores all the devices in a list.
+    It stores all the devices in a list, and indexes them by device ID and by
+    device kind so that lookups do not need to walk the list.
+
+    If compact is True, the devices are instead held in a store.DeviceStore,
+    which keeps every device property in typed arrays. get_device then returns
+    lightweight store.DeviceView objects, which behave like Device objects.
+    This keeps the memory needed for very large networks small.
 
     Parameters
     ----------
     names: instance of the names.Names() class.
+    compact: if True, store the devices in typed arrays.
+    seed: seed for the random cold start-up state, or None for a new random
+          state on every cold start-up.
 
     Public methods
     --------------
@@ -77,6 +89,15 @@ class Devices:
     set_switch(self, device_id, signal): Sets switch_state of specified device
                                          to signal.
 
+    get_state(self): Returns the simulation state of every device.
+
+    set_state(self, state): Restores a state returned by get_state.
+
+    snapshot(self): Returns a compact copy of the simulation state of every
+                    device.
+
+    restore(self, snapshot): Restores a snapshot returned by snapshot.
+
     make_switch(self, device_id, initial_state): Makes a switch device and sets
                                                  its initial state.
 
@@ -88,17 +109,53 @@ class Devices:
 
     make_d_type(self, device_id): Makes a D-type device.
 
+    get_random(self, device_id): Returns the random number generator of the
+                                 specified device.
+
+    start_device(self, device_id): Sets a D-type or clock to its random
+                                   cold start-up state.
+
     cold_startup(self): Simulates cold start-up of D-types and clocks.
 
     make_device(self, device_id, device_kind, device_property=None): Creates
                        the specified device and returns errors if unsuccessful.
     """
 
-    def __init__(self, names):
+    def __init__(self, names, compact=False, seed=None):
         """Initialise devices list and constants."""
         self.names = names
 
-        self.devices_list = []
+        # The cold start-up state of every device is drawn from its own
+        # random stream, derived from startup_seed and its device ID, so it
+        # does not depend on the order the devices are made or started in.
+        self.seed = seed
+        if seed is None:
+            self.startup_seed = random.getrandbits(64)
+        else:
+            self.startup_seed = seed
+
+        if compact:
+            self.store = DeviceStore()
+            # The store behaves as a sequence of DeviceView objects
+            self.devices_list = self.store
+        else:
+            self.store = None
+            self.devices_list = []
+
+        # devices_dictionary stores {device_id: Device}
+        self.devices_dictionary = {}
+        # kind_dictionary stores {device_kind: [device_id, ...]} in the order
+        # the devices were added (typed arrays of IDs if compact)
+        self.kind_dictionary = {}
+
+        # Simulation engines cache information about the network. These
+        # counters tell them when that information is out of date:
+        # topology_version changes when devices or ports are added, and
+        # state_version changes when device states are reset wholesale.
+        self.topology_version = 0
+        self.state_version = 0
+        # switch_version changes whenever set_switch changes a switch state
+        self.switch_version = 0
 
         gate_strings = ["AND", "OR", "NAND", "NOR", "XOR", "NOT"]
         device_strings = ["CLOCK", "SWITCH", "DTYPE"]
@@ -124,10 +181,9 @@ class Devices:
 
     def get_device(self, device_id):
         """Return the Device object corresponding to device_id."""
-        for device in self.devices_list:
-            if device.device_id == device_id:
-                return device
-        return None
+        if self.store is not None:
+            return self.store.get_device(device_id)
+        return self.devices_dictionary.get(device_id)
 
     def find_devices(self, device_kind=None):
         """Return a list of device IDs of the specified device_kind.
@@ -135,19 +191,25 @@ class Devices:
         Return a list of all device IDs in the network if no device_kind is
         specified.
         """
-        device_id_list = []
-        for device in self.devices_list:
-            if device_kind is None:
-                device_id_list.append(device.device_id)
-            elif device.device_kind == device_kind:
-                device_id_list.append(device.device_id)
-        return device_id_list
+        if device_kind is None:
+            if self.store is not None:
+                return self.store.device_ids.tolist()
+            return list(self.devices_dictionary)
+        return list(self.kind_dictionary.get(device_kind, []))
 
     def add_device(self, device_id, device_kind):
         """Add the specified device to the network."""
-        new_device = Device(device_id)
-        new_device.device_kind = device_kind
-        self.devices_list.append(new_device)
+        if self.store is not None:
+            self.store.add_device(device_id, device_kind)
+            if device_kind not in self.kind_dictionary:
+                self.kind_dictionary[device_kind] = array("i")
+        else:
+            new_device = Device(device_id)
+            new_device.device_kind = device_kind
+            self.devices_list.append(new_device)
+            self.devices_dictionary[device_id] = new_device
+        self.kind_dictionary.setdefault(device_kind, []).append(device_id)
+        self.topology_version += 1
 
     def add_input(self, device_id, input_id):
         """Add the specified input to the specified device.
@@ -156,7 +218,9 @@ class Devices:
         """
         device = self.get_device(device_id)
         if device is not None:
-            device.inputs.setdefault(input_id)
+            if input_id not in device.inputs:
+                device.inputs[input_id] = None
+                self.topology_version += 1
             return True
         else:
             return False
@@ -168,6 +232,8 @@ class Devices:
         """
         device = self.get_device(device_id)
         if device is not None:
+            if output_id not in device.outputs:
+                self.topology_version += 1
             device.outputs[output_id] = signal
             return True
         else:
@@ -217,9 +283,100 @@ class Devices:
         elif device.device_kind != self.SWITCH:
             return False
         else:
+            if device.switch_state != signal:
+                self.switch_version += 1
             device.switch_state = signal
             return True
 
+    def get_state(self):
+        """Return the simulation state of every device as a hashable tuple.
+
+        The state holds the output signals, clock counters, D-type memories
+        and switch states, which together decide how the network behaves from
+        now on.
+        """
+        return tuple([(tuple(device.outputs.values()), device.clock_counter,
+                       device.dtype_memory, device.switch_state)
+                      for device in self.devices_list])
+
+    def set_state(self, state):
+        """Restore a state returned by get_state.
+
+        Return True if successful, or False if the state does not fit the
+        devices.
+        """
+        if len(state) != len(self.devices_list):
+            return False
+        for device, device_state in zip(self.devices_list, state):
+            if len(device_state[0]) != len(device.outputs):
+                return False
+
+        self.state_version += 1
+        for device, (signals, clock_counter, dtype_memory,
+                     switch_state) in zip(self.devices_list, state):
+            for output_id, signal in zip(list(device.outputs), signals):
+                device.outputs[output_id] = signal
+            device.clock_counter = clock_counter
+            device.dtype_memory = dtype_memory
+            device.switch_state = switch_state
+        return True
+
+    def snapshot(self):
+        """Return a compact copy of the simulation state of every device.
+
+        The snapshot is (topology_version, signals, clock counters, D-type
+        memories, switch states), each held in a typed array. In compact mode
+        these are straight copies of the store's arrays.
+        """
+        if self.store is not None:
+            store = self.store
+            return (self.topology_version, store.signals[:],
+                    store.clock_counters[:], store.dtype_memories[:],
+                    store.switch_states[:])
+
+        signals = array("b")
+        clock_counters = array("i")
+        dtype_memories = array("b")
+        switch_states = array("b")
+        for device in self.devices_list:
+            signals.extend(device.outputs.values())
+            clock_counters.append(pack(device.clock_counter))
+            dtype_memories.append(pack(device.dtype_memory))
+            switch_states.append(pack(device.switch_state))
+        return (self.topology_version, signals, clock_counters,
+                dtype_memories, switch_states)
+
+    def restore(self, snapshot):
+        """Restore a snapshot returned by snapshot.
+
+        Return True if successful, or False if devices or ports have been
+        added since the snapshot was taken.
+        """
+        (topology_version, signals, clock_counters, dtype_memories,
+         switch_states) = snapshot
+        if topology_version != self.topology_version:
+            return False
+        self.state_version += 1
+
+        if self.store is not None:
+            store = self.store
+            store.signals[:] = signals
+            store.clock_counters[:] = clock_counters
+            store.dtype_memories[:] = dtype_memories
+            store.switch_states[:] = switch_states
+            return True
+
+        position = 0
+        for index, device in enumerate(self.devices_list):
+            outputs = device.outputs
+            for output_id in outputs:
+                outputs[output_id] = signals[position]
+                position += 1
+            device.clock_counter = unpack(clock_counters[index])
+            device.dtype_memory = unpack(dtype_memories[index])
+            device.switch_state = unpack(switch_states[index])
+        return True
+
     def make_switch(self, device_id, initial_state):
         """Make a switch device and set its initial state."""
         self.add_device(device_id, self.SWITCH)
@@ -235,7 +392,7 @@ class Devices:
         self.add_device(device_id, self.CLOCK)
         device = self.get_device(device_id)
         device.clock_half_period = clock_half_period
-        self.cold_startup()  # clock initialised to a random point in its cycle
+        self.start_device(device_id)
 
     def make_gate(self, device_id, device_kind, no_of_inputs):
         """Make logic gates with the specified number of inputs."""
@@ -244,7 +401,7 @@ class Devices:
 
         for input_number in range(1, no_of_inputs + 1):
             input_name = "".join(["I", str(input_number)])
-            [input_id] = self.names.lookup([input_name])
+            input_id = self.names.intern(input_name)
             self.add_input(device_id, input_id)
 
     def make_d_type(self, device_id):
@@ -254,25 +411,49 @@ class Devices:
             self.add_input(device_id, input_id)
         for output_id in self.dtype_output_ids:
             self.add_output(device_id, output_id)
-        self.cold_startup()  # D-type initialised to a random state
+        self.start_device(device_id)
+
+    def get_random(self, device_id):
+        """Return the random number generator of the specified device.
+
+        It gives the same numbers for the same startup_seed and device ID.
+        """
+        return random.Random("".join([str(self.startup_seed), "/",
+                                      str(device_id)]))
+
+    def start_device(self, device_id):
+        """Set a D-type or clock to its random cold start-up state.
+
+        D-types get a random memory, and clocks begin from a random point in
+        their cycles. Other devices are left unchanged.
+        """
+        device = self.get_device(device_id)
+        if device.device_kind == self.D_TYPE:
+            generator = self.get_random(device_id)
+            device.dtype_memory = generator.choice([self.LOW, self.HIGH])
+
+        elif device.device_kind == self.CLOCK:
+            generator = self.get_random(device_id)
+            clock_signal = generator.choice([self.LOW, self.HIGH])
+            self.add_output(device_id, output_id=None, signal=clock_signal)
+            # Initialise it to a random point in its cycle.
+            device.clock_counter = generator.randrange(
+                device.clock_half_period)
 
     def cold_startup(self):
         """Simulate cold start-up of D-types and clocks.
 
         Set the memory of the D-types to a random state and make the clocks
-        begin from a random point in their cycles.
+        begin from a random point in their cycles, in a single pass. Without
+        a seed, every cold start-up draws a new startup_seed; with one, every
+        cold start-up gives the same state.
         """
-        for device in self.devices_list:
-            if device.device_kind == self.D_TYPE:
-                device.dtype_memory = random.choice([self.LOW, self.HIGH])
-
-            elif device.device_kind == self.CLOCK:
-                clock_signal = random.choice([self.LOW, self.HIGH])
-                self.add_output(device.device_id, output_id=None,
-                                signal=clock_signal)
-                # Initialise it to a random point in its cycle.
-                device.clock_counter = \
-                    random.randrange(device.clock_half_period)
+        self.state_version += 1
+        if self.seed is None:
+            self.startup_seed = random.getrandbits(64)
+        for device_kind in [self.D_TYPE, self.CLOCK]:
+            for device_id in self.kind_dictionary.get(device_kind, []):
+                self.start_device(device_id)
 
     def make_device(self, device_id, device_kind, device_property=None):
         """Create the specified device.
@@ -0,0 +1,205 @@
+"""Execute the network by only evaluating devices whose inputs changed.
+
+Used in the Logic Simulator project as an alternative to executing every
+device on every settle iteration.
+
+Classes
+-------
+EventEngine - executes the network in an event-driven way.
+"""
+import heapq
+
+
+class EventEngine:
+    """Execute the network in an event-driven way.
+
+    The engine keeps a fan-out index of the network and a worklist of the
+    devices whose inputs have changed, and only executes those. Devices are
+    given a rank by their position in Network.get_execution_order(). Within a
+    settle iteration they are executed in rank order, exactly as the sweep
+    engine would, so the results (including the RISING and FALLING
+    intermediate signals and steady_state) are identical. When a device's
+    output changes, the devices it drives are executed later in the same
+    iteration if their rank is higher, or in the next iteration otherwise.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    build(self): Builds the execution order and fan-out index.
+
+    is_stale(self): Returns True if the network has changed since the last
+                    build.
+
+    schedule_changes(self): Returns the set of device ranks whose state was
+                            changed outside the engine since the last cycle.
+
+    execute_devices(self, pending): Executes the devices at the pending
+                                    ranks, and every device they affect,
+                                    until the network settles.
+
+    execute_iteration(self, pending, changed): Executes the devices at the
+                                               pending ranks for one settle
+                                               iteration, and returns the
+                                               ranks to execute in the next.
+
+    execute_network(self): Executes the changed devices in the network for
+                           one simulation cycle.
+    """
+
+    def __init__(self, network):
+        """Initialise the engine with no cached network information."""
+        self.network = network
+        self.devices = network.devices
+
+        self.order = []  # device IDs in execution order
+        self.ranks = {}  # stores {device_id: rank}
+        self.fanout = []  # fanout[rank] is a list of driven device ranks
+        self.switch_ranks = []
+
+        self.built_version = None  # versions the cached index is built for
+        self.state_version = None
+        self.switch_version = None
+        self.evaluate_all = True  # execute every device in the next cycle
+        # Ranks left to execute when the last cycle failed to settle
+        self.unsettled = set()
+
+    def is_stale(self):
+        """Return True if the network has changed since the last build."""
+        return self.built_version != (self.devices.topology_version,
+                                      self.network.connection_version)
+
+    def build(self):
+        """Build the execution order and the fan-out index."""
+        self.order = self.network.get_execution_order()
+        self.ranks = {device_id: rank
+                      for rank, device_id in enumerate(self.order)}
+        self.fanout = [[] for _ in self.order]
+
+        for rank, device_id in enumerate(self.order):
+            device = self.devices.get_device(device_id)
+            source_ranks = set()
+            for connected_output in device.inputs.values():
+                if connected_output is not None:
+                    source_ranks.add(self.ranks.get(connected_output[0]))
+            source_ranks.discard(None)
+            for source_rank in source_ranks:
+                self.fanout[source_rank].append(rank)
+
+        self.switch_ranks = [self.ranks[device_id] for device_id in
+                             self.devices.find_devices(self.devices.SWITCH)]
+        self.built_version = (self.devices.topology_version,
+                              self.network.connection_version)
+        self.evaluate_all = True
+
+    def schedule_changes(self):
+        """Return the set of device ranks changed outside the engine.
+
+        These are switches whose state differs from their output (only looked
+        for if a switch has been set since the last cycle), and the
+        clocks the clock scheduler has just set RISING or FALLING, together
+        with the devices they drive.
+        """
+        scheduled = set()
+        if self.switch_version != self.devices.switch_version:
+            self.switch_version = self.devices.switch_version
+            for rank in self.switch_ranks:
+                device = self.devices.get_device(self.order[rank])
+                if device.outputs[None] != device.switch_state:
+                    scheduled.add(rank)
+        for device_id in self.network.clock_scheduler.toggled:
+            rank = self.ranks[device_id]
+            scheduled.add(rank)
+            scheduled.update(self.fanout[rank])
+        return scheduled
+
+    def execute_network(self):
+        """Execute the changed devices in the network for one cycle.
+
+        Return True if successful and the network does not oscillate.
+        """
+        network = self.network
+        if self.is_stale():
+            self.build()
+        if self.state_version != self.devices.state_version:
+            self.state_version = self.devices.state_version
+            self.evaluate_all = True
+
+        # This sets clock signals to RISING or FALLING, where necessary
+        network.update_clocks()
+
+        if self.evaluate_all:
+            pending = set(range(len(self.order)))
+        else:
+            pending = self.schedule_changes()
+        return self.execute_devices(pending)
+
+    def execute_devices(self, pending):
+        """Execute the devices at the pending ranks until the network settles.
+
+        The devices driven by outputs that change are executed too, in the
+        same settle iteration if they come later in the execution order, or
+        in the next one otherwise. The clocks must already have been updated
+        for this cycle. Return True if successful and the network settles
+        within Network.get_iteration_limit() iterations.
+        """
+        network = self.network
+        iteration_limit = network.get_iteration_limit()
+        iterations = 0
+        changed = set()  # ranks of the devices whose outputs changed
+        while pending and iterations < iteration_limit:
+            iterations += 1
+            pending = self.execute_iteration(pending, changed)
+            if pending is None:
+                self.evaluate_all = True
+                return False
+        steady_state = not pending
+        network.steady_state = steady_state
+        # An unsettled network is left part way through its iterations
+        self.evaluate_all = not steady_state
+        self.unsettled = pending
+        if steady_state:
+            network.changed_outputs = []
+            for rank in changed:
+                device = self.devices.get_device(self.order[rank])
+                network.changed_outputs.extend(
+                    [(device, output_id) for output_id in device.outputs])
+        return steady_state
+
+    def execute_iteration(self, pending, changed):
+        """Execute the devices at the pending ranks for one settle iteration.
+
+        The devices are executed in rank order, together with the devices
+        driven by changed outputs that come later in the order. The ranks of
+        the devices whose outputs change are added to the set changed.
+        Return the set of ranks to execute in the next iteration (empty if
+        nothing changed), or None if a device cannot be executed.
+        """
+        network = self.network
+        order = self.order
+        fanout = self.fanout
+        execute_device = network.execute_device
+
+        worklist = list(pending)
+        heapq.heapify(worklist)
+        queued = set(pending)
+        pending = set()
+        while worklist:
+            rank = heapq.heappop(worklist)
+            network.steady_state = True
+            if not execute_device(order[rank]):
+                return None
+            if network.steady_state:  # the outputs did not change
+                continue
+            changed.add(rank)
+            # A changed signal moves on from RISING or FALLING next time
+            pending.add(rank)
+            for target in fanout[rank]:
+                if target < rank:
+                    pending.add(target)
+                elif target not in queued:
+                    queued.add(target)
+                    heapq.heappush(worklist, target)
+        return pending
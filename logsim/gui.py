@@ -17,6 +17,10 @@ from OpenGL import GL, GLUT
 import locale
 # import yaml
 
+from periodic import PeriodicRunner
+from vcd import VcdWriter
+from tracefile import TraceFileWriter, TraceFile
+
 # from names import Names
 # from devices import Devices
 # from network import Network
@@ -224,7 +228,11 @@ class MyGLCanvas(wxcanvas.GLCanvas):
         self.render("")
 
     def display_signals_gui(self):
-        """Display the signal trace(s) in the text console."""
+        """Display the signal trace(s) on the canvas.
+
+        The traces start at the first cycle every monitor still holds, and
+        the time steps are numbered from the start of the run.
+        """
         initial_y = 120
         initial_x = 10
         y_ref = initial_y
@@ -233,12 +241,13 @@ class MyGLCanvas(wxcanvas.GLCanvas):
 
         # initial_y += 70
         indicator = True  # only render x_axis once
+        first_cycle = self.monitors.get_first_cycle()
 
         for device_id, output_id in self.monitors.monitors_dictionary:
             monitor_name = self.devices.get_signal_name(device_id, output_id)
             name_length = len(monitor_name)
             signal_list = self.monitors.monitors_dictionary[(
-                device_id, output_id)]
+                device_id, output_id)][first_cycle:]
 
             # Draw x axis
             x = initial_x + margin * 7 + 15
@@ -248,8 +257,8 @@ class MyGLCanvas(wxcanvas.GLCanvas):
                                  len("Time step")) * " ", initial_x, y_ref)
 
                 for i in range(len(signal_list)):
-                    if i % 5 == 0:
-                        self.render_text(str(i), x, y_ref - 15)
+                    if (first_cycle + i) % 5 == 0:
+                        self.render_text(str(first_cycle + i), x, y_ref - 15)
                     x_next = x + 20
                     GL.glBegin(GL.GL_LINE_STRIP)
                     GL.glColor3f(1, 0.4, 0.2)
@@ -328,6 +337,12 @@ class Gui(wx.Frame):
     --------------
     on_menu(self, event): Event handler for the file menu.
 
+    on_close(self, event): Event handler for when the window is closed.
+
+    on_write_menu(self): Starts writing the monitored signals to a file.
+
+    on_open_menu(self): Displays the traces of a trace file.
+
     on_spin(self, event): Event handler for when the user changes the spin
                            control value.
 
@@ -346,6 +361,10 @@ class Gui(wx.Frame):
         self.devices = devices
         self.monitors = monitors
         self.network = network
+        # Runs the network, skipping ahead once its state repeats
+        self.runner = PeriodicRunner(network, monitors)
+        # Writes the monitored signals to a file, if one has been chosen
+        self.trace_writer = None
 
         self.outputs_list = []
         self.output_strings_list = []
@@ -397,6 +416,9 @@ class Gui(wx.Frame):
                         ("images/floppy-disk.png", 15, 15)))
         fileMenu.Append(about)
 
+        fileMenu.Append(2, _("&Write signals...\tCtrl+W"))
+        fileMenu.Append(3, _("&Open trace...\tCtrl+O"))
+
         # fileMenu.Append(wx.ID_EXIT, "&Exit")
         # fileMenu.Append(wx.ID_ANY, "&Test")
         menuBar.Append(fileMenu, _("&File"))
@@ -423,6 +445,7 @@ class Gui(wx.Frame):
 
         # Bind events to widgets
         self.Bind(wx.EVT_MENU, self.on_menu)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
         self.spin.Bind(wx.EVT_SPINCTRL, self.on_spin)
         self.run_button.Bind(wx.EVT_BUTTON, self.on_run_button)
         self.cont_button.Bind(wx.EVT_BUTTON, self.on_cont_button)
@@ -561,12 +584,84 @@ class Gui(wx.Frame):
         Id = event.GetId()
         if Id == 1:  # wx.ID_EXIT:
             self.Close(True)
+        if Id == 2:  # write the monitored signals to a file
+            self.on_write_menu()
+        if Id == 3:  # display a trace file
+            self.on_open_menu()
         if Id == wx.ID_ABOUT:
             wx.MessageBox(_("""Logic Simulator\nCreated by Mojisola Agboola\n2017\n
                             Modified by Eric, Max, and Oscar\n
                             with additional functionalities\n2022"""),
                           _("About Logsim"), wx.ICON_INFORMATION | wx.OK)
 
+    def on_close(self, event):
+        """Handle the event when the window is closed.
+
+        The trace file being written, if any, is closed first, however the
+        window is closed.
+        """
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+            self.trace_writer = None
+        event.Skip()
+
+    def on_write_menu(self):
+        """Ask for a file and start writing the monitored signals to it.
+
+        The file is a binary trace file (see tracefile) if its name ends in
+        .trace, or a VCD file if not. It records the monitors made so far,
+        and is started again by every run.
+        """
+        with wx.FileDialog(self, _("Write signals"),
+                           wildcard="|".join([_("VCD files (*.vcd)"), "*.vcd",
+                                              _("Trace files (*.trace)"),
+                                              "*.trace"]),
+                           style=wx.FD_SAVE |
+                           wx.FD_OVERWRITE_PROMPT) as file_dialog:
+            if file_dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            path = file_dialog.GetPath()
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+            self.trace_writer = None
+        if path.endswith(".trace"):
+            trace_writer = TraceFileWriter(self.devices, self.monitors, path)
+        else:
+            trace_writer = VcdWriter(self.devices, self.monitors, path)
+        if trace_writer.start():
+            trace_writer.write_cycles()  # the cycles recorded so far
+            self.trace_writer = trace_writer
+            self.status.SetLabel(_("Writing file. "))
+        else:
+            self.status.SetLabel(_("Error! Could not create file. "))
+
+    def on_open_menu(self):
+        """Ask for a trace file and display its traces.
+
+        The traces replace the monitors until the next run.
+        """
+        with wx.FileDialog(self, _("Open trace"),
+                           wildcard="|".join([_("Trace files (*.trace)"),
+                                              "*.trace"]),
+                           style=wx.FD_OPEN |
+                           wx.FD_FILE_MUST_EXIST) as file_dialog:
+            if file_dialog.ShowModal() == wx.ID_CANCEL:
+                return
+            trace_file = TraceFile(file_dialog.GetPath())
+        try:
+            if not trace_file.open():
+                self.status.SetLabel(_("Error! Could not read trace file. "))
+            elif not trace_file.load_monitors(self.monitors):
+                self.status.SetLabel(
+                    _("Error! Trace file does not match the circuit. "))
+            else:
+                self.cycles_completed = 0  # the traces cannot be continued
+                self.status.SetLabel(_("Opened trace file. "))
+        finally:
+            # The monitors' columns keep the map open as long as they need it
+            trace_file.close()
+        self.canvas.render("")
+
     def on_spin(self, event):
         """Handle the event when the user changes the spin control value."""
         # spin_value = self.spin.GetValue()
@@ -743,15 +838,28 @@ class Gui(wx.Frame):
 
         Return True if successful.
         """
-        for i in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-            else:
-                text = _("Error! Network oscillating. ")
-                self.status.SetLabel(text)
-                self.canvas.render("")
-                # print("Error! Network oscillating.")
-                return False
+        if self.trace_writer is None:
+            settled = self.runner.run(cycles)
+            cycles_completed = self.runner.cycles_completed
+        else:  # write the file as the cycles are recorded
+            (settled, cycles_completed) = self.trace_writer.run(self.runner,
+                                                                cycles)
+        # Count every cycle the monitors recorded, even if the run stopped
+        self.cycles_completed += cycles_completed
+        if not settled:
+            text = _("Error! Network oscillating. ")
+            oscillation = self.network.oscillation
+            if oscillation is not None:
+                text = "".join([text, " ".join(
+                    [self.names.get_name_string(device_id)
+                     for device_id in oscillation.devices])])
+                if oscillation.period is not None:
+                    text = "".join([text, " (", _("period"), " ",
+                                    str(oscillation.period), ") "])
+            self.status.SetLabel(text)
+            self.canvas.render("")
+            # print("Error! Network oscillating.")
+            return False
         # self.monitors.display_signals()
         # text = "run network for {} cycles.".format(cycles)
         text = _("run network for {} cycles. ").format(cycles)
@@ -899,12 +1007,13 @@ class Gui(wx.Frame):
 
         if cycles is not None:  # if the number of cycles provided is valid
             self.monitors.reset_monitors()
+            if self.trace_writer is not None:  # start the file again
+                self.trace_writer.start()
             # text = "".join(["Running for ", str(cycles), " cycles. "])
             self.canvas.render("")
             # print("".join(["Running for ", str(cycles), " cycles"]))
             self.devices.cold_startup()
-            if self.run_network(cycles):
-                self.cycles_completed += cycles
+            self.run_network(cycles)
 
     def continue_command(self):
         """Continue a previously run simulation."""
@@ -915,7 +1024,6 @@ class Gui(wx.Frame):
                 self.canvas.render("")
                 # print("Error! Nothing to continue. Run first.")
             elif self.run_network(cycles):
-                self.cycles_completed += cycles
                 text = " ".join([_("Continuing for"), str(cycles),
                                  _("cycles."), _("Total:"),
                                  str(self.cycles_completed), " "])
@@ -0,0 +1,467 @@
+"""Execute the network in dependency order, one level at a time.
+
+Used in the Logic Simulator project to settle combinational logic in a single
+ordered pass instead of repeated sweeps over every device.
+
+Classes
+-------
+LevelizedEngine - executes the network in levelized order.
+
+Functions
+---------
+find_loops - returns the strongly connected components of a graph.
+levelize - returns the blocks of a graph in topological order with levels.
+"""
+
+
+def find_loops(node_count, successors):
+    """Return the strongly connected components of a graph.
+
+    The nodes are the integers 0 to node_count - 1, and successors[node] is
+    the list of nodes that node has edges to. The components are returned in
+    topological order (every edge goes from an earlier component to a later
+    one, or stays inside a component), each as a sorted list of nodes. This is
+    Tarjan's algorithm, written without recursion so that long chains of
+    devices do not overflow the stack.
+    """
+    index_of = [None] * node_count
+    low_link = [0] * node_count
+    on_stack = [False] * node_count
+    stack = []
+    components = []
+    next_index = 0
+
+    for root in range(node_count):
+        if index_of[root] is not None:
+            continue
+        # Each work item is (node, position in its successor list)
+        work = [(root, 0)]
+        index_of[root] = low_link[root] = next_index
+        next_index += 1
+        stack.append(root)
+        on_stack[root] = True
+        while work:
+            node, position = work[-1]
+            node_successors = successors[node]
+            if position < len(node_successors):
+                work[-1] = (node, position + 1)
+                successor = node_successors[position]
+                if index_of[successor] is None:
+                    index_of[successor] = low_link[successor] = next_index
+                    next_index += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, 0))
+                elif on_stack[successor]:
+                    low_link[node] = min(low_link[node], index_of[successor])
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low_link[parent] = min(low_link[parent], low_link[node])
+            if low_link[node] == index_of[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    component.append(member)
+                    if member == node:
+                        break
+                component.sort()
+                components.append(component)
+
+    # Tarjan's algorithm finds the components in reverse topological order
+    components.reverse()
+    return components
+
+
+def levelize(node_count, successors, components=None):
+    """Return the blocks of a graph in topological order, with their levels.
+
+    Returns a list of (level, block) pairs, where each block is a strongly
+    connected component (a single node unless the graph has a loop there).
+    Blocks with no predecessors are at level 0, and every other block is one
+    level above its highest predecessor. The list is sorted by level, then by
+    the lowest node in each block. The components can be passed in if they
+    are already known, in the form find_loops returns them.
+    """
+    if components is None:
+        components = find_loops(node_count, successors)
+    component_of = [0] * node_count
+    for number, component in enumerate(components):
+        for node in component:
+            component_of[node] = number
+
+    levels = [0] * len(components)
+    for number, component in enumerate(components):
+        for node in component:
+            for successor in successors[node]:
+                target = component_of[successor]
+                if target != number and levels[target] <= levels[number]:
+                    levels[target] = levels[number] + 1
+
+    blocks = [(levels[number], component)
+              for number, component in enumerate(components)]
+    blocks.sort(key=lambda block: (block[0], block[1][0]))
+    return blocks
+
+
+class LevelizedEngine:
+    """Execute the network in levelized order.
+
+    Devices are placed in levels so that every device comes after the devices
+    driving it, and are then executed once each, in order. Gates use the new
+    values of their inputs (a RISING input counts as HIGH), so a change
+    travels through any depth of acyclic logic in a single pass. Outputs that
+    change are set to RISING or FALLING for the rest of the pass, and at the
+    end of the pass every changed output is settled to HIGH or LOW.
+
+    The order and the loops come from Network.get_loop_index(). Some devices
+    cannot be settled in one pass. Where a loop (for example cross-coupled
+    NAND latches) settles depends on the order its signals change in, and a
+    loop iterated on its own, with its inputs already at their new values,
+    can settle differently from the sweep engine, or not at all. A D-type
+    samples DATA, SET and CLEAR on whichever sweep its clock edge arrives,
+    so a clock edge delayed by gates, or a glitch on SET or CLEAR, can be
+    seen differently in a single pass. So a cycle in which a loop or a D-type
+    needs executing is settled by the event engine instead (see
+    events.EventEngine), which gives exactly the results of the sweep engine.
+
+    Once a cycle has settled, the next one only executes the blocks in the
+    fan-out cones of the clocks that change and the switches that have been
+    set (see Devices.switch_version), and every other output keeps its
+    settled value. Code that changes device outputs directly must bump
+    Devices.state_version so that the next cycle executes every block.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    build(self): Builds the levelized schedule.
+
+    get_cone(self, rank): Returns the blocks a change at a device can reach.
+
+    get_dirty_ranks(self): Returns the clocks and switches that changed
+                           since the last cycle.
+
+    get_dirty_blocks(self): Returns the blocks that need executing this cycle.
+
+    reaches_sequential(self, rank): Returns True if a change at a device can
+                                    reach a loop or a D-type.
+
+    is_sequential_dirty(self): Returns True if a loop or a D-type needs
+                               executing this cycle.
+
+    execute_events(self): Settles the cycle with the event engine.
+
+    is_stale(self): Returns True if the network has changed since the last
+                    build.
+
+    execute_network(self): Executes every device in the network once, in
+                           levelized order, for one simulation cycle.
+    """
+
+    def __init__(self, network):
+        """Initialise the engine with no schedule."""
+        self.network = network
+        self.devices = network.devices
+
+        self.order = []  # device IDs in execution order
+        # schedule is a list of (level, [rank, ...], is_loop) blocks
+        self.schedule = []
+        self.clock_ranks = []
+        self.device_list = []  # device_list[rank] is the Device object
+        # sources[rank] is the list of (input_id, source device, port ID)
+        self.sources = []
+        self.built_version = None
+        self.has_sequential = False  # True if it has loops or D-types
+
+        self.ranks = {}  # stores {device_id: rank}
+        self.successors = []  # successors[rank] is a list of ranks
+        self.positions = []  # positions[rank] is the index of its block
+        self.switch_ranks = []
+        self.cones = {}  # stores {rank: sorted block indexes of its cone}
+        # sequential_positions is the set of blocks with a loop or a D-type
+        self.sequential_positions = set()
+        # stores {rank: True if its cone has a loop or a D-type}
+        self.sequential_reach = {}
+        # The state and switch versions of the devices after the last cycle
+        # that settled, or None if the next cycle must execute every block
+        self.settled_version = None
+        self.switch_version = None
+
+    def is_stale(self):
+        """Return True if the network has changed since the last build."""
+        return self.built_version != (self.devices.topology_version,
+                                      self.network.connection_version)
+
+    def build(self):
+        """Build the levelized schedule."""
+        (self.order, successors,
+         components) = self.network.get_loop_index()
+        self.ranks = ranks = {device_id: rank
+                              for rank, device_id in enumerate(self.order)}
+        self.successors = successors
+        self.device_list = [self.devices.get_device(device_id)
+                            for device_id in self.order]
+        self.sources = []
+        for device in self.device_list:
+            device_sources = []
+            for input_id, connected_output in device.inputs.items():
+                if connected_output is None:
+                    device_sources.append((input_id, None, None))
+                    continue
+                (source_id, port_id) = connected_output
+                device_sources.append(
+                    (input_id, self.devices.get_device(source_id), port_id))
+            self.sources.append(device_sources)
+
+        self.schedule = [
+            (level, block, len(block) > 1 or block[0] in successors[block[0]])
+            for level, block in levelize(len(self.order), successors,
+                                         components)]
+        self.positions = [0] * len(self.order)
+        self.sequential_positions = set()
+        for position, (level, block, is_loop) in enumerate(self.schedule):
+            for rank in block:
+                self.positions[rank] = position
+                if (is_loop or self.device_list[rank].device_kind ==
+                        self.devices.D_TYPE):
+                    self.sequential_positions.add(position)
+        self.has_sequential = bool(self.sequential_positions)
+        self.clock_ranks = [ranks[device_id] for device_id in
+                            self.devices.find_devices(self.devices.CLOCK)]
+        self.switch_ranks = [ranks[device_id] for device_id in
+                             self.devices.find_devices(self.devices.SWITCH)]
+        self.cones = {}
+        self.sequential_reach = {}
+        self.settled_version = None
+        self.built_version = (self.devices.topology_version,
+                              self.network.connection_version)
+
+    def get_cone(self, rank):
+        """Return the blocks a change at the device at rank can reach.
+
+        The cone is the sorted list of indexes into the schedule of every
+        block the device drives, directly or through other devices, including
+        its own block. It is worked out once and then cached.
+        """
+        cone = self.cones.get(rank)
+        if cone is None:
+            reached = {rank}
+            stack = [rank]
+            while stack:
+                for successor in self.successors[stack.pop()]:
+                    if successor not in reached:
+                        reached.add(successor)
+                        stack.append(successor)
+            cone = sorted(set(self.positions[reached_rank]
+                              for reached_rank in reached))
+            self.cones[rank] = cone
+        return cone
+
+    def get_dirty_ranks(self):
+        """Return the ranks of the clocks and switches changed this cycle.
+
+        These are the clocks that have just changed and the switches that
+        have been set to a new state since the last cycle. Return None if
+        the last cycle did not settle or a device state was reset since, as
+        every block then needs executing.
+        """
+        devices = self.devices
+        if self.settled_version != devices.state_version:
+            return None
+        dirty_ranks = [self.ranks[device_id] for device_id in
+                       self.network.clock_scheduler.toggled]
+        if self.switch_version != devices.switch_version:
+            for rank in self.switch_ranks:
+                device = self.device_list[rank]
+                if device.outputs[None] != device.switch_state:
+                    dirty_ranks.append(rank)
+        return dirty_ranks
+
+    def get_dirty_blocks(self):
+        """Return the blocks that need executing this cycle.
+
+        These are the blocks in the cones of the ranks from
+        get_dirty_ranks(), or every block if it returns None.
+        """
+        dirty_ranks = self.get_dirty_ranks()
+        if dirty_ranks is None:
+            return self.schedule
+        if len(dirty_ranks) == 1:
+            return [self.schedule[position]
+                    for position in self.get_cone(dirty_ranks[0])]
+        positions = set()
+        for rank in dirty_ranks:
+            positions.update(self.get_cone(rank))
+        return [self.schedule[position] for position in sorted(positions)]
+
+    def reaches_sequential(self, rank):
+        """Return True if the cone of the device at rank reaches a loop.
+
+        D-types count as loops here, as neither can be settled in one pass.
+        """
+        reach = self.sequential_reach.get(rank)
+        if reach is None:
+            reach = any(position in self.sequential_positions
+                        for position in self.get_cone(rank))
+            self.sequential_reach[rank] = reach
+        return reach
+
+    def is_sequential_dirty(self):
+        """Return True if a loop or a D-type needs executing this cycle."""
+        if not self.has_sequential:
+            return False
+        dirty_ranks = self.get_dirty_ranks()
+        if dirty_ranks is None:
+            return True
+        return any(self.reaches_sequential(rank) for rank in dirty_ranks)
+
+    def execute_events(self):
+        """Settle the cycle with the event engine, as the sweep engine would.
+
+        The event engine starts from the clocks and switches that changed and
+        the devices they drive, or from every device if every block needs
+        executing. The clocks must already have been updated for this cycle.
+        Return True if successful and the network settles.
+        """
+        event_engine = self.network.event_engine
+        if event_engine.is_stale():
+            event_engine.build()
+        dirty_ranks = self.get_dirty_ranks()
+        if dirty_ranks is None:
+            pending = set(range(len(self.order)))
+        else:
+            pending = set(dirty_ranks)
+            for rank in dirty_ranks:
+                pending.update(event_engine.fanout[rank])
+        if not event_engine.execute_devices(pending):
+            self.settled_version = None
+            return False
+        self.settled_version = self.devices.state_version
+        self.switch_version = self.devices.switch_version
+        return True
+
+    def settle(self, signal):
+        """Return the value a signal is moving to."""
+        if signal == self.devices.RISING:
+            return self.devices.HIGH
+        elif signal == self.devices.FALLING:
+            return self.devices.LOW
+        return signal
+
+    def transition(self, start, target):
+        """Return the signal for an output moving from start to target."""
+        if start == self.devices.LOW and target == self.devices.HIGH:
+            return self.devices.RISING
+        elif start == self.devices.HIGH and target == self.devices.LOW:
+            return self.devices.FALLING
+        return target
+
+    def get_targets(self, rank):
+        """Return the {output_id: target signal} of the device at rank.
+
+        Return None if the device has an unconnected input.
+        """
+        devices = self.devices
+        device = self.device_list[rank]
+        device_kind = device.device_kind
+        signals = {}
+        for input_id, source, port_id in self.sources[rank]:
+            if source is None:
+                return None
+            signals[input_id] = source.outputs[port_id]
+
+        if device_kind == devices.SWITCH:
+            return {None: device.switch_state}
+
+        elif device_kind == devices.CLOCK:
+            # The edge set by update_clocks stays until the end of the pass
+            return {}
+
+        elif device_kind == devices.D_TYPE:
+            if signals[devices.CLK_ID] == devices.RISING:
+                # Sample DATA at its value before this cycle's changes
+                if signals[devices.DATA_ID] in [devices.HIGH,
+                                                devices.FALLING]:
+                    device.dtype_memory = devices.HIGH
+                else:
+                    device.dtype_memory = devices.LOW
+            if self.settle(signals[devices.SET_ID]) == devices.HIGH:
+                device.dtype_memory = devices.HIGH
+            if self.settle(signals[devices.CLEAR_ID]) == devices.HIGH:
+                device.dtype_memory = devices.LOW
+            return {devices.Q_ID: device.dtype_memory,
+                    devices.QBAR_ID: self.network.invert_signal(
+                        device.dtype_memory)}
+
+        values = [self.settle(signal) for signal in signals.values()]
+        if device_kind == devices.XOR:
+            if values[0] == values[1]:
+                return {None: devices.LOW}
+            return {None: devices.HIGH}
+
+        (x, y) = self.network.get_gate_rule(device_kind)
+        for value in values:
+            if value != x:
+                return {None: self.network.invert_signal(y)}
+        return {None: y}
+
+    def execute_block(self, block, changed):
+        """Execute a block of devices once.
+
+        Outputs that change are set to RISING or FALLING, and added to
+        changed as (device, output_id) pairs. A loop or a D-type is only
+        executed this way if none of its inputs changed this cycle, so its
+        outputs stay the same. Return True if successful.
+        """
+        for rank in block:
+            targets = self.get_targets(rank)
+            if targets is None:  # an input is unconnected
+                return False
+            device = self.device_list[rank]
+            outputs = device.outputs
+            for output_id, target in targets.items():
+                signal = outputs[output_id]
+                new_signal = self.transition(signal, target)
+                if new_signal != signal:
+                    outputs[output_id] = new_signal
+                    changed.append((device, output_id))
+        return True
+
+    def execute_network(self):
+        """Execute every device once, in levelized order, for one cycle.
+
+        Return True if successful and the network settles.
+        """
+        network = self.network
+        if self.is_stale():
+            self.build()
+
+        # This sets clock signals to RISING or FALLING, where necessary
+        network.update_clocks()
+        if self.is_sequential_dirty():
+            return self.execute_events()
+
+        changed = []  # (device, output_id) of every changed output
+        for device_id in network.clock_scheduler.toggled:
+            changed.append((self.devices.get_device(device_id), None))
+
+        for level, block, is_loop in self.get_dirty_blocks():
+            if not self.execute_block(block, changed):
+                self.settled_version = None
+                network.steady_state = False
+                return False
+
+        # Every output has now reached its target, so settle the edges
+        for device, output_id in changed:
+            device.outputs[output_id] = self.settle(device.outputs[output_id])
+        self.settled_version = self.devices.state_version
+        self.switch_version = self.devices.switch_version
+        network.changed_outputs = changed
+        network.steady_state = True
+        return True
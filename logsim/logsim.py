@@ -9,6 +9,8 @@ Usage
 Show help: logsim.py -h
 Command line user interface: logsim.py -c <file path>
 Graphical user interface: logsim.py <file path>
+Reproducible cold start-up: add -s <seed> to either
+Keep only the last cycles of each monitor: add -w <cycles> to either
 """
 import getopt
 import sys
@@ -34,19 +36,43 @@ def main(arg_list):
     usage_message = ("Usage:\n"
                      "Show help: logsim.py -h\n"
                      "Command line user interface: logsim.py -c <file path>\n"
-                     "Graphical user interface: logsim.py <file path>")
+                     "Graphical user interface: logsim.py <file path>\n"
+                     "Reproducible cold start-up: add -s <seed> to either\n"
+                     "Keep only the last cycles of each monitor: "
+                     "add -w <cycles> to either")
     try:
-        options, arguments = getopt.getopt(arg_list, "hc:")
+        options, arguments = getopt.getopt(arg_list, "hc:s:w:")
     except getopt.GetoptError:
         print("Error: invalid command line arguments\n")
         print(usage_message)
         sys.exit()
 
+    seed = None
+    capacity = None
+    for option, value in options:
+        if option == "-s":  # seed the cold start-up of D-types and clocks
+            try:
+                seed = int(value)
+            except ValueError:
+                print("Error: the seed must be an integer\n")
+                print(usage_message)
+                sys.exit()
+        elif option == "-w":  # bound the memory of every monitor
+            try:
+                capacity = int(value)
+            except ValueError:
+                capacity = 0
+            if capacity <= 0:
+                print("Error: the window must be a positive integer\n")
+                print(usage_message)
+                sys.exit()
+
     # Initialise instances of the four inner simulator classes
     names = Names()
-    devices = Devices(names)
+    devices = Devices(names, seed=seed)
     network = Network(names, devices)
     monitors = Monitors(names, devices, network)
+    monitors.capacity = capacity
 
     for option, path in options:
         if option == "-h":  # print the usage message
@@ -60,7 +86,8 @@ def main(arg_list):
                 userint = UserInterface(names, devices, network, monitors)
                 userint.command_interface()
 
-    if not options:  # no option given, use the graphical user interface
+    if not [option for option, path in options if option not in ["-s", "-w"]]:
+        # No option given, use the graphical user interface
 
         if len(arguments) != 1:  # wrong number of arguments
             print("Error: one file path required\n")
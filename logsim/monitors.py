@@ -5,10 +5,560 @@ signals.
 
 Classes
 -------
+Trace - stores the signals recorded by one monitor.
+RingTrace - stores the most recent signals recorded by one monitor.
+ChangeTrace - stores the signals recorded by one monitor as a change list.
 Monitors - records and displays specified output signals.
 
 """
+import bisect
 import collections
+import itertools
+from array import array
+
+
+class Trace:
+    """Store the signals recorded by one monitor.
+
+    The signals are packed into a typed array, one byte each. A monitor made
+    after some cycles have been completed keeps the number of those cycles as
+    its start, instead of storing a BLANK signal for each of them. Otherwise
+    the trace behaves like the list of signals it replaces: its length,
+    items, slices (returned as lists) and iteration all include the BLANK
+    signals before the start.
+
+    Parameters
+    ----------
+    blank: the BLANK signal.
+    start: number of cycles before the first recorded signal.
+    signals: iterable of recorded signals.
+
+    Public methods
+    --------------
+    append(self, signal): Records a signal.
+
+    extend(self, signals): Records several signals.
+
+    repeat(self, signals, count): Records count signals, going round the list
+                                  of signals as often as needed.
+
+    fill_start(self): Stores the BLANK signals before the start.
+
+    get_window(self): Returns the retained signals.
+
+    copy(self): Returns a copy of the trace.
+
+    tolist(self): Returns the trace as a list of signals.
+    """
+
+    def __init__(self, blank, start=0, signals=()):
+        """Initialise the trace."""
+        self.blank = blank
+        self.start = start
+        self.signals = array("b", signals)
+        self.capacity = None  # every signal is kept
+        self.first_cycle = 0  # first cycle still held
+
+    def __len__(self):
+        """Return the number of cycles in the trace."""
+        return self.start + len(self.signals)
+
+    def __iter__(self):
+        """Iterate over the signal of every cycle."""
+        return itertools.chain(itertools.repeat(self.blank, self.start),
+                               self.signals)
+
+    def __getitem__(self, index):
+        """Return the signal of a cycle, or a list of signals for a slice."""
+        if isinstance(index, slice):
+            (first, end, step) = index.indices(len(self))
+            if step != 1:
+                return [self[cycle] for cycle in range(first, end, step)]
+            if end <= first:
+                return []
+            blanks = max(0, min(end, self.start) - first)
+            return [self.blank] * blanks + self.signals[
+                max(first, self.start) - self.start:
+                max(end, self.start) - self.start].tolist()
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("trace index out of range")
+        if index < self.start:
+            return self.blank
+        return self.signals[index - self.start]
+
+    def __setitem__(self, index, signal):
+        """Set the signal of a cycle, or the signals of a slice."""
+        if isinstance(index, slice):
+            self.fill_start()
+            self.signals[index] = array("b", signal)
+            return
+        if index < 0:
+            index += len(self)
+        if index < 0:
+            raise IndexError("trace assignment index out of range")
+        if index < self.start:
+            if signal == self.blank:
+                return
+            self.fill_start()
+        self.signals[index - self.start] = signal
+
+    def __delitem__(self, index):
+        """Delete the signal of a cycle, or the signals of a slice."""
+        if isinstance(index, slice):
+            (first, end, step) = index.indices(len(self))
+            if step == 1 and first >= self.start:
+                del self.signals[first - self.start:end - self.start]
+                return
+        self.fill_start()
+        del self.signals[index]
+
+    def __eq__(self, other):
+        """Return True if other holds the same signals."""
+        if isinstance(other, Trace) and other.capacity is None and \
+                other.start == self.start:
+            return self.signals == other.signals
+        try:
+            return len(self) == len(other) and list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    __hash__ = None  # traces change, so they cannot be dictionary keys
+
+    def __repr__(self):
+        """Return the trace as the list of its signals."""
+        return repr(self.tolist())
+
+    def append(self, signal):
+        """Record a signal."""
+        self.signals.append(signal)
+
+    def extend(self, signals):
+        """Record several signals."""
+        self.signals.extend(signals)
+
+    def repeat(self, signals, count):
+        """Record count signals, going round the list of signals."""
+        self.extend(signals * (count // len(signals)))
+        self.extend(signals[:count % len(signals)])
+
+    def fill_start(self):
+        """Store the BLANK signals before the start, so the start is 0."""
+        if self.start:
+            self.signals[0:0] = array("b", [self.blank]) * self.start
+            self.start = 0
+
+    def get_window(self):
+        """Return the list of signals from first_cycle onwards."""
+        return self.tolist()
+
+    def copy(self):
+        """Return a copy of the trace."""
+        return Trace(self.blank, self.start, self.signals)
+
+    def tolist(self):
+        """Return the trace as a list of signals."""
+        return [self.blank] * self.start + self.signals.tolist()
+
+
+class RingTrace(Trace):
+    """Store the most recent signals recorded by one monitor.
+
+    Only the signals of the last capacity cycles are kept, in a fixed-size
+    array used as a ring buffer, so memory stays the same however long the
+    run. Cycles are still counted from the start of the run: the length is
+    the number of cycles recorded, and first_cycle is the first cycle whose
+    signal is still held. Reading or changing an earlier cycle raises
+    IndexError, and slices leave those cycles out.
+
+    Parameters
+    ----------
+    blank: the BLANK signal.
+    capacity: number of cycles kept.
+    start: number of cycles before the first recorded signal.
+
+    Public methods
+    --------------
+    append(self, signal): Records a signal.
+
+    extend(self, signals): Records several signals.
+
+    repeat(self, signals, count): Records count signals, going round the list
+                                  of signals as often as needed.
+
+    get_index(self, cycle): Returns the index in the buffer of a retained
+                            cycle.
+
+    get_window(self): Returns the retained signals.
+
+    copy(self): Returns a copy of the trace.
+
+    tolist(self): Returns the retained signals.
+    """
+
+    def __init__(self, blank, capacity, start=0):
+        """Initialise the trace with a buffer of BLANK signals."""
+        super().__init__(blank)
+        self.capacity = capacity
+        self.signals = array("b", [blank]) * capacity
+        self.length = start  # number of cycles recorded, including start
+        self.first_cycle = max(0, start - capacity)
+
+    def __len__(self):
+        """Return the number of cycles recorded."""
+        return self.length
+
+    def __iter__(self):
+        """Iterate over the retained signals."""
+        return iter(self.get_window())
+
+    def get_index(self, cycle):
+        """Return the index in the buffer of a retained cycle."""
+        if cycle < 0:
+            cycle += self.length
+        if cycle < self.first_cycle or cycle >= self.length:
+            raise IndexError("cycle not held in the trace")
+        return cycle % self.capacity
+
+    def __getitem__(self, index):
+        """Return the signal of a cycle, or a list of signals for a slice.
+
+        A slice only covers the cycles still held.
+        """
+        if isinstance(index, slice):
+            return [self.signals[cycle % self.capacity]
+                    for cycle in range(*index.indices(self.length))
+                    if cycle >= self.first_cycle]
+        return self.signals[self.get_index(index)]
+
+    def __setitem__(self, index, signal):
+        """Set the signal of a retained cycle."""
+        self.signals[self.get_index(index)] = signal
+
+    def __delitem__(self, index):
+        """Delete the signals from a retained cycle to the end.
+
+        A single cycle can only be deleted if it is the last one.
+        """
+        if not isinstance(index, slice):
+            self.get_index(index)  # raises IndexError if it is not held
+            cycle = index + self.length if index < 0 else index
+            index = slice(cycle, cycle + 1)
+        (first, end, step) = index.indices(self.length)
+        if step != 1 or end != self.length or first < self.first_cycle:
+            raise IndexError("only the end of a ring trace can be deleted")
+        self.length = first
+
+    def __eq__(self, other):
+        """Return True if other holds the same cycles and signals.
+
+        A ring trace equals a list of the signals it holds.
+        """
+        if isinstance(other, RingTrace):
+            return (self.length, self.first_cycle, self.get_window()) == \
+                (other.length, other.first_cycle, other.get_window())
+        try:
+            return self.get_window() == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def append(self, signal):
+        """Record a signal, overwriting the oldest if the buffer is full."""
+        self.signals[self.length % self.capacity] = signal
+        self.length += 1
+        if self.length - self.first_cycle > self.capacity:
+            self.first_cycle = self.length - self.capacity
+
+    def extend(self, signals):
+        """Record several signals."""
+        for signal in signals:
+            self.append(signal)
+
+    def repeat(self, signals, count):
+        """Record count signals, going round the list of signals.
+
+        Only the signals that end up in the buffer are written.
+        """
+        skipped = max(0, count - self.capacity)
+        self.length += skipped
+        self.first_cycle = max(self.first_cycle,
+                               self.length - self.capacity)
+        period = len(signals)
+        for number in range(skipped, count):
+            self.append(signals[number % period])
+
+    def fill_start(self):
+        """Do nothing, as cycles before the start are already BLANK."""
+
+    def get_window(self):
+        """Return the list of signals from first_cycle onwards."""
+        return [self.signals[cycle % self.capacity]
+                for cycle in range(self.first_cycle, self.length)]
+
+    def copy(self):
+        """Return a copy of the trace."""
+        trace = RingTrace(self.blank, self.capacity)
+        trace.signals = self.signals[:]
+        trace.length = self.length
+        trace.first_cycle = self.first_cycle
+        return trace
+
+    def tolist(self):
+        """Return the list of signals from first_cycle onwards."""
+        return self.get_window()
+
+
+class ChangeTrace(Trace):
+    """Store the signals recorded by one monitor as a change list.
+
+    Only the cycles at which the signal changes are stored, each with the
+    signal it changes to, so a signal that stays HIGH or LOW for long
+    stretches takes a few bytes per change rather than one per cycle. The
+    trace still behaves as the list of every cycle's signal, and the signal
+    at any cycle, the edges in a range of cycles and the runs of a range are
+    found by binary search on the change list.
+
+    A trace can also share a clock with other traces: a one-element array
+    counting cycles. Every time the clock advances, the trace is one cycle
+    longer, repeating its last signal, without the trace itself being
+    touched. This lets Monitors record only the outputs that change.
+
+    Parameters
+    ----------
+    blank: the BLANK signal.
+    start: number of cycles before the first recorded signal.
+    clock: shared clock, or None.
+
+    Public methods
+    --------------
+    append(self, signal): Records a signal.
+
+    extend(self, signals): Records several signals.
+
+    repeat(self, signals, count): Records count signals, going round the list
+                                  of signals as often as needed.
+
+    replace_last(self, signal): Changes the signal of the last cycle.
+
+    get_cycle(self, index): Returns the cycle of an index.
+
+    value_at(self, cycle): Returns the signal at a cycle.
+
+    get_runs(self, start, end): Returns the runs of signals from start to
+                                end, with the cycles they end at.
+
+    edges(self, kind, start=0, end=None): Returns the cycles at which the
+                                          signal changes to kind.
+
+    slice(self, start, end): Returns the runs of signals covering a range of
+                             cycles.
+
+    get_window(self): Returns the list of signals.
+
+    copy(self, clock=None): Returns a copy of the trace, following clock if
+                            it is given.
+
+    tolist(self): Returns the list of signals.
+    """
+
+    def __init__(self, blank, start=0, clock=None):
+        """Initialise the trace with a BLANK run for the start."""
+        super().__init__(blank)
+        self.changes = array("q")  # cycles at which the signal changes
+        self.values = array("b")  # values[i] is the signal from changes[i]
+        self.clock = clock
+        self.length = start  # number of cycles recorded, including start
+        if start:
+            self.changes.append(0)
+            self.values.append(blank)
+
+    @property
+    def length(self):
+        """Return the number of cycles recorded, including the start.
+
+        This includes the cycles the clock has advanced by since the length
+        was last set.
+        """
+        if self.clock is None:
+            return self.recorded
+        return self.recorded + self.clock[0] - self.synced
+
+    @length.setter
+    def length(self, length):
+        """Set the number of cycles recorded, as of the current clock."""
+        self.recorded = length
+        if self.clock is not None:
+            self.synced = self.clock[0]
+
+    def __len__(self):
+        """Return the number of cycles recorded."""
+        return self.length
+
+    def __iter__(self):
+        """Iterate over the signals of every cycle."""
+        for cycle, signal, end in self.get_runs(0, self.length):
+            for _ in range(end - cycle):
+                yield signal
+
+    def get_cycle(self, index):
+        """Return the cycle of an index, which may count from the end."""
+        if index < 0:
+            index += self.length
+        if index < 0 or index >= self.length:
+            raise IndexError("trace index out of range")
+        return index
+
+    def __getitem__(self, index):
+        """Return the signal of a cycle, or a list of signals for a slice."""
+        if isinstance(index, slice):
+            (start, end, step) = index.indices(self.length)
+            if step != 1:
+                return self.tolist()[index]
+            signals = []
+            for cycle, signal, run_end in self.get_runs(start, end):
+                signals.extend([signal] * (run_end - cycle))
+            return signals
+        return self.value_at(self.get_cycle(index))
+
+    def __setitem__(self, index, signal):
+        """Set the signal of a cycle."""
+        cycle = self.get_cycle(index)
+        if self.value_at(cycle) == signal:
+            return
+        runs = self.get_runs(cycle + 1, self.length)
+        del self[cycle:]
+        self.append(signal)
+        for run_cycle, run_signal, run_end in runs:
+            self.repeat([run_signal], run_end - run_cycle)
+
+    def __delitem__(self, index):
+        """Delete the signals from a cycle to the end.
+
+        A single cycle can only be deleted if it is the last one.
+        """
+        if not isinstance(index, slice):
+            cycle = self.get_cycle(index)  # raises IndexError if out of range
+            index = slice(cycle, cycle + 1)
+        (first, end, step) = index.indices(self.length)
+        if step != 1 or end != self.length:
+            raise IndexError("only the end of a change trace can be deleted")
+        position = bisect.bisect_left(self.changes, first)
+        del self.changes[position:]
+        del self.values[position:]
+        self.length = first
+
+    def __eq__(self, other):
+        """Return True if other holds the same signals."""
+        if isinstance(other, ChangeTrace):
+            return (self.length, self.changes, self.values) == \
+                (other.length, other.changes, other.values)
+        try:
+            return self.length == len(other) and self.tolist() == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def append(self, signal):
+        """Record a signal, storing a change if it differs from the last."""
+        if not self.values or self.values[-1] != signal:
+            self.changes.append(self.length)
+            self.values.append(signal)
+        self.length += 1
+
+    def extend(self, signals):
+        """Record several signals."""
+        for signal in signals:
+            self.append(signal)
+
+    def replace_last(self, signal):
+        """Change the signal of the last cycle recorded."""
+        self.length -= 1
+        if self.changes and self.changes[-1] == self.recorded:
+            del self.changes[-1]
+            del self.values[-1]
+        self.append(signal)
+
+    def repeat(self, signals, count):
+        """Record count signals, going round the list of signals.
+
+        A repeated single signal is recorded in constant time.
+        """
+        if count <= 0:
+            return
+        if len(set(signals)) == 1:
+            self.append(signals[0])
+            self.length += count - 1
+        else:
+            super().repeat(signals, count)
+
+    def value_at(self, cycle):
+        """Return the signal at a cycle from 0 to len(self) - 1."""
+        return self.values[bisect.bisect_right(self.changes, cycle) - 1]
+
+    def get_runs(self, start, end):
+        """Return the [(cycle, signal, end cycle)] runs from start to end.
+
+        The runs are clipped to the cycles from start to end - 1.
+        """
+        if start >= end:
+            return []
+        changes = self.changes
+        position = bisect.bisect_right(changes, start) - 1
+        last = bisect.bisect_left(changes, end)
+        runs = []
+        for index in range(position, last):
+            run_end = changes[index + 1] if index + 1 < len(changes) else end
+            runs.append((max(changes[index], start), self.values[index],
+                         min(run_end, end)))
+        return runs
+
+    def edges(self, kind, start=0, end=None):
+        """Return the cycles from start to end - 1 at which the signal changes.
+
+        Only changes to the signal kind are returned, so edges(HIGH) gives
+        the rising edges and edges(LOW) the falling ones. A change at start
+        is included only if the signal before start was different, and the
+        first signal after BLANK cycles is not an edge.
+        """
+        if end is None:
+            end = self.length
+        changes = self.changes
+        values = self.values
+        first = max(bisect.bisect_left(changes, start), 1)
+        last = bisect.bisect_left(changes, min(end, self.length))
+        return [changes[index] for index in range(first, last)
+                if values[index] == kind and values[index - 1] != self.blank]
+
+    def slice(self, start, end):
+        """Return the [(cycle, signal)] runs covering cycles start to end - 1.
+
+        Each run starts at its cycle and lasts until the next one, or end.
+        """
+        return [(cycle, signal) for cycle, signal, run_end in
+                self.get_runs(max(start, 0), min(end, self.length))]
+
+    def fill_start(self):
+        """Do nothing, as the start is already stored as a BLANK run."""
+
+    def get_window(self):
+        """Return the list of signals."""
+        return self.tolist()
+
+    def copy(self, clock=None):
+        """Return a copy of the trace, following clock if it is given.
+
+        Without a clock the copy keeps the length the trace has now, however
+        far the trace's own clock advances.
+        """
+        trace = ChangeTrace(self.blank, clock=clock)
+        trace.changes = self.changes[:]
+        trace.values = self.values[:]
+        trace.length = self.length
+        return trace
+
+    def tolist(self):
+        """Return the list of signals."""
+        return self[:]
 
 
 class Monitors:
@@ -17,16 +567,32 @@ class Monitors:
     This class contains functions for recording and displaying the signal state
     of outputs specified by their device and port IDs.
 
+    Each monitor keeps every signal it records, unless it has a capacity, in
+    which case it keeps only the signals of its last capacity cycles (see
+    RingTrace), so a run of any length uses the same memory. New monitors get
+    the capacity in the capacity attribute, which is None (no limit) unless
+    set. If compact is True, monitors without a capacity store only the
+    cycles at which their signal changes (see ChangeTrace), and are only
+    touched by record_signals when the engine reports that their output has
+    changed.
+
     Parameters
     ----------
     names: instance of the names.Names() class.
     devices: instance of the devices.Devices() class.
     network: instance of the network.Network() class.
+    compact: if True, store the traces as change lists.
 
     Public methods
     --------------
-    make_monitor(self, device_id, output_id): Sets a specified monitor on the
-                                              specified output.
+    make_monitor(self, device_id, output_id, cycles_completed=0,
+                 capacity=None): Sets a specified monitor on the specified
+                                 output.
+
+    make_trace(self, start=0, capacity=None): Returns an empty trace.
+
+    watch(self): Sorts the traces into those recorded on change and those
+                 recorded every cycle.
 
     remove_monitor(self, device_id, output_id): Removes a monitor from the
                                                 specified output.
@@ -41,28 +607,50 @@ class Monitors:
 
     reset_monitors(self): Clears the memory of all monitors.
 
+    snapshot(self): Returns a compact copy of the monitors and their traces.
+
+    restore(self, snapshot): Restores a snapshot returned by snapshot.
+
+    get_first_cycle(self): Returns the first cycle held by every monitor.
+
     get_margin(self): Returns the length of the longest monitor's name.
 
     display_signals(self): Displays signal trace(s) in the text console.
     """
 
-    def __init__(self, names, devices, network):
+    def __init__(self, names, devices, network, compact=False):
         """Initialise the monitors dictionary and monitor errors."""
         self.names = names
         self.network = network
         self.devices = devices
+        self.compact = compact
 
         # monitors_dictionary stores
-        # {(device_id, output_id): [signal_list]}
+        # {(device_id, output_id): Trace}, each behaving as a signal list
         self.monitors_dictionary = collections.OrderedDict()
+        self.capacity = None  # number of cycles kept by new monitors
+        # Changes whenever monitors are made, removed or reset
+        self.monitors_version = 0
+
+        # Cycles recorded by record_signals, shared by compact traces
+        self.clock = array("q", [0])
+        # watched stores {(device_id, output_id): ChangeTrace} for the traces
+        # sharing the clock, and polled the (output, trace) of the others
+        self.watched = None
+        self.polled = []
+        self.watched_dictionary = None  # what watched was built from
+        self.watched_versions = None
 
         [self.NO_ERROR, self.NOT_OUTPUT,
          self.MONITOR_PRESENT] = self.names.unique_error_codes(3)
 
-    def make_monitor(self, device_id, output_id, cycles_completed=0):
+    def make_monitor(self, device_id, output_id, cycles_completed=0,
+                     capacity=None):
         """Add the specified signal to the monitors dictionary.
 
-        Return NO_ERROR if successful, or the corresponding error if not.
+        The monitor keeps the signals of its last capacity cycles, or those of
+        the capacity attribute if capacity is None. Return NO_ERROR if
+        successful, or the corresponding error if not.
         """
         monitor_device = self.devices.get_device(device_id)
         if monitor_device is None:
@@ -73,13 +661,45 @@ class Monitors:
             return self.MONITOR_PRESENT
         else:
             # If n simulation cycles have been completed before making this
-            # monitor, then initialise the signal trace with an n-length list
-            # of BLANK signals. Otherwise, initialise the trace with an empty
-            # list.
-            self.monitors_dictionary[(device_id, output_id)] = [
-                self.devices.BLANK] * cycles_completed
+            # monitor, then the trace starts with n BLANK signals, which are
+            # not stored.
+            if capacity is None:
+                capacity = self.capacity
+            self.monitors_dictionary[(device_id, output_id)] = \
+                self.make_trace(cycles_completed, capacity)
+            self.monitors_version += 1
             return self.NO_ERROR
 
+    def make_trace(self, start=0, capacity=None):
+        """Return an empty trace starting after start BLANK cycles.
+
+        The trace keeps every signal if capacity is None, or the signals of
+        its last capacity cycles if not. Traces without a capacity are change
+        lists sharing the clock if the monitors are compact.
+        """
+        if capacity is not None:
+            return RingTrace(self.devices.BLANK, capacity, start)
+        if self.compact:
+            return ChangeTrace(self.devices.BLANK, start, self.clock)
+        return Trace(self.devices.BLANK, start)
+
+    def watch(self):
+        """Sort the traces into those recorded on change and the others.
+
+        Change traces sharing the clock are watched, and every other trace is
+        polled, that is, recorded every cycle.
+        """
+        self.watched = {}
+        self.polled = []
+        for output, trace in self.monitors_dictionary.items():
+            if isinstance(trace, ChangeTrace) and trace.clock is self.clock:
+                self.watched[output] = trace
+            else:
+                self.polled.append((output, trace))
+        self.watched_dictionary = self.monitors_dictionary
+        self.watched_versions = (self.monitors_version,
+                                 self.devices.state_version)
+
     def remove_monitor(self, device_id, output_id):
         """Remove the specified signal from the monitors dictionary.
 
@@ -89,6 +709,7 @@ class Monitors:
             return False
         else:
             del self.monitors_dictionary[(device_id, output_id)]
+            self.monitors_version += 1
             return True
 
     def get_monitor_signal(self, device_id, output_id):
@@ -104,12 +725,40 @@ class Monitors:
     def record_signals(self):
         """Record the current signal level for every monitor.
 
-        This function is called at every simulation cycle.
+        This function is called at every simulation cycle. If the monitors
+        are compact, their change traces all grow by one cycle as the clock
+        advances, and only those whose output the engine changed in the last
+        cycle (see Network.changed_outputs) are updated. Every monitor is read
+        if the engine does not report its changes, or if the monitors or the
+        device states have been changed since the last cycle.
         """
-        for device_id, output_id in self.monitors_dictionary:
-            signal_level = self.get_monitor_signal(device_id, output_id)
-            self.monitors_dictionary[(device_id,
-                                      output_id)].append(signal_level)
+        if not self.compact:
+            for device_id, output_id in self.monitors_dictionary:
+                signal_level = self.get_monitor_signal(device_id, output_id)
+                self.monitors_dictionary[(device_id,
+                                          output_id)].append(signal_level)
+            return
+
+        changed_outputs = self.network.changed_outputs
+        if self.watched_dictionary is not self.monitors_dictionary or \
+                self.watched_versions != (self.monitors_version,
+                                          self.devices.state_version):
+            self.watch()
+            changed_outputs = None  # read every monitor once
+        self.clock[0] += 1
+        get_output_signal = self.network.get_output_signal
+        for (device_id, output_id), trace in self.polled:
+            trace.append(get_output_signal(device_id, output_id))
+
+        watched = self.watched
+        if changed_outputs is None:
+            for (device_id, output_id), trace in watched.items():
+                trace.replace_last(get_output_signal(device_id, output_id))
+            return
+        for device, output_id in changed_outputs:
+            trace = watched.get((device.device_id, output_id))
+            if trace is not None:
+                trace.replace_last(device.outputs[output_id])
 
     def get_signal_names(self):
         """Return two signal name lists: monitored and not monitored."""
@@ -133,16 +782,55 @@ class Monitors:
         """Clear the memory of all the monitors.
 
         The list of stored signal levels for each monitor is deleted.
+        The capacity of each monitor is kept.
         """
-        for device_id, output_id in self.monitors_dictionary:
-            self.monitors_dictionary[(device_id, output_id)] = []
+        for output, trace in self.monitors_dictionary.items():
+            self.monitors_dictionary[output] = self.make_trace(
+                capacity=trace.capacity)
+        self.monitors_version += 1
+
+    def snapshot(self):
+        """Return a compact copy of the monitors and their traces.
+
+        The snapshot is a list of (device_id, output_id, trace), with a copy
+        of each Trace, RingTrace or ChangeTrace. Copies of change traces do
+        not follow the clock, so they keep their length as the run goes on.
+        """
+        return [(device_id, output_id, trace.copy())
+                for (device_id, output_id), trace in
+                self.monitors_dictionary.items()]
+
+    def restore(self, snapshot):
+        """Restore the monitors and traces of a snapshot from snapshot.
+
+        The clock is set back to the number of cycles of the snapshot, and
+        the restored change traces follow it again.
+        """
+        lengths = [len(trace) for device_id, output_id, trace in snapshot
+                   if isinstance(trace, ChangeTrace)]
+        if lengths:
+            self.clock[0] = max(lengths)
+        self.monitors_dictionary = collections.OrderedDict(
+            ((device_id, output_id), trace.copy(self.clock)
+             if isinstance(trace, ChangeTrace) else trace.copy())
+            for device_id, output_id, trace in snapshot)
+
+    def get_first_cycle(self):
+        """Return the first cycle whose signal every monitor still holds.
+
+        This is 0 unless a monitor with a capacity has dropped its oldest
+        signals.
+        """
+        return max([trace.first_cycle for trace in
+                    self.monitors_dictionary.values()] or [0])
 
     def get_margin(self):
         """Return the length of the longest monitor's name.
 
         Return None if no signals are being monitored. This is useful for
         finding out how much space to leave after each monitor's name before
-        starting to draw the signal trace.
+        starting to draw the signal trace. If the oldest cycles are no longer
+        held, the "Cycle" label printed above the traces is included.
         """
         length_list = []  # for storing name lengths
         for device_id, output_id in self.monitors_dictionary:
@@ -150,20 +838,30 @@ class Monitors:
                                                         output_id)
             name_length = len(monitor_name)
             length_list.append(name_length)
+        if length_list and self.get_first_cycle() > 0:
+            length_list.append(len("Cycle"))
         if length_list:  # if the list is not empty
             return max(length_list)
         else:
             return None
 
     def display_signals(self):
-        """Display the signal trace(s) in the text console."""
+        """Display the signal trace(s) in the text console.
+
+        If the oldest cycles are no longer held, the traces start at the
+        first cycle every monitor holds, and that cycle is printed above them.
+        """
         margin = self.get_margin()
+        first_cycle = self.get_first_cycle()
+        if first_cycle > 0:
+            print("Cycle" + (margin - len("Cycle")) * " ", end=": ")
+            print(first_cycle)
         for device_id, output_id in self.monitors_dictionary:
             monitor_name = self.devices.get_signal_name(device_id, output_id)
             name_length = len(monitor_name)
             signal_list = self.monitors_dictionary[(device_id, output_id)]
             print(monitor_name + (margin - name_length) * " ", end=": ")
-            for signal in signal_list:
+            for signal in signal_list[first_cycle:]:
                 if signal == self.devices.HIGH:
                     print("-", end="")
                 if signal == self.devices.LOW:
@@ -8,8 +8,6 @@ Classes
 Names - maps variable names and string names to unique integers.
 """
 
-from collections import OrderedDict
-
 
 class Names:
     """Map variable names and string names to unique integers.
@@ -17,6 +15,9 @@ class Names:
     This class deals with storing grammatical keywords and user-defined words,
     and their corresponding name IDs, which are internal indexing integers. It
     provides functions for looking up either the name ID or the name string.
+    Names are interned incrementally: name_map maps each string to its ID and
+    names_list holds each string at the index of its ID, so lookups in both
+    directions take constant time.
     It also keeps track of the number of error codes defined by other classes,
     and allocates new, unique error codes on demand.
 
@@ -32,6 +33,9 @@ class Names:
     query(self, name_string): Returns the corresponding name ID for the
                         name string. Returns None if the string is not present.
 
+    intern(self, name_string): Returns the name ID for the name string. Adds
+                               the name if not already present.
+
     lookup(self, name_string_list): Returns a list of name IDs for each
                         name string. Adds a name if not already present.
 
@@ -43,7 +47,8 @@ class Names:
         """Initialise names list."""
         self.error_code_count = 0  # how many error codes have been declared
         self.name_count = 0
-        self.name_map = {}
+        self.name_map = {}  # stores {name_string: name_id}
+        self.names_list = []  # stores name_string at index name_id
 
     def unique_error_codes(self, num_error_codes):
         """Return a list of unique integer error codes."""
@@ -65,39 +70,39 @@ class Names:
         except KeyError:
             return None
 
+    def intern(self, name_string):
+        """Return the name ID for name_string.
+
+        If the name string is not present in the names list, add it.
+        """
+        name_id = self.name_map.get(name_string)
+        if name_id is None:
+            if not isinstance(name_string, str):
+                raise TypeError(
+                    "Argument of Names.intern must be a string")
+            name_id = self.name_count
+            self.name_map[name_string] = name_id
+            self.names_list.append(name_string)
+            self.name_count += 1
+        return name_id
+
     def lookup(self, name_list):
         """Return a list of name IDs for each name string in name_string_list.
 
         If the name string is not present in the names list, add it.
         """
-        # make sure all items in name list are strings
+        # make sure all items in name list are strings before adding any
         if not all(isinstance(item, str) for item in name_list):
             raise TypeError(
                 "All items in argument of Names.lookup must be strings")
 
-        # Filter duplicate elements from name_list
-        name_list_filtered = list(OrderedDict.fromkeys(name_list))
-        # Create list of all names that are not in name_map
-        new_names = [name for name in name_list_filtered
-                     if name not in self.name_map.keys()]
-
-        # create map of new names to ids
-        new_names_map = {new_name: i + self.name_count
-                         for i, new_name in enumerate(new_names)}
-        self.name_count += len(new_names)
-
-        # combine new and existing name maps
-        self.name_map = {**self.name_map, **new_names_map}
-
-        # find ids of names and return them
-        return [self.name_map[name] for name in name_list]
+        return [self.intern(name) for name in name_list]
 
     def get_name_string(self, query_id):
         """Return the corresponding name string for name_id.
 
         If the name_id is not an index in the names list, return None.
         """
-        # use a generator to find name string matching id,
-        # None at end means None is returned if no match found
-        return next((name for name, name_id in self.name_map.items()
-                     if name_id == query_id), None)
+        if isinstance(query_id, int) and 0 <= query_id < self.name_count:
+            return self.names_list[query_id]
+        return None
@@ -4,8 +4,82 @@ Used in the Logic Simulator project to add and connect devices together.
 
 Classes
 --------
+Oscillation - stores the diagnosis of an oscillating network.
+RunChunk - stores the signals recorded in part of a run.
 Network - builds and executes the network.
 """
+import collections
+import time
+
+from monitors import Trace
+from clocks import ClockScheduler
+from events import EventEngine
+from levels import LevelizedEngine, find_loops
+from compiled import CompiledEngine
+from vectorized import VectorizedEngine
+from partitioned import PartitionedEngine
+
+
+class Oscillation:
+    """Store the diagnosis of an oscillating network.
+
+    Parameters
+    ----------
+    devices: list of the IDs of the devices whose outputs keep changing.
+    loops: list of the feedback loops (lists of device IDs) those devices
+           belong to.
+    period: number of settle iterations after which the signals repeat, or
+            None if they did not repeat while diagnosing.
+
+    Public methods
+    --------------
+    No public methods.
+    """
+
+    def __init__(self, devices, loops, period):
+        """Initialise the diagnosis."""
+        self.devices = devices
+        self.loops = loops
+        self.period = period
+
+
+class RunChunk:
+    """Store the signals recorded in part of a run.
+
+    Parameters
+    ----------
+    samples: ordered dictionary of {(device_id, output_id): monitors.Trace}
+             with the signals of every monitor in this part of the run.
+    first_cycle: number of cycles of the run completed before this part.
+    cycles_completed: number of cycles of the run completed so far.
+    total_cycles: number of cycles the run was asked for.
+    settled: False if the run stopped because the network oscillates.
+    elapsed: seconds spent executing the network in the run so far.
+
+    Public methods
+    --------------
+    No public methods.
+    """
+
+    def __init__(self, samples, first_cycle, cycles_completed, total_cycles,
+                 settled, elapsed):
+        """Initialise the chunk and work out the progress and throughput."""
+        self.samples = samples
+        self.first_cycle = first_cycle
+        self.cycles_completed = cycles_completed
+        self.total_cycles = total_cycles
+        self.settled = settled
+        self.elapsed = elapsed
+
+        # Fraction of the run completed, and cycles executed per second
+        if total_cycles:
+            self.progress = cycles_completed / total_cycles
+        else:
+            self.progress = 1.0
+        if elapsed > 0:
+            self.throughput = cycles_completed / elapsed
+        else:
+            self.throughput = None
 
 
 class Network:
@@ -15,6 +89,37 @@ class Network:
     in the network, getting information about connections, and executing all
     the devices in the network.
 
+    The network can be executed by different engines, chosen with
+    set_engine(). The SWEEP engine executes every device on every settle
+    iteration. The EVENT engine (see events.EventEngine) only executes the
+    devices whose inputs have changed, and gives identical results. The
+    LEVELIZED engine (see levels.LevelizedEngine) executes the devices once
+    each in dependency order. The VECTORIZED engine
+    (see vectorized.VectorizedEngine) does the same, but executes whole levels
+    of gates at once with NumPy, and is only available if NumPy is installed.
+    The COMPILED engine (see compiled.CompiledEngine) turns the levelized
+    schedule into a generated Python function, rebuilt when the network
+    changes. The PARTITIONED engine (see partitioned.PartitionedEngine) splits
+    that schedule between several processes.
+
+    The network also keeps an index of its feedback loops, the strongly
+    connected components of the graph of connections between devices. The
+    DATA input of a D-type is left out of this graph, as it is only sampled at
+    its old value on a clock edge. The LEVELIZED, VECTORIZED, COMPILED and
+    PARTITIONED engines use the index to execute everything outside loops
+    once, in order, and hand the cycles in which a loop needs executing to
+    the EVENT engine, so loops settle exactly as with the SWEEP engine.
+
+    Engines give up on a cycle after get_iteration_limit() settle iterations.
+    The limit is derived from the logic depth of the network unless
+    iteration_limit is set. When a network fails to settle, execute_network
+    sweeps it a little further to find out which devices oscillate, and with
+    what period, and stores the result in oscillation.
+
+    Every engine except SWEEP updates the clocks with a clocks.ClockScheduler,
+    which only visits clocks on the cycles they change. The clock counters of
+    the devices are then only up to date after sync_clocks().
+
     Parameters
     ----------
     devices - instance of the devices.Devices() class.
@@ -44,6 +149,8 @@ class Network:
 
     execute_switch(self, device_id): Simulates a switch press.
 
+    get_gate_rule(self, device_kind): Returns the (x, y) rule of a gate kind.
+
     execute_gate(self, device_id, x=None, y=None): Simulates a logic gate and
                                               updates its output signal value.
 
@@ -56,8 +163,65 @@ class Network:
     update_clocks(self): If it is time to do so, sets clock signals to RISING
                          or FALLING.
 
+    sync_clocks(self): Brings the clock counters of the devices up to date.
+
+    snapshot(self, monitors=None): Returns a compact copy of the simulation
+                                   state and monitor traces.
+
+    restore(self, snapshot, monitors=None): Restores a snapshot returned by
+                                            snapshot.
+
+    get_execution_order(self): Returns the list of device IDs in the order
+                               the devices are executed.
+
+    get_loop_index(self): Returns the execution order, the dependency graph
+                          and its strongly connected components.
+
+    get_components(self): Returns the strongly connected components of the
+                          network in dependency order.
+
+    get_loops(self): Returns the feedback loops in the network.
+
+    get_loop(self, device_id): Returns the feedback loop containing the
+                               device.
+
+    get_subcircuits(self): Returns the groups of devices that are not
+                           connected to each other.
+
+    get_logic_depth(self): Returns the largest number of devices on any path
+                           through the network.
+
+    get_iteration_limit(self): Returns the number of settle iterations allowed
+                               in one simulation cycle.
+
+    diagnose_oscillation(self): Returns an Oscillation describing the devices
+                                that do not settle.
+
+    execute_device(self, device_id): Executes the device according to its
+                                     kind.
+
+    set_engine(self, engine): Selects the engine used by execute_network.
+
     execute_network(self): Executes all the devices in the network for one
                            simulation cycle.
+
+    run(self, cycles, monitors=None): Executes the network for a number of
+                                      cycles, recording the monitors, and
+                                      returns (settled, cycles completed).
+
+    record_run(self, cycles, traces): Executes the network for a number of
+                                      cycles, recording the outputs in
+                                      traces.
+
+    iter_run(self, cycles, monitors=None, chunk=1000): Executes the network
+                                      for a number of cycles, yielding a
+                                      RunChunk every chunk cycles.
+
+    build_sweep_plan(self): Builds the list of device executions the sweep
+                            engine calls.
+
+    execute_sweep(self): Executes all the devices in the network once per
+                         settle iteration, for one simulation cycle.
     """
 
     def __init__(self, names, devices):
@@ -70,6 +234,53 @@ class Network:
          self.DEVICE_ABSENT] = self.names.unique_error_codes(6)
         self.steady_state = True  # for checking if signals have settled
 
+        # Number of iterations to wait for the signals to settle before
+        # declaring the network unstable. If None, get_iteration_limit()
+        # derives it from the logic depth of the network.
+        self.iteration_limit = None
+        # Most settle iterations diagnose_oscillation() looks for a period in
+        self.diagnosis_limit = 1000
+        self.oscillation = None  # diagnosis of the last failed cycle
+        # List of the (device, output_id) the engine changed in the last
+        # cycle, or None if the engine does not report its changes
+        self.changed_outputs = None
+
+        # Changes whenever a connection is made or removed, so that engines
+        # know when their cached view of the network is out of date
+        self.connection_version = 0
+
+        self.engine_types = [self.SWEEP, self.EVENT, self.LEVELIZED,
+                             self.VECTORIZED, self.COMPILED,
+                             self.PARTITIONED] = range(6)
+        self.engine = self.SWEEP
+        self.event_engine = EventEngine(self)
+        self.levelized_engine = LevelizedEngine(self)
+        self.vectorized_engine = VectorizedEngine(self)
+        self.compiled_engine = CompiledEngine(self)
+        self.partitioned_engine = PartitionedEngine(self)
+        self.clock_scheduler = ClockScheduler(self)
+
+        # The sweep engine's list of (function, arguments) to call for every
+        # device, and the topology version it was built for
+        self.sweep_plan = []
+        self.sweep_plan_version = None
+
+        # The loop index: device IDs in execution order, successors[rank] is
+        # the sorted list of ranks that depend on the device at rank, and
+        # components is the list of strongly connected components (lists of
+        # ranks) in dependency order
+        self.loop_order = []
+        self.successors = []
+        self.components = []
+        self.component_numbers = {}  # stores {device_id: component number}
+        self.logic_depth = None
+        self.loop_version = None
+
+        # Lists of device IDs connected to each other, directly or not, and
+        # the (topology, connection) version they were found for
+        self.subcircuits = []
+        self.subcircuit_version = None
+
     def get_connected_output(self, device_id, input_id):
         """Return the output connected to the given input.
 
@@ -130,6 +341,7 @@ class Network:
                 # Make connection
                 first_device.inputs[first_port_id] = (second_device_id,
                                                       second_port_id)
+                self.connection_version += 1
                 error_type = self.NO_ERROR
             else:  # second_port_id is not a valid input or output port
                 error_type = self.PORT_ABSENT
@@ -145,6 +357,7 @@ class Network:
                 else:
                     second_device.inputs[second_port_id] = (first_device_id,
                                                             first_port_id)
+                    self.connection_version += 1
                     error_type = self.NO_ERROR
             else:
                 error_type = self.PORT_ABSENT
@@ -157,6 +370,7 @@ class Network:
     def remove_connection(self, first_device_id, first_port_id,
                           second_device_id, second_port_id):
         """Disconnect the first device from the second device."""
+        self.connection_version += 1
         first_device = self.devices.get_device(first_device_id)
         second_device = self.devices.get_device(second_device_id)
 
@@ -228,6 +442,25 @@ class Network:
             device.outputs[None] = updated_signal
             return True
 
+    def get_gate_rule(self, device_kind):
+        """Return the (x, y) rule used by execute_gate for a gate kind.
+
+        If all the inputs of the gate are x, its output is y, else its output
+        is the inverse of y. XOR gates have the rule (None, None). Return None
+        if device_kind is not a gate.
+        """
+        if device_kind == self.devices.AND:
+            return (self.devices.HIGH, self.devices.HIGH)
+        elif device_kind == self.devices.OR:
+            return (self.devices.LOW, self.devices.LOW)
+        elif device_kind == self.devices.NAND:
+            return (self.devices.HIGH, self.devices.LOW)
+        elif device_kind in [self.devices.NOR, self.devices.NOT]:
+            return (self.devices.LOW, self.devices.HIGH)
+        elif device_kind == self.devices.XOR:
+            return (None, None)
+        return None
+
     def execute_gate(self, device_id, x=None, y=None):
         """Simulate a logic gate and update its output signal value.
 
@@ -345,6 +578,9 @@ class Network:
 
     def update_clocks(self):
         """If it is time to do so, set clock signals to RISING or FALLING."""
+        if self.engine != self.SWEEP:
+            self.clock_scheduler.update_clocks()
+            return
         clock_devices = self.devices.find_devices(self.devices.CLOCK)
         for device_id in clock_devices:
             device = self.devices.get_device(device_id)
@@ -358,66 +594,457 @@ class Network:
                     device.outputs[None] = self.devices.RISING
             device.clock_counter += 1
 
+    def sync_clocks(self):
+        """Bring the clock counters of the devices up to date."""
+        self.clock_scheduler.sync()
+
+    def snapshot(self, monitors=None):
+        """Return a compact copy of the simulation state and monitor traces.
+
+        The snapshot covers the signals, clock counters, D-type memories and
+        switch states of every device (see Devices.snapshot()), and the traces
+        of monitors, if given.
+        """
+        self.sync_clocks()
+        if monitors is None:
+            return (self.devices.snapshot(), None)
+        return (self.devices.snapshot(), monitors.snapshot())
+
+    def restore(self, snapshot, monitors=None):
+        """Restore a snapshot returned by snapshot.
+
+        The monitors are only restored if they are given and were included
+        in the snapshot. Return True if successful, or False if devices or
+        ports have been added since the snapshot was taken.
+        """
+        (devices_snapshot, monitors_snapshot) = snapshot
+        if not self.devices.restore(devices_snapshot):
+            return False
+        if monitors is not None and monitors_snapshot is not None:
+            monitors.restore(monitors_snapshot)
+        return True
+
+    def get_execution_order(self):
+        """Return the list of device IDs in the order they are executed.
+
+        Switches come first, then D-types (before clocks, to catch the rising
+        edge of the clock), clocks, and the gates kind by kind.
+        """
+        execution_order = []
+        for device_kind in [self.devices.SWITCH, self.devices.D_TYPE,
+                            self.devices.CLOCK, self.devices.AND,
+                            self.devices.OR, self.devices.NAND,
+                            self.devices.NOR, self.devices.XOR,
+                            self.devices.NOT]:
+            execution_order.extend(self.devices.find_devices(device_kind))
+        return execution_order
+
+    def get_loop_index(self):
+        """Return the execution order, dependency graph and its components.
+
+        Returns (order, successors, components): order is the list of device
+        IDs from get_execution_order(), and devices are referred to by their
+        rank in it. successors[rank] is the sorted list of ranks of the
+        devices with an input connected to the device at rank (not counting
+        D-type DATA inputs). components is the list of strongly connected
+        components, each a sorted list of ranks, in dependency order. The
+        index is rebuilt when devices or connections change.
+        """
+        version = (self.devices.topology_version, self.connection_version)
+        if self.loop_version == version:
+            return (self.loop_order, self.successors, self.components)
+
+        order = self.get_execution_order()
+        ranks = {device_id: rank for rank, device_id in enumerate(order)}
+        successors = [set() for _ in order]
+        for rank, device_id in enumerate(order):
+            device = self.devices.get_device(device_id)
+            for input_id, connected_output in device.inputs.items():
+                if connected_output is None:
+                    continue
+                if device.device_kind == self.devices.D_TYPE and \
+                        input_id == self.devices.DATA_ID:
+                    continue  # sampled at its old value, not a dependency
+                source_rank = ranks.get(connected_output[0])
+                if source_rank is not None:
+                    successors[source_rank].add(rank)
+
+        self.loop_order = order
+        self.successors = [sorted(targets) for targets in successors]
+        self.components = find_loops(len(order), self.successors)
+        self.component_numbers = {}
+        for number, component in enumerate(self.components):
+            for rank in component:
+                self.component_numbers[order[rank]] = number
+        self.logic_depth = None
+        self.loop_version = version
+        return (self.loop_order, self.successors, self.components)
+
+    def get_components(self):
+        """Return the strongly connected components of the network.
+
+        Each component is a list of device IDs. Every device only depends on
+        devices in earlier components, or in its own component if it is part
+        of a feedback loop.
+        """
+        (order, successors, components) = self.get_loop_index()
+        return [[order[rank] for rank in component]
+                for component in components]
+
+    def get_loops(self):
+        """Return the list of feedback loops in the network.
+
+        Each loop is a list of device IDs, and is a strongly connected
+        component with more than one device, or a device connected to itself.
+        """
+        (order, successors, components) = self.get_loop_index()
+        return [[order[rank] for rank in component]
+                for component in components
+                if len(component) > 1 or component[0] in
+                successors[component[0]]]
+
+    def get_loop(self, device_id):
+        """Return the feedback loop containing the device.
+
+        Return None if the device ID is invalid or the device is not part of a
+        feedback loop.
+        """
+        (order, successors, components) = self.get_loop_index()
+        number = self.component_numbers.get(device_id)
+        if number is None:
+            return None
+        component = components[number]
+        if len(component) > 1 or component[0] in successors[component[0]]:
+            return [order[rank] for rank in component]
+        return None
+
+    def get_subcircuits(self):
+        """Return the groups of devices that are not connected to each other.
+
+        These are the connected components of the network, following every
+        connection in either direction, D-type DATA inputs included. Each is
+        a list of device IDs in the order the devices were made, and the
+        subcircuits are in the order of their first devices. They are found
+        again when devices or connections change.
+        """
+        version = (self.devices.topology_version, self.connection_version)
+        if self.subcircuit_version == version:
+            return self.subcircuits
+
+        # neighbours stores {device_id: [device_id, ...]} in both directions
+        neighbours = {}
+        for device in self.devices.devices_list:
+            neighbours.setdefault(device.device_id, [])
+            for connected_output in device.inputs.values():
+                if connected_output is None:
+                    continue
+                neighbours[device.device_id].append(connected_output[0])
+                neighbours.setdefault(connected_output[0], []).append(
+                    device.device_id)
+
+        numbers = {}  # stores {device_id: subcircuit number}
+        count = 0
+        for device in self.devices.devices_list:
+            if device.device_id in numbers:
+                continue
+            number = count
+            count += 1
+            numbers[device.device_id] = number
+            stack = [device.device_id]
+            while stack:
+                for neighbour in neighbours[stack.pop()]:
+                    if neighbour not in numbers:
+                        numbers[neighbour] = number
+                        stack.append(neighbour)
+
+        self.subcircuits = [[] for number in range(count)]
+        for device in self.devices.devices_list:
+            self.subcircuits[numbers[device.device_id]].append(
+                device.device_id)
+        self.subcircuit_version = version
+        return self.subcircuits
+
+    def get_logic_depth(self):
+        """Return the largest number of devices on any path in the network.
+
+        Paths follow the dependency graph of get_loop_index(), and a feedback
+        loop counts as many devices as it contains.
+        """
+        (order, successors, components) = self.get_loop_index()
+        if self.logic_depth is not None:
+            return self.logic_depth
+
+        # depths[number] is the depth of the path ending with that component
+        depths = [0] * len(components)
+        for number, component in enumerate(components):
+            depths[number] += len(component)
+            for rank in component:
+                for successor in successors[rank]:
+                    target = self.component_numbers[order[successor]]
+                    if target != number:
+                        depths[target] = max(depths[target], depths[number])
+        self.logic_depth = max(depths, default=0)
+        return self.logic_depth
+
+    def get_iteration_limit(self):
+        """Return the number of settle iterations allowed in one cycle.
+
+        This is iteration_limit if it is set. Otherwise, a change can take up
+        to two iterations to pass through each device (moving through RISING
+        or FALLING), so the limit is twice the logic depth, plus two
+        iterations to confirm the network has settled.
+        """
+        if self.iteration_limit is not None:
+            return self.iteration_limit
+        return 2 * self.get_logic_depth() + 2
+
+    def diagnose_oscillation(self):
+        """Return an Oscillation describing the devices that do not settle.
+
+        The failed cycle is carried on from the signals it was left at, one
+        settle iteration at a time, by the engine that ran it: the sweep
+        engine executes every device, and the other engines, which settle
+        loops with the event engine, execute the devices the event engine
+        still had pending. The state of every device is hashed after each
+        iteration, until a state repeats or diagnosis_limit iterations have
+        passed. The devices whose outputs change in that time are the
+        oscillating devices. The device states are restored afterwards.
+        Return None if no device keeps changing, or if a device cannot be
+        executed.
+        """
+        devices = self.devices
+        if self.engine == self.SWEEP and \
+                self.sweep_plan_version != devices.topology_version:
+            self.build_sweep_plan()
+        self.sync_clocks()
+        saved_state = devices.get_state()
+        pending = set(self.event_engine.unsettled)
+
+        seen = {}  # stores {state: iteration it was reached at}
+        history = []
+        period = None
+        for iteration in range(self.diagnosis_limit):
+            state = devices.get_state()
+            if state in seen:
+                period = iteration - seen[state]
+                history = history[seen[state]:]
+                break
+            seen[state] = iteration
+            history.append(state)
+            if self.engine == self.SWEEP:
+                executed = all(execute(*arguments)
+                               for execute, arguments in self.sweep_plan)
+            else:
+                pending = self.event_engine.execute_iteration(pending, set())
+                executed = pending is not None
+            if not executed:
+                devices.set_state(saved_state)
+                return None
+        devices.set_state(saved_state)
+        self.steady_state = False
+
+        oscillating = [device.device_id for position, device in
+                       enumerate(devices.devices_list)
+                       if any(state[position] != history[0][position]
+                              for state in history)]
+        if not oscillating:
+            return None
+        loops = []
+        for device_id in oscillating:
+            loop = self.get_loop(device_id)
+            if loop is not None and loop not in loops:
+                loops.append(loop)
+        return Oscillation(oscillating, loops, period)
+
+    def execute_device(self, device_id):
+        """Execute the device according to its kind.
+
+        Return True if successful.
+        """
+        device_kind = self.devices.get_device(device_id).device_kind
+        if device_kind == self.devices.SWITCH:
+            return self.execute_switch(device_id)
+        elif device_kind == self.devices.D_TYPE:
+            return self.execute_d_type(device_id)
+        elif device_kind == self.devices.CLOCK:
+            return self.execute_clock(device_id)
+        elif device_kind in self.devices.gate_types:
+            (x, y) = self.get_gate_rule(device_kind)
+            return self.execute_gate(device_id, x, y)
+        return False
+
+    def set_engine(self, engine):
+        """Select the engine used by execute_network.
+
+        Return True if successful.
+        """
+        if engine not in self.engine_types:
+            return False
+        if engine == self.VECTORIZED and \
+                not self.vectorized_engine.is_available():
+            return False
+        if engine != self.PARTITIONED:
+            self.partitioned_engine.stop()
+        self.sync_clocks()
+        # Other engines may have changed outputs these engines reuse
+        for levelized_engine in [self.levelized_engine,
+                                 self.vectorized_engine, self.compiled_engine,
+                                 self.partitioned_engine]:
+            levelized_engine.settled_version = None
+        self.event_engine.evaluate_all = True
+        self.engine = engine
+        return True
+
     def execute_network(self):
         """Execute all the devices in the network for one simulation cycle.
 
+        Return True if successful and the network does not oscillate. If the
+        network oscillates, oscillation holds the diagnosis.
+        """
+        self.oscillation = None
+        self.changed_outputs = None
+        if self.engine == self.EVENT:
+            settled = self.event_engine.execute_network()
+        elif self.engine == self.LEVELIZED:
+            settled = self.levelized_engine.execute_network()
+        elif self.engine == self.VECTORIZED:
+            settled = self.vectorized_engine.execute_network()
+        elif self.engine == self.COMPILED:
+            settled = self.compiled_engine.execute_network()
+        elif self.engine == self.PARTITIONED:
+            settled = self.partitioned_engine.execute_network()
+        else:
+            settled = self.execute_sweep()
+
+        if not settled and self.check_network():
+            # Every input is connected, so the network must be oscillating
+            self.oscillation = self.diagnose_oscillation()
+        return settled
+
+    def run(self, cycles, monitors=None):
+        """Execute the network for a number of cycles, recording the monitors.
+
+        The traces in monitors.monitors_dictionary are extended by the
+        number of cycles up front and filled in as the cycles are executed,
+        as Monitors.record_signals() would. Return (settled,
+        cycles_completed): settled is False if the network oscillates in a
+        cycle, in which case the traces only cover the cycles completed
+        before it. Compact monitors are recorded with
+        Monitors.record_signals() instead, which only touches the monitors
+        whose outputs change.
+        """
+        if monitors is None:
+            return self.record_run(cycles, {})
+        if monitors.compact:
+            for cycle in range(cycles):
+                if not self.execute_network():
+                    return (False, cycle)
+                monitors.record_signals()
+            return (True, cycles)
+        return self.record_run(cycles, monitors.monitors_dictionary)
+
+    def record_run(self, cycles, traces):
+        """Execute the network for a number of cycles, recording the outputs.
+
+        traces is a dictionary of {(device_id, output_id): [signal_list]},
+        and every list (or monitors.Trace) is extended by the signal of its
+        output after each cycle. Return (settled, cycles_completed), as run()
+        does.
+        """
+        execute_network = self.execute_network
+        recorded = []  # list of (trace, outputs, output_id, offset)
+        # list of (trace, outputs, output_id) for ring and change traces
+        appended = []
+        for (device_id, output_id), trace in traces.items():
+            outputs = self.devices.get_device(device_id).outputs
+            if isinstance(trace, Trace):
+                if type(trace) is not Trace:
+                    # Ring and change traces do not hold one signal per
+                    # cycle, so they are appended to rather than extended
+                    appended.append((trace, outputs, output_id))
+                    continue
+                trace = trace.signals  # fill in the array directly
+            recorded.append((trace, outputs, output_id, len(trace)))
+            trace.extend([self.devices.BLANK] * cycles)
+
+        for cycle in range(cycles):
+            if not execute_network():
+                for trace, outputs, output_id, offset in recorded:
+                    del trace[offset + cycle:]
+                return (False, cycle)
+            for trace, outputs, output_id, offset in recorded:
+                trace[offset + cycle] = outputs[output_id]
+            for trace, outputs, output_id in appended:
+                trace.append(outputs[output_id])
+        return (True, cycles)
+
+    def iter_run(self, cycles, monitors=None, chunk=1000):
+        """Execute the network for a number of cycles, a chunk at a time.
+
+        After every chunk cycles, yield a RunChunk with the signals of the
+        monitors in those cycles, and the progress and throughput of the run
+        so far. The monitors themselves are not extended, so memory only
+        grows with the chunk size. The run is paused between chunks until the
+        next one is asked for, and the consumer stops it early by no longer
+        iterating (or closing the generator). The run also stops after a
+        chunk in which the network oscillates.
+        """
+        if monitors is None:
+            outputs = []
+        else:
+            outputs = list(monitors.monitors_dictionary)
+        cycles_completed = 0
+        elapsed = 0.0
+        while cycles_completed < cycles:
+            samples = collections.OrderedDict(
+                [(output, Trace(self.devices.BLANK)) for output in outputs])
+            start_time = time.perf_counter()
+            (settled, completed) = self.record_run(
+                min(chunk, cycles - cycles_completed), samples)
+            elapsed += time.perf_counter() - start_time
+            first_cycle = cycles_completed
+            cycles_completed += completed
+            yield RunChunk(samples, first_cycle, cycles_completed, cycles,
+                           settled, elapsed)
+            if not settled:
+                return
+
+    def build_sweep_plan(self):
+        """Build the list of device executions the sweep engine calls."""
+        self.sweep_plan = []
+        for device_id in self.get_execution_order():
+            device_kind = self.devices.get_device(device_id).device_kind
+            if device_kind == self.devices.SWITCH:
+                self.sweep_plan.append((self.execute_switch, (device_id,)))
+            elif device_kind == self.devices.D_TYPE:
+                self.sweep_plan.append((self.execute_d_type, (device_id,)))
+            elif device_kind == self.devices.CLOCK:
+                self.sweep_plan.append((self.execute_clock, (device_id,)))
+            else:
+                (x, y) = self.get_gate_rule(device_kind)
+                self.sweep_plan.append((self.execute_gate, (device_id, x, y)))
+        self.sweep_plan_version = self.devices.topology_version
+
+    def execute_sweep(self):
+        """Execute every device on every settle iteration for one cycle.
+
         Return True if successful and the network does not oscillate.
         """
-        clock_devices = self.devices.find_devices(self.devices.CLOCK)
-        switch_devices = self.devices.find_devices(self.devices.SWITCH)
-        d_type_devices = self.devices.find_devices(self.devices.D_TYPE)
-        and_devices = self.devices.find_devices(self.devices.AND)
-        or_devices = self.devices.find_devices(self.devices.OR)
-        nand_devices = self.devices.find_devices(self.devices.NAND)
-        nor_devices = self.devices.find_devices(self.devices.NOR)
-        xor_devices = self.devices.find_devices(self.devices.XOR)
-        not_devices = self.devices.find_devices(self.devices.NOT)
+        if self.sweep_plan_version != self.devices.topology_version:
+            self.build_sweep_plan()
+        sweep_plan = self.sweep_plan
 
         # This sets clock signals to RISING or FALLING, where necessary
         self.update_clocks()
 
-        # Number of iterations to wait for the signals to settle before
-        # declaring the network unstable
-        iteration_limit = 20
-
+        iteration_limit = self.get_iteration_limit()
         iterations = 0
         while iterations < iteration_limit:
             iterations += 1
             self.steady_state = True
-
-            for device_id in switch_devices:  # execute switch devices
-                if not self.execute_switch(device_id):
-                    return False
-            # Execute D-type devices before clocks to catch the rising edge of
-            # the clock
-            for device_id in d_type_devices:  # execute DTYPE devices
-                if not self.execute_d_type(device_id):
-                    return False
-            for device_id in clock_devices:  # complete clock executions
-                if not self.execute_clock(device_id):
-                    return False
-            for device_id in and_devices:  # execute AND gate devices
-                if not self.execute_gate(device_id, self.devices.HIGH,
-                                         self.devices.HIGH):
-                    return False
-            for device_id in or_devices:  # execute OR gate devices
-                if not self.execute_gate(device_id, self.devices.LOW,
-                                         self.devices.LOW):
-                    return False
-            for device_id in nand_devices:  # execute NAND gate devices
-                if not self.execute_gate(device_id, self.devices.HIGH,
-                                         self.devices.LOW):
-                    return False
-            for device_id in nor_devices:  # execute NOR gate devices
-                if not self.execute_gate(device_id, self.devices.LOW,
-                                         self.devices.HIGH):
-                    return False
-            for device_id in xor_devices:  # execute XOR devices
-                if not self.execute_gate(device_id, None, None):
-                    return False
-            for device_id in not_devices:  # execute NOT devices
-                if not self.execute_gate(device_id, self.devices.LOW,
-                                         self.devices.HIGH):
+            # Devices are executed in the order of get_execution_order()
+            for execute, arguments in sweep_plan:
+                if not execute(*arguments):
                     return False
             if self.steady_state:
                 break
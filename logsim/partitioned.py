@@ -0,0 +1,427 @@
+"""Execute the network in several processes at once.
+
+Used in the Logic Simulator project to spread the simulation of very large
+networks over several processor cores.
+
+Classes
+-------
+PartitionedEngine - executes partitions of the network in worker processes.
+
+Functions
+---------
+find_changes - returns the slots whose signals changed in a cycle.
+run_worker - executes one partition of the network for every cycle.
+"""
+import ctypes
+import math
+import multiprocessing
+import os
+
+from compiled import CompiledEngine
+
+
+def find_changes(signals, starts, first_slot, end_slot, chunk_size=4096):
+    """Return the slots from first_slot to end_slot whose signals changed.
+
+    The signals are compared a chunk at a time, and only the chunks that
+    differ are looked at slot by slot.
+    """
+    signal_bytes = memoryview(signals).cast("B")
+    start_bytes = memoryview(starts).cast("B")
+    changed = []
+    for chunk_start in range(first_slot, end_slot, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, end_slot)
+        if signal_bytes[chunk_start:chunk_end].tobytes() != \
+                start_bytes[chunk_start:chunk_end].tobytes():
+            changed.extend([slot for slot in range(chunk_start, chunk_end)
+                            if signals[slot] != starts[slot]])
+    return changed
+
+
+def run_worker(sources, signals, starts, memories, barrier, connection,
+               first_slot, end_slot):
+    """Execute one partition of the network for every cycle.
+
+    sources holds the source of the function that executes the partition in
+    each segment of the cycle, or None if it has nothing to do in a segment.
+    Every worker waits at the barrier between segments. The worker receives
+    True from the connection for each cycle, or None to stop, and sends back
+    the slots it changed.
+    """
+    functions = []
+    for source in sources:
+        if source is None:
+            functions.append(None)
+            continue
+        namespace = {}
+        exec(compile(source, "<partition>", "exec"), namespace)
+        functions.append(namespace["execute_segment"])
+
+    while connection.recv() is not None:
+        for segment, function in enumerate(functions):
+            if function is not None:
+                function(signals, starts, memories)
+            if segment < len(functions) - 1:
+                barrier.wait()
+        connection.send(find_changes(signals, starts, first_slot, end_slot))
+    connection.close()
+
+
+class PartitionedEngine(CompiledEngine):
+    """Execute partitions of the network in worker processes.
+
+    The blocks of the levelized schedule (see levels.LevelizedEngine) are
+    split between a number of partitions: one for this process and one for
+    each of partitions - 1 child processes. There is one partition for every
+    partition_size devices, but no more than workers (by default the number
+    of processor cores), as a smaller partition costs more in barriers and
+    messages than it saves. A network too small for two partitions is
+    executed by the compiled engine in this process instead.
+
+    Each level is balanced between the workers, and each block goes to the
+    worker that computes most of its inputs, as long as that keeps the level
+    balanced, so that few connections cross between partitions. A loop
+    always stays in one partition.
+
+    Every signal is held in an array shared by all the processes. The cycle
+    is cut into segments, and the workers wait for each other at a barrier
+    between two segments. A new segment only starts where a device reads a
+    signal another worker computed since the last barrier, so the fewer
+    connections are cut, the fewer barriers there are. Each worker executes
+    its partition with generated code, as in compiled.CompiledEngine, and
+    gives the same results as LevelizedEngine. A cycle in which a loop or a
+    D-type needs executing is settled by the event engine in this process,
+    as in LevelizedEngine.
+
+    Switches and clocks are set by this process before the cycle starts, and
+    the outputs that change are copied back into the Device objects after it
+    ends. The worker processes are started when the engine is built, and
+    stopped by stop() or when the network is rebuilt.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    partition(self): Returns the worker that executes each block of the
+                     schedule.
+
+    build(self): Builds the partitions and starts the worker processes.
+
+    generate_segment(self, worker, segment): Returns the source of the
+                                             function that executes a
+                                             partition in a segment.
+
+    load_state(self): Copies the signals and D-type memories of the devices
+                      into the shared arrays.
+
+    stop(self): Stops the worker processes.
+
+    execute_network(self): Executes every device in the network once, in
+                           levelized order, for one simulation cycle.
+    """
+
+    def __init__(self, network):
+        """Initialise the engine with no worker processes."""
+        super().__init__(network)
+        self.workers = os.cpu_count() or 1  # most partitions
+        self.partition_size = 5000  # fewest devices worth a partition
+        self.partitions = 1  # number of partitions of the network
+        # A level is only split between workers if it has more devices than
+        # this, as smaller levels are not worth a barrier
+        self.grain = 64
+        self.balance_tolerance = 0.1  # how far above average a worker goes
+
+        self.owners = []  # owners[position] is the worker of a block
+        # segments[segment] is a list, for each worker, of block positions
+        self.segments = []
+        self.slot_outputs = []  # slot_outputs[slot] is (device, output_id)
+        self.slot_bounds = []  # worker w changes slots in bounds w to w + 1
+        self.memory_indexes = {}  # stores {rank: index in memories}
+        self.signals = None
+        self.starts = None
+        self.memories = None
+        # True until the D-type memories loaded from the devices have been
+        # copied back into them after a cycle
+        self.memories_loaded = False
+        self.processes = []
+        self.connections = []
+        self.own_functions = []  # this process' function for each segment
+        self.barrier = None
+
+    def partition(self):
+        """Return the worker that executes each block of the schedule.
+
+        Blocks are given out level by level, to the worker that computes
+        most of their inputs unless that worker already has its share of
+        the level, in which case they go to the least loaded worker.
+        Switches and clocks are executed by this process, so their blocks
+        have no worker (None).
+        """
+        devices = self.devices
+        owners = [None] * len(self.schedule)
+        device_owners = {}  # stores {rank: worker} for executed devices
+        level_start = 0
+        while level_start < len(self.schedule):
+            level = self.schedule[level_start][0]
+            level_end = level_start
+            while level_end < len(self.schedule) and \
+                    self.schedule[level_end][0] == level:
+                level_end += 1
+            executed = [position for position in range(level_start, level_end)
+                        if self.device_list[self.schedule[position][1][0]]
+                        .device_kind not in [devices.SWITCH, devices.CLOCK]]
+            size = sum(len(self.schedule[position][1])
+                       for position in executed)
+            share = max(self.grain, math.ceil(
+                size / self.partitions * (1 + self.balance_tolerance)))
+            loads = [0] * self.partitions
+
+            for position in executed:
+                block = self.schedule[position][1]
+                inputs = [0] * self.partitions
+                for rank in block:
+                    for input_id, source, port_id in self.sources[rank]:
+                        if source is None:
+                            continue
+                        source_rank = self.ranks[source.device_id]
+                        if source_rank in device_owners:
+                            inputs[device_owners[source_rank]] += 1
+                worker = max(range(self.partitions),
+                             key=lambda worker: (inputs[worker],
+                                                 -loads[worker]))
+                if loads[worker] + len(block) > share:
+                    worker = min(range(self.partitions),
+                                 key=lambda worker: loads[worker])
+                loads[worker] += len(block)
+                owners[position] = worker
+                for rank in block:
+                    device_owners[rank] = worker
+            level_start = level_end
+        return owners
+
+    def build(self):
+        """Build the partitions and start the worker processes.
+
+        No processes are started if the network only makes one partition.
+        """
+        self.stop()
+        super(CompiledEngine, self).build()
+        devices = self.devices
+        executed = sum(1 for device in self.device_list
+                       if device.device_kind not in [devices.SWITCH,
+                                                     devices.CLOCK])
+        self.partitions = max(1, min(self.workers,
+                                     executed // self.partition_size))
+        if self.partitions == 1:
+            return
+        self.unconnected = any(source is None
+                               for device_sources in self.sources
+                               for input_id, source, port_id in device_sources)
+
+        # Switches and clocks are executed here, not by any worker
+        self.owners = self.partition()
+        positions = [[] for worker in range(self.partitions)]
+        for position, worker in enumerate(self.owners):
+            if worker is not None:
+                positions[worker].append(position)
+
+        # Give every worker a contiguous range of slots
+        self.slots = {}
+        self.slot_outputs = []
+        for rank in self.clock_ranks + self.switch_ranks:
+            self.slots[(rank, None)] = len(self.slot_outputs)
+            self.slot_outputs.append((self.device_list[rank], None))
+        self.slot_bounds = []
+        for worker in range(self.partitions):
+            self.slot_bounds.append(len(self.slot_outputs))
+            for position in positions[worker]:
+                for rank in self.schedule[position][1]:
+                    device = self.device_list[rank]
+                    for output_id in device.outputs:
+                        self.slots[(rank, output_id)] = len(self.slot_outputs)
+                        self.slot_outputs.append((device, output_id))
+        self.slot_bounds.append(len(self.slot_outputs))
+        self.memory_ranks = [rank for rank, device in
+                             enumerate(self.device_list)
+                             if device.device_kind == devices.D_TYPE]
+        self.memory_indexes = {rank: index for index, rank in
+                               enumerate(self.memory_ranks)}
+
+        # Start a new segment before a block that reads a signal computed by
+        # another worker in the current segment
+        slot_owners = {}
+        for worker in range(self.partitions):
+            for slot in range(self.slot_bounds[worker],
+                              self.slot_bounds[worker + 1]):
+                slot_owners[slot] = worker
+        self.segments = [[[] for worker in range(self.partitions)]]
+        written = set()  # slots written by any worker in this segment
+        for position, (level, block, is_loop) in enumerate(self.schedule):
+            worker = self.owners[position]
+            if worker is None:
+                continue
+            read = set()
+            for rank in block:
+                for input_id, source, port_id in self.sources[rank]:
+                    # A D-type only reads the start value of its DATA input
+                    if source is not None and input_id != devices.DATA_ID:
+                        read.add(self.slots[(self.ranks[source.device_id],
+                                             port_id)])
+            if any(slot in written and slot_owners[slot] != worker
+                   for slot in read):
+                self.segments.append([[] for worker in
+                                      range(self.partitions)])
+                written = set()
+            self.segments[-1][worker].append(position)
+            for rank in block:
+                for output_id in self.device_list[rank].outputs:
+                    written.add(self.slots[(rank, output_id)])
+
+        self.signals = multiprocessing.RawArray("b", len(self.slot_outputs))
+        self.starts = multiprocessing.RawArray("b", len(self.slot_outputs))
+        self.memories = multiprocessing.RawArray("b",
+                                                 len(self.memory_ranks))
+        self.load_state()
+        if self.unconnected:
+            return
+
+        sources = [[self.generate_segment(worker, segment)
+                    for segment in range(len(self.segments))]
+                   for worker in range(self.partitions)]
+        self.own_functions = []
+        for source in sources[0]:
+            if source is None:
+                self.own_functions.append(None)
+                continue
+            namespace = {}
+            exec(compile(source, "<partition>", "exec"), namespace)
+            self.own_functions.append(namespace["execute_segment"])
+
+        self.barrier = multiprocessing.Barrier(self.partitions)
+        for worker in range(1, self.partitions):
+            (connection, worker_connection) = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_worker, daemon=True,
+                args=(sources[worker], self.signals, self.starts,
+                      self.memories, self.barrier, worker_connection,
+                      self.slot_bounds[worker],
+                      self.slot_bounds[worker + 1]))
+            process.start()
+            worker_connection.close()
+            self.processes.append(process)
+            self.connections.append(connection)
+
+    def get_variable(self, rank, port_id):
+        """Return the shared array item holding an output signal."""
+        return "".join(["signals[", str(self.slots[(rank, port_id)]), "]"])
+
+    def get_start(self, rank, port_id):
+        """Return the shared array item holding a start-of-cycle signal."""
+        return "".join(["starts[", str(self.slots[(rank, port_id)]), "]"])
+
+    def get_memory(self, rank):
+        """Return the shared array item holding a D-type memory."""
+        return "".join(["memories[", str(self.memory_indexes[rank]), "]"])
+
+    def generate_segment(self, worker, segment):
+        """Return the source of the function that executes a partition.
+
+        The function executes the blocks of the worker in the segment. Return
+        None if the worker has no blocks in the segment.
+        """
+        positions = self.segments[segment][worker]
+        if not positions:
+            return None
+        lines = ["def execute_segment(signals, starts, memories):"]
+        for position in positions:
+            for rank in self.schedule[position][1]:
+                lines.extend(self.generate_device(rank, "    ", self.ranks))
+        return "\n".join(lines) + "\n"
+
+    def load_state(self):
+        """Copy the device signals and D-type memories to the shared arrays."""
+        for slot, (device, output_id) in enumerate(self.slot_outputs):
+            self.signals[slot] = self.settle(device.outputs[output_id])
+        for index, rank in enumerate(self.memory_ranks):
+            self.memories[index] = self.device_list[rank].dtype_memory
+        self.memories_loaded = True
+        self.state_version = self.devices.state_version
+
+    def stop(self):
+        """Stop the worker processes."""
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        self.connections = []
+
+    def execute_network(self):
+        """Execute every device once, in levelized order, for one cycle.
+
+        Return True if successful and the network settles.
+        """
+        network = self.network
+        devices = self.devices
+        if self.is_stale():
+            self.build()
+        if self.partitions == 1:
+            return network.compiled_engine.execute_network()
+        if self.state_version != devices.state_version:
+            self.load_state()
+        if self.unconnected:
+            network.steady_state = False
+            return False
+
+        # This sets clock signals to RISING or FALLING, where necessary
+        network.update_clocks()
+        if self.is_sequential_dirty():
+            if not self.execute_events():
+                self.state_version = None  # reload the signals next cycle
+                return False
+            self.load_state()
+            return True
+
+        signals = self.signals
+        slots = self.slots
+        ctypes.memmove(self.starts, signals, len(signals))
+        for device_id in network.clock_scheduler.toggled:
+            device = devices.get_device(device_id)
+            signals[slots[(self.ranks[device_id], None)]] = \
+                self.settle(device.outputs[None])
+        for rank in self.switch_ranks:
+            signals[slots[(rank, None)]] = self.device_list[rank].switch_state
+
+        for connection in self.connections:
+            connection.send(True)
+        for segment, function in enumerate(self.own_functions):
+            if function is not None:
+                function(signals, self.starts, self.memories)
+            if segment < len(self.own_functions) - 1:
+                self.barrier.wait()
+        changed = find_changes(signals, self.starts, 0, self.slot_bounds[1])
+        for connection in self.connections:
+            changed.extend(connection.recv())
+
+        # Copy the changed outputs and memories into the devices. Once every
+        # D-type has executed, its memory is always the signal at Q.
+        slot_outputs = self.slot_outputs
+        changed_outputs = []
+        for slot in changed:
+            (device, output_id) = slot_outputs[slot]
+            device.outputs[output_id] = signals[slot]
+            changed_outputs.append((device, output_id))
+            if output_id == devices.Q_ID:
+                device.dtype_memory = signals[slot]
+        if self.memories_loaded:
+            for index, rank in enumerate(self.memory_ranks):
+                self.device_list[rank].dtype_memory = self.memories[index]
+            self.memories_loaded = False
+        self.settled_version = devices.state_version
+        self.switch_version = devices.switch_version
+        network.changed_outputs = changed_outputs
+        network.steady_state = True
+        return True
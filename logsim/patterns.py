@@ -0,0 +1,271 @@
+"""Simulate the network for many switch patterns at once.
+
+Used in the Logic Simulator project to run the same circuit under many
+different switch settings, with one bit of every signal per pattern.
+
+Classes
+-------
+PatternSimulator - simulates many switch patterns in parallel.
+"""
+import collections
+
+
+class PatternSimulator:
+    """Simulate many switch patterns in parallel.
+
+    Every output signal is held as two Python integers, with bit n giving its
+    value in pattern n, so any number of patterns can be packed together. The
+    level is 1 if the signal is HIGH or RISING, and the edge is 1 if it is
+    RISING or FALLING. Moving a signal towards a target then always gives the
+    target as the new level and (old level XOR target) as the new edge, as in
+    Network.update_signal().
+
+    Each cycle is simulated exactly as the sweep engine (see
+    Network.execute_sweep()) does it for each pattern on its own: every device
+    is executed in the order of Network.get_execution_order(), with a few
+    bitwise operations per device, until no signal changes in any pattern.
+    Gates use the (x, y) rule from Network.get_gate_rule(), and D-types the
+    rules of Network.execute_d_type(), so loops, gated clocks and D-types
+    settle just as they do with the sweep engine.
+
+    The simulator does not change the devices: every run starts from their
+    current outputs, D-type memories and clock counters.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+
+    Public methods
+    --------------
+    build(self): Builds the slot tables used to execute the network.
+
+    get_switch_masks(self, patterns): Returns the {device_id: bit mask} of
+                                      every switch for a list of patterns.
+
+    run(self, patterns, cycles): Simulates the network for the given number of
+                                 cycles under every pattern, and returns the
+                                 monitor traces of each pattern.
+    """
+
+    def __init__(self, network, monitors):
+        """Initialise the simulator with no slot tables."""
+        self.network = network
+        self.devices = network.devices
+        self.monitors = monitors
+        self.engine = network.levelized_engine
+
+        self.slots = {}  # stores {(device_id, output_id): slot}
+        # fanin[rank] is the list of (input_id, slot), slot None if unconnected
+        self.fanin = []
+        self.output_slots = []  # output_slots[rank] is {output_id: slot}
+        self.sweep_order = []  # ranks in the order the sweep engine uses
+        self.built_version = None
+
+    def build(self):
+        """Build the slot tables used to execute the network."""
+        engine = self.engine
+        if engine.is_stale():
+            engine.build()
+
+        self.slots = {}
+        self.output_slots = []
+        for device in engine.device_list:
+            device_slots = {}
+            for output_id in device.outputs:
+                device_slots[output_id] = len(self.slots)
+                self.slots[(device.device_id, output_id)] = len(self.slots)
+            self.output_slots.append(device_slots)
+
+        self.fanin = []
+        for device_sources in engine.sources:
+            device_fanin = []
+            for input_id, source, port_id in device_sources:
+                if source is None:
+                    device_fanin.append((input_id, None))
+                else:
+                    device_fanin.append(
+                        (input_id, self.slots[(source.device_id, port_id)]))
+            self.fanin.append(device_fanin)
+        self.sweep_order = [engine.ranks[device_id] for device_id
+                            in self.network.get_execution_order()]
+        self.built_version = engine.built_version
+
+    def get_switch_masks(self, patterns):
+        """Return the {device_id: bit mask} of every switch for the patterns.
+
+        Each pattern is a dictionary of {switch_id: switch_state}. Switches
+        left out of a pattern keep their current state. Return None if a
+        pattern names a device that is not a switch, or an invalid state.
+        """
+        devices = self.devices
+        masks = {}
+        for switch_id in devices.find_devices(devices.SWITCH):
+            if devices.get_device(switch_id).switch_state == devices.HIGH:
+                masks[switch_id] = (1 << len(patterns)) - 1
+            else:
+                masks[switch_id] = 0
+
+        for number, pattern in enumerate(patterns):
+            for switch_id, switch_state in pattern.items():
+                if switch_id not in masks:
+                    return None
+                if switch_state == devices.HIGH:
+                    masks[switch_id] |= 1 << number
+                elif switch_state == devices.LOW:
+                    masks[switch_id] &= ~(1 << number)
+                else:
+                    return None
+        return masks
+
+    def execute_device(self, rank, levels, edges, memories, switch_masks,
+                       all_patterns):
+        """Execute the device at rank for every pattern.
+
+        Return True if an output changed, False if none did, or None if the
+        device has an unconnected input.
+        """
+        devices = self.devices
+        device = self.engine.device_list[rank]
+        device_kind = device.device_kind
+        inputs = {}
+        for input_id, slot in self.fanin[rank]:
+            if slot is None:
+                return None
+            inputs[input_id] = slot
+
+        if device_kind == devices.SWITCH:
+            targets = {None: switch_masks[device.device_id]}
+
+        elif device_kind == devices.CLOCK:
+            # An edge set by the clock update settles to its new level
+            slot = self.output_slots[rank][None]
+            targets = {None: levels[slot]}
+
+        elif device_kind == devices.D_TYPE:
+            clock_slot = inputs[devices.CLK_ID]
+            rising = levels[clock_slot] & edges[clock_slot]
+            data_slot = inputs[devices.DATA_ID]
+            # DATA counts as HIGH if it is HIGH or FALLING
+            data = levels[data_slot] ^ edges[data_slot]
+            memory = (memories[rank] & ~rising) | (data & rising)
+            set_slot = inputs[devices.SET_ID]
+            memory |= levels[set_slot] & ~edges[set_slot]
+            clear_slot = inputs[devices.CLEAR_ID]
+            memory &= ~(levels[clear_slot] & ~edges[clear_slot])
+            memories[rank] = memory
+            targets = {devices.Q_ID: memory,
+                       devices.QBAR_ID: all_patterns & ~memory}
+
+        else:
+            (x, y) = self.network.get_gate_rule(device_kind)
+            slots = list(inputs.values())
+            if device_kind == devices.XOR:
+                # The inputs are compared as signals, edges included
+                output = ((levels[slots[0]] ^ levels[slots[1]]) |
+                          (edges[slots[0]] ^ edges[slots[1]]))
+            else:
+                # Bit n of output is set if every input is x in pattern n
+                output = all_patterns
+                for slot in slots:
+                    if x == devices.HIGH:
+                        output &= levels[slot] & ~edges[slot]
+                    else:
+                        output &= ~levels[slot] & ~edges[slot]
+                if y == devices.LOW:
+                    output = ~output
+            targets = {None: output & all_patterns}
+
+        changed = False
+        device_slots = self.output_slots[rank]
+        for output_id, target in targets.items():
+            slot = device_slots[output_id]
+            edge = levels[slot] ^ target
+            if levels[slot] != target or edges[slot] != edge:
+                levels[slot] = target
+                edges[slot] = edge
+                changed = True
+        return changed
+
+    def run(self, patterns, cycles):
+        """Simulate the network for a number of cycles under every pattern.
+
+        Each pattern is a dictionary of {switch_id: switch_state}. Return a
+        list with, for each pattern, an ordered dictionary of
+        {(device_id, output_id): [signal_list]} for every monitor, like
+        Monitors.monitors_dictionary. Return None if the patterns are invalid,
+        an input is unconnected or the network oscillates in some pattern.
+        """
+        devices = self.devices
+        engine = self.engine
+        if engine.is_stale() or self.built_version != engine.built_version:
+            self.build()
+        switch_masks = self.get_switch_masks(patterns)
+        if switch_masks is None:
+            return None
+        all_patterns = (1 << len(patterns)) - 1
+
+        # Every pattern starts from the current state of the devices
+        self.network.sync_clocks()
+        levels = [0] * len(self.slots)
+        edges = [0] * len(self.slots)
+        for (device_id, output_id), slot in self.slots.items():
+            signal = devices.get_device(device_id).outputs[output_id]
+            if signal in [devices.HIGH, devices.RISING]:
+                levels[slot] = all_patterns
+            if signal in [devices.RISING, devices.FALLING]:
+                edges[slot] = all_patterns
+        memories = {}  # stores {rank: D-type memory mask}
+        clocks = []  # list of [slot, half period, counter]
+        for rank, device in enumerate(engine.device_list):
+            if device.device_kind == devices.D_TYPE:
+                memories[rank] = 0
+                if device.dtype_memory == devices.HIGH:
+                    memories[rank] = all_patterns
+            elif device.device_kind == devices.CLOCK:
+                clocks.append([self.output_slots[rank][None],
+                               device.clock_half_period,
+                               device.clock_counter])
+
+        iteration_limit = self.network.get_iteration_limit()
+        monitored = [(output, self.slots[output])
+                     for output in self.monitors.monitors_dictionary]
+        recorded = []  # recorded[cycle] is the list of monitored masks
+
+        for cycle in range(cycles):
+            # Toggle the clocks exactly as Network.update_clocks() does
+            for clock in clocks:
+                [slot, half_period, counter] = clock
+                if counter == half_period:
+                    counter = 0
+                    levels[slot] = all_patterns & ~levels[slot]
+                    edges[slot] = all_patterns
+                clock[2] = counter + 1
+
+            # Sweep every device until no pattern changes, as execute_sweep
+            # does; a pattern that has settled stays the same in later sweeps
+            iterations = 0
+            network_changed = True
+            while network_changed:
+                if iterations == iteration_limit:
+                    return None
+                iterations += 1
+                network_changed = False
+                for rank in self.sweep_order:
+                    changed = self.execute_device(
+                        rank, levels, edges, memories, switch_masks,
+                        all_patterns)
+                    if changed is None:  # an input is unconnected
+                        return None
+                    network_changed = network_changed or changed
+
+            recorded.append([levels[slot] for output, slot in monitored])
+
+        traces = []
+        for number in range(len(patterns)):
+            trace = collections.OrderedDict()
+            for position, (output, slot) in enumerate(monitored):
+                trace[output] = [(masks[position] >> number) & 1
+                                 for masks in recorded]
+            traces.append(trace)
+        return traces
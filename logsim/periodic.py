@@ -0,0 +1,118 @@
+"""Run the network, skipping ahead once its state repeats.
+
+Used in the Logic Simulator project to run clocked networks for very many
+cycles without simulating every one of them.
+
+Classes
+-------
+PeriodicRunner - runs the network and extrapolates periodic behaviour.
+"""
+
+
+class PeriodicRunner:
+    """Run the network and extrapolate periodic behaviour.
+
+    After every cycle the full state of the devices (see
+    Devices.get_state()) is compared with a single saved checkpoint state.
+    The checkpoint is moved to the current cycle whenever the number of
+    cycles since it was saved reaches the next power of two (Brent's cycle
+    detection), so only one state is kept however long the run is. The
+    simulation is deterministic, so once the checkpoint state repeats the
+    network is known to go round the same period of states forever. The
+    network is then simulated until a whole number of periods is left, and
+    the rest of the monitor traces are filled in by repeating the last
+    period, which also leaves the devices in the state they would have
+    reached at the end of the run.
+
+    If no repeat has been found after history_limit cycles, the rest of the
+    run is simulated in one batch by Network.run(). The same happens if a
+    monitor with a capacity (see monitors.RingTrace) does not hold a whole
+    period.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+
+    Public methods
+    --------------
+    run(self, cycles): Runs the network for the specified number of cycles,
+                       recording the monitors, and returns True if
+                       successful.
+    """
+
+    def __init__(self, network, monitors):
+        """Initialise the runner with no detected period."""
+        self.network = network
+        self.devices = network.devices
+        self.monitors = monitors
+
+        self.history_limit = 10000  # most cycles searched for a repeat
+        self.period_start = None  # cycle the last detected period starts at
+        self.period = None  # length of the last detected period
+        self.cycles_simulated = 0  # cycles actually executed in the last run
+        # Cycles recorded by the monitors in the last run, simulated or not
+        self.cycles_completed = 0
+
+    def run(self, cycles):
+        """Run the network for the specified number of cycles.
+
+        The monitors record a signal for every cycle, as if each had been
+        simulated. Return True if successful, or False if the network
+        oscillates.
+        """
+        network = self.network
+        devices = self.devices
+        traces = self.monitors.monitors_dictionary
+        self.period_start = None
+        self.period = None
+        self.cycles_simulated = 0
+        self.cycles_completed = 0
+
+        # The signals of cycle c are recorded at offsets[output] + c - 1
+        offsets = {output: len(trace) for output, trace in traces.items()}
+        network.sync_clocks()
+        checkpoint = devices.get_state()
+        checkpoint_cycle = 0
+        power = 1  # cycles after checkpoint_cycle the checkpoint is moved
+
+        for cycle in range(1, cycles + 1):
+            if not network.execute_network():
+                return False
+            self.monitors.record_signals()
+            self.cycles_simulated = self.cycles_completed = cycle
+            if self.period is None:
+                network.sync_clocks()
+                state = devices.get_state()
+                if state == checkpoint:
+                    self.period_start = checkpoint_cycle
+                    self.period = cycle - checkpoint_cycle
+                    checkpoint = None
+                elif cycle >= self.history_limit:
+                    break  # give up looking for a period
+                elif cycle - checkpoint_cycle == power:
+                    checkpoint = state
+                    checkpoint_cycle = cycle
+                    power *= 2
+
+            period = self.period
+            remaining = cycles - cycle
+            if period is None or remaining % period:
+                continue
+            # The states after the last period repeat from now on
+            if any(offsets[output] + cycle - period < trace.first_cycle
+                   for output, trace in traces.items()):
+                break  # a monitor with a capacity does not hold the period
+            for output, trace in traces.items():
+                offset = offsets[output]
+                trace.repeat(trace[offset + cycle - period:offset + cycle],
+                             remaining)
+            self.cycles_completed = cycles
+            return True
+
+        cycle = self.cycles_simulated
+        if cycle == cycles:
+            return True
+        (settled, completed) = network.run(cycles - cycle, self.monitors)
+        self.cycles_simulated = self.cycles_completed = cycle + completed
+        return settled
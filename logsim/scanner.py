@@ -143,7 +143,7 @@ class Scanner:
                 symbol.type = self.KEYWORD
             else:
                 symbol.type = self.NAME
-            [symbol.id] = self.names.lookup([word])
+            symbol.id = self.names.intern(word)
             symbol.string = word
 
         elif self.current_character.isdigit():
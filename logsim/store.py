@@ -0,0 +1,408 @@
+"""Store devices compactly in typed arrays.
+
+Used in the Logic Simulator project to hold very large networks without
+creating one Python object per device. Every device property lives in a typed
+array indexed by the device's position in the store, and the device inputs
+form a CSR-style fan-in table that points straight at output signal slots.
+
+Classes
+-------
+DeviceStore - stores all the device properties in typed arrays.
+DeviceView - presents one device in the store as a devices.Device.
+PortView - presents the inputs or outputs of a device as a dictionary.
+"""
+from array import array
+from collections.abc import MutableMapping
+
+# Stored in place of None, which the typed arrays cannot hold
+ABSENT = -1
+
+
+def pack(value):
+    """Return value in a form that can be stored in a typed array."""
+    if value is None:
+        return ABSENT
+    return value
+
+
+def unpack(value):
+    """Return the value stored in a typed array, turning ABSENT into None."""
+    if value == ABSENT:
+        return None
+    return value
+
+
+class PortView(MutableMapping):
+    """Present the inputs or outputs of a device as a dictionary.
+
+    Input views map {input_id: (connected_output_device_id,
+    connected_output_port_id)} and output views map {output_id:
+    output_signal}, exactly like the dictionaries of a devices.Device.
+
+    Parameters
+    ----------
+    store: instance of the DeviceStore class.
+    index: position of the device in the store.
+    is_input: True for the inputs of the device, False for its outputs.
+
+    Public methods
+    --------------
+    find_slot(self, port_id): Returns the position of the port in the flat
+                              port arrays, or None if it is absent.
+    """
+
+    __slots__ = ("store", "index", "is_input")
+
+    def __init__(self, store, index, is_input):
+        """Initialise the device the view belongs to."""
+        self.store = store
+        self.index = index
+        self.is_input = is_input
+
+    def block(self):
+        """Return the (start, count, ports) of the device's port block."""
+        store = self.store
+        if self.is_input:
+            return (store.input_starts[self.index],
+                    store.input_counts[self.index], store.input_ports)
+        return (store.output_starts[self.index],
+                store.output_counts[self.index], store.output_ports)
+
+    def find_slot(self, port_id):
+        """Return the position of port_id in the flat port arrays.
+
+        Return None if the device has no such port.
+        """
+        if port_id is not None and not isinstance(port_id, int):
+            return None
+        start, count, ports = self.block()
+        packed_id = pack(port_id)
+        for slot in range(start, start + count):
+            if ports[slot] == packed_id:
+                return slot
+        return None
+
+    def __getitem__(self, port_id):
+        """Return the connection of an input or the signal of an output."""
+        slot = self.find_slot(port_id)
+        if slot is None:
+            raise KeyError(port_id)
+        if self.is_input:
+            return self.store.get_source(slot)
+        return self.store.signals[slot]
+
+    def __setitem__(self, port_id, value):
+        """Set the connection of an input or the signal of an output.
+
+        The port is added to the device if it is not already present.
+        """
+        slot = self.find_slot(port_id)
+        if slot is None:
+            slot = self.store.add_port(self.index, port_id, self.is_input)
+        if self.is_input:
+            self.store.set_source(slot, value)
+        else:
+            self.store.signals[slot] = value
+
+    def __contains__(self, port_id):
+        """Return True if the device has the port."""
+        return self.find_slot(port_id) is not None
+
+    def __delitem__(self, port_id):
+        """Refuse to remove ports, which the store does not support."""
+        raise TypeError("ports cannot be removed from a stored device")
+
+    def __iter__(self):
+        """Iterate over the port IDs in the order they were added."""
+        start, count, ports = self.block()
+        for slot in range(start, start + count):
+            yield unpack(ports[slot])
+
+    def __len__(self):
+        """Return the number of ports."""
+        if self.is_input:
+            return self.store.input_counts[self.index]
+        return self.store.output_counts[self.index]
+
+    def __repr__(self):
+        """Return the dictionary representation of the ports."""
+        return repr(dict(self.items()))
+
+
+class DeviceView:
+    """Present one device in the store as a devices.Device.
+
+    Views hold no device data of their own, so they are created on demand and
+    can be thrown away freely. Two views of the same device compare equal.
+
+    Parameters
+    ----------
+    store: instance of the DeviceStore class.
+    index: position of the device in the store.
+
+    Public methods
+    --------------
+    No public methods.
+    """
+
+    __slots__ = ("store", "index")
+
+    def __init__(self, store, index):
+        """Initialise the device the view belongs to."""
+        self.store = store
+        self.index = index
+
+    def __eq__(self, other):
+        """Check if this view shows the same device as other."""
+        if not isinstance(other, DeviceView):
+            return False
+        return self.store is other.store and self.index == other.index
+
+    def __hash__(self):
+        """Return a hash based on the device's position in the store."""
+        return hash((id(self.store), self.index))
+
+    @property
+    def device_id(self):
+        """Return the device ID."""
+        return self.store.device_ids[self.index]
+
+    @property
+    def inputs(self):
+        """Return a dictionary-like view of the device inputs."""
+        return PortView(self.store, self.index, True)
+
+    @property
+    def outputs(self):
+        """Return a dictionary-like view of the device outputs."""
+        return PortView(self.store, self.index, False)
+
+    @property
+    def device_kind(self):
+        """Return the device kind."""
+        return unpack(self.store.kinds[self.index])
+
+    @device_kind.setter
+    def device_kind(self, value):
+        self.store.kinds[self.index] = pack(value)
+
+    @property
+    def clock_half_period(self):
+        """Return the clock half period, or None if not a clock."""
+        return unpack(self.store.clock_half_periods[self.index])
+
+    @clock_half_period.setter
+    def clock_half_period(self, value):
+        self.store.clock_half_periods[self.index] = pack(value)
+
+    @property
+    def clock_counter(self):
+        """Return the clock counter, or None if not a clock."""
+        return unpack(self.store.clock_counters[self.index])
+
+    @clock_counter.setter
+    def clock_counter(self, value):
+        self.store.clock_counters[self.index] = pack(value)
+
+    @property
+    def switch_state(self):
+        """Return the switch state, or None if not a switch."""
+        return unpack(self.store.switch_states[self.index])
+
+    @switch_state.setter
+    def switch_state(self, value):
+        self.store.switch_states[self.index] = pack(value)
+
+    @property
+    def dtype_memory(self):
+        """Return the D-type memory, or None if not a D-type."""
+        return unpack(self.store.dtype_memories[self.index])
+
+    @dtype_memory.setter
+    def dtype_memory(self, value):
+        self.store.dtype_memories[self.index] = pack(value)
+
+
+class DeviceStore:
+    """Store all the device properties in typed arrays.
+
+    Device i has its ID in device_ids[i], its kind in kinds[i] and so on. Its
+    inputs occupy input_starts[i] to input_starts[i] + input_counts[i] in the
+    flat input arrays, and likewise for its outputs. input_sources holds, for
+    every input, the slot of the output it is connected to in the flat output
+    arrays (or ABSENT), so an input signal is signals[input_sources[slot]].
+
+    The store also behaves as a read-only sequence of DeviceView objects, so
+    it can stand in for Devices.devices_list.
+
+    Parameters
+    ----------
+    No parameters.
+
+    Public methods
+    --------------
+    add_device(self, device_id, device_kind): Adds a device with no ports and
+                                              returns its index.
+
+    get_device(self, device_id): Returns a DeviceView of the device, or None
+                                 if it is absent.
+
+    add_port(self, index, port_id, is_input): Adds a port to a device and
+                                              returns its slot.
+
+    get_source(self, slot): Returns the (device ID, port ID) connected to the
+                            input slot, or None.
+
+    set_source(self, slot, connection): Connects the input slot to the
+                                        (device ID, port ID) output.
+
+    get_output_slot(self, device_id, output_id): Returns the slot of the
+                                     output in the flat arrays, or None.
+    """
+
+    def __init__(self):
+        """Initialise the empty arrays."""
+        # indexes stores {device_id: index}
+        self.indexes = {}
+
+        # One entry per device
+        self.device_ids = array("i")
+        self.kinds = array("i")
+        self.clock_half_periods = array("i")
+        self.clock_counters = array("i")
+        self.switch_states = array("b")
+        self.dtype_memories = array("b")
+        self.input_starts = array("i")
+        self.input_counts = array("h")
+        self.output_starts = array("i")
+        self.output_counts = array("h")
+
+        # One entry per input (the CSR fan-in table)
+        self.input_ports = array("i")
+        self.input_sources = array("i")
+
+        # One entry per output
+        self.output_ports = array("i")
+        self.output_owners = array("i")
+        self.signals = array("b")
+
+    def __len__(self):
+        """Return the number of devices."""
+        return len(self.device_ids)
+
+    def __getitem__(self, index):
+        """Return a DeviceView of the device at index."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("device index out of range")
+        return DeviceView(self, index)
+
+    def __iter__(self):
+        """Iterate over views of all the devices in the order added."""
+        for index in range(len(self)):
+            yield DeviceView(self, index)
+
+    def add_device(self, device_id, device_kind):
+        """Add a device with no ports and return its index."""
+        index = len(self.device_ids)
+        self.indexes[device_id] = index
+        self.device_ids.append(device_id)
+        self.kinds.append(pack(device_kind))
+        self.clock_half_periods.append(ABSENT)
+        self.clock_counters.append(ABSENT)
+        self.switch_states.append(ABSENT)
+        self.dtype_memories.append(ABSENT)
+        self.input_starts.append(len(self.input_ports))
+        self.input_counts.append(0)
+        self.output_starts.append(len(self.output_ports))
+        self.output_counts.append(0)
+        return index
+
+    def get_device(self, device_id):
+        """Return a DeviceView of the device, or None if it is absent."""
+        index = self.indexes.get(device_id)
+        if index is None:
+            return None
+        return DeviceView(self, index)
+
+    def add_port(self, index, port_id, is_input):
+        """Add a port to the device at index and return its slot.
+
+        A device's ports must be contiguous in the flat arrays. The make_*
+        functions in devices.Devices add all of a device's ports straight
+        after the device, so the new port normally goes on the end. If the
+        device's block is not at the end, it is moved there first.
+        """
+        if is_input:
+            starts, counts = self.input_starts, self.input_counts
+            port_arrays = [self.input_ports, self.input_sources]
+        else:
+            starts, counts = self.output_starts, self.output_counts
+            port_arrays = [self.output_ports, self.output_owners,
+                           self.signals]
+        end = len(port_arrays[0])
+        start = starts[index]
+        count = counts[index]
+
+        if count == 0:
+            starts[index] = end
+        elif start + count != end:
+            # Move the block to the end, leaving a gap behind
+            for port_array in port_arrays:
+                port_array.extend(port_array[start:start + count])
+            starts[index] = end
+            if not is_input:
+                self.move_sources(start, count, end)
+
+        if is_input:
+            self.input_ports.append(pack(port_id))
+            self.input_sources.append(ABSENT)
+        else:
+            self.output_ports.append(pack(port_id))
+            self.output_owners.append(index)
+            self.signals.append(0)
+        counts[index] = count + 1
+        return starts[index] + count
+
+    def move_sources(self, old_start, count, new_start):
+        """Repoint inputs connected to outputs that have been moved."""
+        sources = self.input_sources
+        for slot, source in enumerate(sources):
+            if old_start <= source < old_start + count:
+                sources[slot] = source - old_start + new_start
+
+    def get_output_slot(self, device_id, output_id):
+        """Return the slot of the output in the flat arrays.
+
+        Return None if either ID is invalid.
+        """
+        index = self.indexes.get(device_id)
+        if index is None:
+            return None
+        return PortView(self, index, False).find_slot(output_id)
+
+    def get_source(self, slot):
+        """Return the (device ID, port ID) connected to the input slot.
+
+        Return None if the input is unconnected.
+        """
+        source = self.input_sources[slot]
+        if source == ABSENT:
+            return None
+        owner = self.output_owners[source]
+        return (self.device_ids[owner], unpack(self.output_ports[source]))
+
+    def set_source(self, slot, connection):
+        """Connect the input slot to the (device ID, port ID) output.
+
+        A connection of None disconnects the input.
+        """
+        if connection is None:
+            self.input_sources[slot] = ABSENT
+            return
+        (device_id, output_id) = connection
+        source = self.get_output_slot(device_id, output_id)
+        if source is None:
+            raise KeyError(connection)
+        self.input_sources[slot] = source
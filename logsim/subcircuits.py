@@ -0,0 +1,196 @@
+"""Simulate the subcircuits of the network independently.
+
+Used in the Logic Simulator project to run definition files made of several
+circuits that are not connected to each other, such as a counter next to an
+adder, on several processor cores at once.
+
+Classes
+-------
+SubcircuitRunner - runs each subcircuit of the network in a process pool.
+
+Functions
+---------
+describe_devices - returns a picklable description of some devices.
+simulate_subcircuit - simulates the devices of one subcircuit.
+"""
+import multiprocessing
+import os
+
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from periodic import PeriodicRunner
+
+
+def describe_devices(devices, device_ids):
+    """Return a picklable description of the specified devices.
+
+    Each device is described by (device_id, device_kind, inputs, outputs,
+    clock_half_period, clock_counter, switch_state, dtype_memory), where
+    inputs and outputs are copies of its dictionaries.
+    """
+    descriptions = []
+    for device_id in device_ids:
+        device = devices.get_device(device_id)
+        descriptions.append((device_id, device.device_kind,
+                             dict(device.inputs), dict(device.outputs),
+                             device.clock_half_period, device.clock_counter,
+                             device.switch_state, device.dtype_memory))
+    return descriptions
+
+
+def simulate_subcircuit(names, descriptions, monitored, cycles, engine,
+                        iteration_limit):
+    """Simulate the devices of one subcircuit for a number of cycles.
+
+    The devices are made from their descriptions (see describe_devices) in
+    a network of their own, run with a periodic.PeriodicRunner, and the
+    specified (device_id, output_id) outputs are monitored. Return
+    (traces, state, quiet), where traces is the list of signal lists of
+    the monitored outputs, state is the final Devices.get_state(), and
+    quiet is True if that state no longer changes from cycle to cycle.
+    Return None if the subcircuit oscillates.
+    """
+    devices = Devices(names)
+    network = Network(names, devices)
+    for (device_id, device_kind, inputs, outputs, clock_half_period,
+         clock_counter, switch_state, dtype_memory) in descriptions:
+        devices.add_device(device_id, device_kind)
+        for input_id in inputs:
+            devices.add_input(device_id, input_id)
+        for output_id, signal in outputs.items():
+            devices.add_output(device_id, output_id, signal)
+        device = devices.get_device(device_id)
+        device.inputs.update(inputs)
+        device.clock_half_period = clock_half_period
+        device.clock_counter = clock_counter
+        device.switch_state = switch_state
+        device.dtype_memory = dtype_memory
+    network.iteration_limit = iteration_limit
+    network.set_engine(engine)
+
+    monitors = Monitors(names, devices, network)
+    for device_id, output_id in monitored:
+        monitors.make_monitor(device_id, output_id)
+    runner = PeriodicRunner(network, monitors)
+    if not runner.run(cycles):
+        return None
+    network.sync_clocks()
+    return ([monitors.monitors_dictionary[output] for output in monitored],
+            devices.get_state(), runner.period == 1)
+
+
+class SubcircuitRunner:
+    """Run each subcircuit of the network in a process pool.
+
+    The network is split into the groups of devices that are not connected
+    to each other (see Network.get_subcircuits()). Each subcircuit is
+    simulated in its own network in a worker process, with the engine and
+    iteration limit of the whole network, and the monitor traces and final
+    device states are then merged back, so Monitors.monitors_dictionary
+    keeps its order. The PARTITIONED engine starts processes of its own, so
+    subcircuits use the COMPILED engine instead, which gives the same
+    results.
+
+    A subcircuit that ended the last run in a state that no longer changes
+    (no running clocks, and settled) is quiet. If it is still in that state
+    at the start of the next run, it is not simulated again: its traces are
+    extended with its current signals.
+
+    If any subcircuit oscillates, nothing is merged and the whole network is
+    run again with a periodic.PeriodicRunner, so the devices, monitors and
+    Network.oscillation end up as they would without subcircuits.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+    monitors: instance of the monitors.Monitors() class.
+
+    Public methods
+    --------------
+    run(self, cycles): Runs the network for the specified number of cycles,
+                       recording the monitors, and returns True if
+                       successful.
+
+    close(self): Stops the worker processes.
+    """
+
+    def __init__(self, network, monitors):
+        """Initialise the runner with no process pool."""
+        self.network = network
+        self.devices = network.devices
+        self.monitors = monitors
+        self.runner = PeriodicRunner(network, monitors)
+
+        self.processes = os.cpu_count() or 1
+        self.pool = None
+        # stores {tuple of device IDs: state it is quiet in}
+        self.quiet_states = {}
+        self.subcircuits_simulated = 0  # subcircuits run in the last run
+
+    def run(self, cycles):
+        """Run the network for the specified number of cycles.
+
+        The monitors record a signal for every cycle. Return True if
+        successful, or False if the network oscillates.
+        """
+        network = self.network
+        devices = self.devices
+        traces = self.monitors.monitors_dictionary
+        network.sync_clocks()
+        state = list(devices.get_state())
+        indexes = {device.device_id: index
+                   for index, device in enumerate(devices.devices_list)}
+        engine = network.engine
+        if engine == network.PARTITIONED:
+            engine = network.COMPILED
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.processes)
+
+        # results stores {subcircuit: result of simulate_subcircuit}
+        results = {}
+        quiet = {}  # stores {subcircuit: monitored outputs} not simulated
+        for subcircuit in network.get_subcircuits():
+            subcircuit = tuple(subcircuit)
+            members = set(subcircuit)
+            monitored = [output for output in traces if output[0] in members]
+            subcircuit_state = tuple([state[indexes[device_id]]
+                                      for device_id in subcircuit])
+            if self.quiet_states.get(subcircuit) == subcircuit_state:
+                quiet[subcircuit] = monitored
+                continue
+            results[subcircuit] = (monitored, self.pool.apply_async(
+                simulate_subcircuit,
+                (devices.names, describe_devices(devices, subcircuit),
+                 monitored, cycles, engine, network.get_iteration_limit())))
+        self.subcircuits_simulated = len(results)
+
+        for subcircuit, (monitored, result) in list(results.items()):
+            results[subcircuit] = (monitored, result.get())
+        if any(result is None for monitored, result in results.values()):
+            self.quiet_states = {}
+            return self.runner.run(cycles)
+
+        self.quiet_states = {subcircuit: self.quiet_states[subcircuit]
+                             for subcircuit in quiet}
+        for monitored in quiet.values():
+            for device_id, output_id in monitored:
+                signal = network.get_output_signal(device_id, output_id)
+                traces[(device_id, output_id)].repeat([signal], cycles)
+        for subcircuit, (monitored, result) in results.items():
+            (subcircuit_traces, subcircuit_state, is_quiet) = result
+            for output, trace in zip(monitored, subcircuit_traces):
+                traces[output].extend(trace)
+            for device_id, device_state in zip(subcircuit, subcircuit_state):
+                state[indexes[device_id]] = device_state
+            if is_quiet:
+                self.quiet_states[subcircuit] = subcircuit_state
+        devices.set_state(tuple(state))
+        return True
+
+    def close(self):
+        """Stop the worker processes."""
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
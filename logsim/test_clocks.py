@@ -0,0 +1,84 @@
+"""Test the clocks module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+
+
+def make_clocks(engine, half_periods):
+    """Return the devices and network of a set of unconnected clocks."""
+    random.seed(0)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    assert network.set_engine(engine(network))
+    for number, half_period in enumerate(half_periods):
+        clock_id = names.intern("".join(["Clk", str(number)]))
+        devices.make_device(clock_id, devices.CLOCK, half_period)
+    return devices, network
+
+
+def get_clocks(devices):
+    """Return the list of (output signal, counter) of every clock."""
+    return [(devices.get_device(device_id).outputs[None],
+             devices.get_device(device_id).clock_counter)
+            for device_id in devices.find_devices(devices.CLOCK)]
+
+
+@pytest.mark.parametrize("engine", [lambda network: network.EVENT,
+                                    lambda network: network.LEVELIZED,
+                                    lambda network: network.COMPILED])
+def test_scheduler_matches_update_clocks(engine):
+    """Test if scheduled clocks change exactly when counted clocks do."""
+    half_periods = [1, 2, 3, 5, 8, 13, 100]
+    expected_devices, expected_network = make_clocks(
+        lambda network: network.SWEEP, half_periods)
+    devices, network = make_clocks(engine, half_periods)
+    assert get_clocks(devices) == get_clocks(expected_devices)
+
+    for cycle in range(250):
+        if cycle == 120:
+            for cold_devices in [devices, expected_devices]:
+                random.seed(1)
+                cold_devices.cold_startup()
+        assert expected_network.execute_network()
+        assert network.execute_network()
+        network.sync_clocks()
+        assert get_clocks(devices) == get_clocks(expected_devices)
+
+
+def test_idle_cycles_skip_clocks():
+    """Test if clocks are only visited on the cycles they change."""
+    devices, network = make_clocks(lambda network: network.LEVELIZED,
+                                   [50] * 1000)
+    for device_id in devices.find_devices(devices.CLOCK):
+        devices.get_device(device_id).clock_counter = 50
+    devices.state_version += 1  # the counters were changed from outside
+    scheduler = network.clock_scheduler
+    edges = 0
+    for cycle in range(100):
+        assert network.execute_network()
+        edges += len(scheduler.toggled)
+    # Each clock changes on cycles 1 and 51
+    assert edges == 2000
+    assert len(scheduler.queue) == 1000
+
+
+def test_sync_before_switching_engine():
+    """Test if clock counters are written back when the engine changes."""
+    devices, network = make_clocks(lambda network: network.LEVELIZED, [4])
+    [clock_id] = devices.find_devices(devices.CLOCK)
+    clock = devices.get_device(clock_id)
+    clock.clock_counter = 1
+    devices.state_version += 1  # the counter was changed from outside
+
+    for cycle in range(2):
+        assert network.execute_network()
+    assert clock.clock_counter == 1  # not counted while scheduled
+    assert network.set_engine(network.SWEEP)
+    assert clock.clock_counter == 3
+    assert network.execute_network()
+    assert clock.clock_counter == 4
@@ -0,0 +1,102 @@
+"""Test the compiled module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+
+
+@pytest.fixture
+def new_network():
+    """Return a new Network instance using the COMPILED engine."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    network = Network(new_names, new_devices)
+    network.set_engine(network.COMPILED)
+    return network
+
+
+def test_generate_source(new_network):
+    """Test if gates are compiled into bitwise expressions."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SW1, SW2, NAND1, I1, I2] = names.lookup(["Sw1", "Sw2", "Nand1", "I1",
+                                              "I2"])
+    devices.make_device(SW1, devices.SWITCH, 0)
+    devices.make_device(SW2, devices.SWITCH, 1)
+    devices.make_device(NAND1, devices.NAND, 2)
+    network.make_connection(SW1, None, NAND1, I1)
+    network.make_connection(SW2, None, NAND1, I2)
+
+    engine = network.compiled_engine
+    engine.build()
+    assert "    v2 = 1 - (v0 & v1)" in engine.source.splitlines()
+    assert network.execute_network()
+    assert network.get_output_signal(NAND1, None) == devices.HIGH
+
+
+def test_compiled_engine_rebuilds(new_network):
+    """Test if the function is recompiled when the network changes."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SW1, SW2, OR1, NOT1, I1, I2] = names.lookup(["Sw1", "Sw2", "Or1", "Not1",
+                                                  "I1", "I2"])
+    devices.make_device(SW1, devices.SWITCH, 1)
+    devices.make_device(SW2, devices.SWITCH, 0)
+    devices.make_device(OR1, devices.OR, 2)
+    network.make_connection(SW1, None, OR1, I1)
+    network.make_connection(SW2, None, OR1, I2)
+    assert network.execute_network()
+    assert network.get_output_signal(OR1, None) == devices.HIGH
+    function = network.compiled_engine.function
+
+    network.remove_connection(SW1, None, OR1, I1)
+    network.make_connection(SW2, None, OR1, I1)
+    assert network.execute_network()
+    assert network.get_output_signal(OR1, None) == devices.LOW
+    assert network.compiled_engine.function is not function
+
+    devices.make_device(NOT1, devices.NOT)
+    assert not network.execute_network()  # the NOT gate is unconnected
+    network.make_connection(OR1, None, NOT1, I1)
+    assert network.execute_network()
+    assert network.get_output_signal(NOT1, None) == devices.HIGH
+
+
+def test_compiled_latch(new_network):
+    """Test if a latch settles and holds its state."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SET, RESET, NAND1, NAND2, I1, I2] = names.lookup(
+        ["Set", "Reset", "Nand1", "Nand2", "I1", "I2"])
+
+    devices.make_device(SET, devices.SWITCH, 1)
+    devices.make_device(RESET, devices.SWITCH, 1)
+    devices.make_device(NAND1, devices.NAND, 2)
+    devices.make_device(NAND2, devices.NAND, 2)
+    network.make_connection(SET, None, NAND1, I1)
+    network.make_connection(NAND2, None, NAND1, I2)
+    network.make_connection(RESET, None, NAND2, I1)
+    network.make_connection(NAND1, None, NAND2, I2)
+
+    devices.set_switch(RESET, devices.LOW)  # reset the latch
+    assert network.execute_network()
+    devices.set_switch(RESET, devices.HIGH)  # and hold it
+    assert network.execute_network()
+    assert [network.get_output_signal(NAND1, None),
+            network.get_output_signal(NAND2, None)] == [devices.LOW,
+                                                        devices.HIGH]
+
+
+def test_compiled_oscillation(new_network):
+    """Test if the compiled engine returns False for oscillating loops."""
+    network = new_network
+    devices = network.devices
+    [NOR1, I1] = devices.names.lookup(["Nor1", "I1"])
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+
+    assert not network.execute_network()
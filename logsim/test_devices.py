@@ -148,3 +148,118 @@ def test_set_switch(new_devices):
     # Set switch Sw1 to LOW
     new_devices.set_switch(SW1_ID, new_devices.LOW)
     assert switch_object.switch_state == new_devices.LOW
+
+
+def test_device_indexes(new_devices):
+    """Test if the device ID and device kind indexes stay up to date."""
+    devices = new_devices
+    names = devices.names
+    [AND1_ID, AND2_ID, SW1_ID, CL_ID] = names.lookup(["And1", "And2", "Sw1",
+                                                      "Clock1"])
+
+    devices.make_device(AND1_ID, devices.AND, 2)
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(AND2_ID, devices.AND, 3)
+    devices.make_device(CL_ID, devices.CLOCK, 2)
+
+    assert devices.devices_dictionary == {device.device_id: device
+                                          for device in devices.devices_list}
+    assert devices.kind_dictionary == {devices.AND: [AND1_ID, AND2_ID],
+                                       devices.SWITCH: [SW1_ID],
+                                       devices.CLOCK: [CL_ID]}
+
+    # find_devices returns a copy, so changing it must not affect the index
+    devices.find_devices(devices.AND).append(SW1_ID)
+    assert devices.find_devices(devices.AND) == [AND1_ID, AND2_ID]
+
+
+def test_get_and_set_state(new_devices):
+    """Test if a device state can be saved and restored."""
+    devices = new_devices
+    names = devices.names
+    [SW1_ID, CL_ID, D_ID] = names.lookup(["Sw1", "Clock1", "D1"])
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(CL_ID, devices.CLOCK, 3)
+    devices.make_device(D_ID, devices.D_TYPE)
+
+    state = devices.get_state()
+    assert hash(state) == hash(devices.get_state())
+    devices.set_switch(SW1_ID, devices.HIGH)
+    devices.cold_startup()
+    devices.get_device(D_ID).dtype_memory = devices.HIGH
+    devices.get_device(CL_ID).clock_counter = 3
+    assert devices.get_state() != state
+
+    state_version = devices.state_version
+    assert devices.set_state(state)
+    assert devices.get_state() == state
+    assert devices.state_version != state_version
+    assert not devices.set_state(state[:2])
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_snapshot_and_restore(compact):
+    """Test if a snapshot restores every device state."""
+    devices = Devices(Names(), compact)
+    names = devices.names
+    [SW1_ID, CL_ID, D_ID, AND1_ID] = names.lookup(["Sw1", "Clock1", "D1",
+                                                   "And1"])
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(CL_ID, devices.CLOCK, 3)
+    devices.make_device(D_ID, devices.D_TYPE)
+    devices.make_device(AND1_ID, devices.AND, 2)
+
+    state = devices.get_state()
+    snapshot = devices.snapshot()
+    devices.set_switch(SW1_ID, devices.HIGH)
+    devices.get_device(D_ID).dtype_memory = devices.HIGH
+    devices.get_device(D_ID).outputs[devices.QBAR_ID] = devices.RISING
+    devices.get_device(CL_ID).clock_counter = 3
+    devices.get_device(AND1_ID).outputs[None] = devices.HIGH
+    assert devices.get_state() != state
+
+    assert devices.restore(snapshot)
+    assert devices.get_state() == state
+
+    # A snapshot does not fit once the devices have changed
+    [OR1_ID] = names.lookup(["Or1"])
+    devices.make_device(OR1_ID, devices.OR, 2)
+    assert not devices.restore(snapshot)
+
+
+def make_sequential_devices(names, seed, reverse=False):
+    """Return a Devices instance with clocks and D-types made in order."""
+    devices = Devices(names, seed=seed)
+    device_ids = names.lookup(["".join(["Dev", str(i)]) for i in range(40)])
+    if reverse:
+        device_ids.reverse()
+    for device_id in device_ids:
+        if device_id % 2:
+            devices.make_device(device_id, devices.D_TYPE)
+        else:
+            devices.make_device(device_id, devices.CLOCK, 7)
+    return devices
+
+
+def test_seeded_cold_startup():
+    """Test if a seeded cold startup is reproducible and order independent."""
+    names = Names()
+    devices = make_sequential_devices(names, 42)
+    state = devices.get_state()
+    assert devices.state_version == 0  # making devices does not restart all
+
+    # The state does not depend on the order the devices were made in
+    other_devices = make_sequential_devices(names, 42, reverse=True)
+    for device in devices.devices_list:
+        other_device = other_devices.get_device(device.device_id)
+        assert (other_device.outputs, other_device.clock_counter,
+                other_device.dtype_memory) == (device.outputs,
+                                               device.clock_counter,
+                                               device.dtype_memory)
+
+    # Every cold startup with a seed gives the same state
+    devices.cold_startup()
+    assert devices.get_state() == state
+
+    # A different seed gives a different state
+    assert make_sequential_devices(names, 43).get_state() != state
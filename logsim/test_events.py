@@ -0,0 +1,81 @@
+"""Test the events module."""
+from names import Names
+from devices import Devices
+from network import Network
+
+
+def test_event_engine_skips_quiet_devices():
+    """Test if devices whose inputs did not change are not executed."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    network.set_engine(network.EVENT)
+
+    [SW1, SW2, I1] = names.lookup(["Sw1", "Sw2", "I1"])
+    chains = {}
+    for switch_id in [SW1, SW2]:
+        devices.make_device(switch_id, devices.SWITCH, 0)
+        previous_id = switch_id
+        chains[switch_id] = []
+        for i in range(10):
+            gate_id = names.intern("".join(["Not", str(switch_id), "_",
+                                            str(i)]))
+            devices.make_device(gate_id, devices.NOT)
+            network.make_connection(previous_id, None, gate_id, I1)
+            chains[switch_id].append(gate_id)
+            previous_id = gate_id
+
+    assert network.execute_network()
+
+    executed = []
+    execute_device = network.execute_device
+
+    def counting_execute_device(device_id):
+        executed.append(device_id)
+        return execute_device(device_id)
+
+    network.execute_device = counting_execute_device
+    assert network.execute_network()
+    assert executed == []  # nothing changed
+
+    devices.set_switch(SW1, devices.HIGH)
+    assert network.execute_network()
+    assert set(executed) == set([SW1] + chains[SW1])
+    assert network.get_output_signal(chains[SW1][-1], None) == devices.HIGH
+
+
+def test_event_engine_oscillation():
+    """Test if the event engine returns False for oscillating networks."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    network.set_engine(network.EVENT)
+
+    [NOR1, I1] = names.lookup(["Nor1", "I1"])
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+
+    assert not network.execute_network()
+    assert not network.execute_network()
+
+
+def test_event_engine_rebuilds_after_connection_change():
+    """Test if the fan-out index is rebuilt when connections change."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    network.set_engine(network.EVENT)
+
+    [SW1, SW2, OR1, I1, I2] = names.lookup(["Sw1", "Sw2", "Or1", "I1", "I2"])
+    devices.make_device(SW1, devices.SWITCH, 1)
+    devices.make_device(SW2, devices.SWITCH, 0)
+    devices.make_device(OR1, devices.OR, 2)
+    network.make_connection(SW1, None, OR1, I1)
+    network.make_connection(SW2, None, OR1, I2)
+    assert network.execute_network()
+    assert network.get_output_signal(OR1, None) == devices.HIGH
+
+    network.remove_connection(SW1, None, OR1, I1)
+    network.make_connection(SW2, None, OR1, I1)
+    assert network.execute_network()
+    assert network.get_output_signal(OR1, None) == devices.LOW
@@ -0,0 +1,252 @@
+"""Test the levels module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from levels import find_loops, levelize
+
+
+@pytest.fixture
+def new_network():
+    """Return a new Network instance using the LEVELIZED engine."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    network = Network(new_names, new_devices)
+    network.set_engine(network.LEVELIZED)
+    return network
+
+
+def test_find_loops():
+    """Test if strongly connected components are found in topological order."""
+    # 0 -> 1 -> 2 -> 1, 2 -> 3, 4 -> 4
+    successors = [[1], [2], [1, 3], [], [4]]
+    assert find_loops(5, successors) == [[4], [0], [1, 2], [3]]
+
+
+def test_levelize():
+    """Test if blocks are assigned to levels after all their predecessors."""
+    # 0 -> 2, 1 -> 2, 2 -> 3 -> 4 -> 3, 1 -> 4
+    successors = [[2], [2, 4], [3], [4], [3]]
+    assert levelize(5, successors) == [(0, [0]), (0, [1]), (1, [2]),
+                                       (2, [3, 4])]
+
+
+def test_deep_chain_settles(new_network):
+    """Test if a chain deeper than the iteration limit settles in one pass."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SW1, I1] = names.lookup(["Sw1", "I1"])
+
+    # Make the chain last-first, the worst order for a sweep
+    chain = names.lookup(["".join(["Not", str(i)]) for i in range(50)])
+    devices.make_device(SW1, devices.SWITCH, 0)
+    for gate_id in reversed(chain):
+        devices.make_device(gate_id, devices.NOT)
+    network.make_connection(SW1, None, chain[0], I1)
+    for previous_id, gate_id in zip(chain, chain[1:]):
+        network.make_connection(previous_id, None, gate_id, I1)
+
+    assert network.execute_network()
+    assert network.get_output_signal(chain[-1], None) == devices.LOW
+    devices.set_switch(SW1, devices.HIGH)
+    assert network.execute_network()
+    assert network.get_output_signal(chain[-1], None) == devices.HIGH
+
+    # The sweep engine's iteration limit grows with the depth of the chain
+    network.set_engine(network.SWEEP)
+    devices.set_switch(SW1, devices.LOW)
+    assert network.execute_network()
+    assert network.get_output_signal(chain[-1], None) == devices.LOW
+
+    # but with a fixed limit it gives up before the change reaches the end
+    network.iteration_limit = 20
+    devices.set_switch(SW1, devices.HIGH)
+    assert not network.execute_network()
+
+
+def test_latch_settles(new_network):
+    """Test if a cross-coupled NAND latch is found as a loop and settles."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SET, RESET, NAND1, NAND2, I1, I2] = names.lookup(
+        ["Set", "Reset", "Nand1", "Nand2", "I1", "I2"])
+
+    devices.make_device(SET, devices.SWITCH, 1)
+    devices.make_device(RESET, devices.SWITCH, 1)
+    devices.make_device(NAND1, devices.NAND, 2)
+    devices.make_device(NAND2, devices.NAND, 2)
+    network.make_connection(SET, None, NAND1, I1)
+    network.make_connection(NAND2, None, NAND1, I2)
+    network.make_connection(RESET, None, NAND2, I1)
+    network.make_connection(NAND1, None, NAND2, I2)
+
+    engine = network.levelized_engine
+    engine.build()
+    assert [block for level, block, is_loop in engine.schedule
+            if is_loop] == [[engine.order.index(NAND1),
+                             engine.order.index(NAND2)]]
+
+    devices.set_switch(SET, devices.LOW)  # set the latch
+    assert network.execute_network()
+    devices.set_switch(SET, devices.HIGH)  # and hold it
+    assert network.execute_network()
+    assert [network.get_output_signal(NAND1, None),
+            network.get_output_signal(NAND2, None)] == [devices.HIGH,
+                                                        devices.LOW]
+
+    devices.set_switch(RESET, devices.LOW)  # reset the latch
+    assert network.execute_network()
+    devices.set_switch(RESET, devices.HIGH)  # and hold it
+    assert network.execute_network()
+    assert [network.get_output_signal(NAND1, None),
+            network.get_output_signal(NAND2, None)] == [devices.LOW,
+                                                        devices.HIGH]
+
+
+ENGINES = ["SWEEP", "EVENT", "LEVELIZED", "VECTORIZED", "COMPILED",
+           "PARTITIONED"]
+
+
+def run_loop_circuit(engine, device_list, connections, stimulus,
+                     get_all_signals):
+    """Return the signals of a circuit after every cycle of stimulus.
+
+    device_list is a list of (name, kind, property), connections a list of
+    (output name, input name) and stimulus a list of (switch name, state),
+    one per cycle. The circuit is run with the engine named engine, and its
+    signals are read with the get_all_signals fixture.
+    """
+    if engine == "VECTORIZED":
+        pytest.importorskip("numpy")
+    names = Names()
+    devices = Devices(names, seed=0)
+    network = Network(names, devices)
+    assert network.set_engine(getattr(network, engine))
+    for name, kind, device_property in device_list:
+        devices.make_device(names.lookup([name])[0], getattr(devices, kind),
+                            device_property)
+    for output_name, input_name in connections:
+        network.make_connection(*(devices.get_signal_ids(output_name) +
+                                  devices.get_signal_ids(input_name)))
+
+    results = []
+    for switch_name, state in stimulus:
+        devices.set_switch(names.query(switch_name), state)
+        results.append((network.execute_network(),
+                        get_all_signals(devices, network)))
+    return results
+
+
+@pytest.mark.parametrize("engine", ENGINES[1:])
+def test_loop_settles_like_sweep(engine, get_all_signals):
+    """Test if a loop that settles with a sweep settles the same way."""
+    # An even loop: G32 = AND(G31, G28, G8), G28 = NAND(G34), G34 = NOT(G32)
+    device_list = [("G31", "SWITCH", 1), ("G8", "SWITCH", 1),
+                   ("G32", "AND", 3), ("G28", "NAND", 1), ("G34", "NOT", None)]
+    connections = [("G31", "G32.I1"), ("G28", "G32.I2"), ("G8", "G32.I3"),
+                   ("G34", "G28.I1"), ("G32", "G34.I1")]
+    stimulus = [("G31", 1), ("G8", 1), ("G31", 0), ("G31", 1), ("G8", 0),
+                ("G8", 1)]
+    expected = run_loop_circuit("SWEEP", device_list, connections, stimulus,
+                                get_all_signals)
+    assert run_loop_circuit(engine, device_list, connections, stimulus,
+                            get_all_signals) == expected
+    # G32, G28, G34 settle to 1, 1, 0 with both switches on, and the loop
+    # holds G32 at 0 once a switch has turned it off
+    assert expected[0] == (True, [1, 1, 1, 1, 0])
+    assert expected[-1] == (True, [1, 1, 0, 0, 1])
+
+
+@pytest.mark.parametrize("engine", ENGINES[1:])
+def test_d_type_loop_settles_like_sweep(engine, get_all_signals):
+    """Test if a D-type in a loop through its SET and CLEAR settles alike."""
+    device_list = [("Sw1", "SWITCH", 0), ("Sw2", "SWITCH", 0),
+                   ("D1", "D_TYPE", None), ("G1", "NAND", 2), ("G2", "OR", 2)]
+    connections = [("D1.QBAR", "G1.I1"), ("G2", "G1.I2"), ("Sw1", "G2.I1"),
+                   ("Sw1", "G2.I2"), ("G1", "D1.DATA"), ("Sw1", "D1.CLK"),
+                   ("D1.Q", "D1.SET"), ("G1", "D1.CLEAR")]
+    stimulus = [("Sw1", 0), ("Sw1", 0), ("Sw2", 1), ("Sw1", 0), ("Sw1", 1),
+                ("Sw1", 0), ("Sw1", 0), ("Sw2", 0)]
+    assert run_loop_circuit(engine, device_list, connections, stimulus,
+                            get_all_signals) == \
+        run_loop_circuit("SWEEP", device_list, connections, stimulus,
+                         get_all_signals)
+
+
+@pytest.mark.parametrize("engine", ENGINES[1:])
+def test_gated_clock_d_type_like_sweep(engine, get_all_signals):
+    """Test if a D-type clocked through a gate samples DATA like a sweep."""
+    # The clock edge reaches D1.CLK a sweep after DATA has changed
+    device_list = [("C", "CLOCK", 1), ("N", "NOT", None),
+                   ("D1", "D_TYPE", None), ("S", "SWITCH", 0)]
+    connections = [("C", "N.I1"), ("N", "D1.CLK"), ("C", "D1.DATA"),
+                   ("S", "D1.SET"), ("S", "D1.CLEAR")]
+    stimulus = [("S", 0)] * 8
+    expected = run_loop_circuit("SWEEP", device_list, connections, stimulus,
+                                get_all_signals)
+    assert run_loop_circuit(engine, device_list, connections, stimulus,
+                            get_all_signals) == expected
+    # D1.Q is always 0, as DATA has fallen by the time CLK rises
+    assert all(signals[2] == 0 for settled, signals in expected)
+
+
+def test_levelized_oscillation(new_network):
+    """Test if the levelized engine returns False for oscillating loops."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [NOR1, I1] = names.lookup(["Nor1", "I1"])
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+
+    assert not network.execute_network()
+
+
+def test_switch_executes_only_its_cone(new_network):
+    """Test if setting a switch only executes the devices it drives."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SW1, SW2, I1] = names.lookup(["Sw1", "Sw2", "I1"])
+    chains = [names.lookup(["".join(["Not", str(chain), str(i)])
+                            for i in range(5)]) for chain in range(2)]
+    for switch_id, chain in zip([SW1, SW2], chains):
+        devices.make_device(switch_id, devices.SWITCH, 0)
+        for gate_id in chain:
+            devices.make_device(gate_id, devices.NOT)
+        network.make_connection(switch_id, None, chain[0], I1)
+        for previous_id, gate_id in zip(chain, chain[1:]):
+            network.make_connection(previous_id, None, gate_id, I1)
+
+    engine = network.levelized_engine
+    executed = []
+    get_targets = engine.get_targets
+
+    def counting_get_targets(rank):
+        executed.append(engine.order[rank])
+        return get_targets(rank)
+    engine.get_targets = counting_get_targets
+
+    assert network.execute_network()
+    assert len(executed) == 12
+
+    # Nothing has changed, so nothing is executed
+    del executed[:]
+    assert network.execute_network()
+    assert executed == []
+
+    devices.set_switch(SW2, devices.HIGH)
+    assert network.execute_network()
+    assert sorted(executed) == sorted([SW2] + chains[1])
+    assert network.get_output_signal(chains[1][-1], None) == devices.LOW
+    assert network.get_output_signal(chains[0][-1], None) == devices.HIGH
+
+    # A cold startup executes every device again
+    del executed[:]
+    devices.cold_startup()
+    assert network.execute_network()
+    assert len(executed) == 12
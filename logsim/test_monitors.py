@@ -1,10 +1,14 @@
 """Test the monitors module."""
+import random
+
 import pytest
 
 from names import Names
 from network import Network
 from devices import Devices
-from monitors import Monitors
+from monitors import Monitors, Trace, RingTrace, ChangeTrace
+from scanner import Scanner
+from parse import Parser
 
 
 @pytest.fixture
@@ -154,6 +158,76 @@ def test_reset_monitors(new_monitors):
                                                 (OR1_ID, None): []}
 
 
+def test_trace_behaves_as_list():
+    """Test if a packed trace with a start offset behaves as a signal list."""
+    BLANK = 4
+    trace = Trace(BLANK, 3, [0, 1])
+    assert len(trace) == 5
+    assert trace.signals.tolist() == [0, 1]  # the start is not stored
+    assert trace == [BLANK, BLANK, BLANK, 0, 1]
+    assert [BLANK, BLANK, BLANK, 0, 1] == trace
+    assert trace != [BLANK, BLANK, 0, 1]
+    assert list(trace) == trace.tolist() == [BLANK, BLANK, BLANK, 0, 1]
+    assert (trace[0], trace[3], trace[-1]) == (BLANK, 0, 1)
+    assert trace[2:4] == [BLANK, 0]
+    assert trace[::2] == [BLANK, BLANK, 1]
+    with pytest.raises(IndexError):
+        trace[5]
+
+    trace.extend([1, 0])
+    trace.append(1)
+    trace[4] = 0
+    trace[1] = BLANK  # already BLANK, so still not stored
+    assert trace.start == 3
+    del trace[6:]
+    assert trace == [BLANK, BLANK, BLANK, 0, 0, 1]
+
+    # Changing a signal before the start stores the BLANK signals
+    trace[1] = 0
+    assert trace.start == 0
+    assert trace == [BLANK, 0, BLANK, 0, 0, 1]
+
+
+def test_late_monitor_is_not_padded(new_monitors):
+    """Test if a monitor made after some cycles stores a start offset."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+    new_monitors.remove_monitor(OR1_ID, None)
+    new_monitors.record_signals()
+    new_monitors.make_monitor(OR1_ID, None, 1)
+    new_monitors.record_signals()
+
+    trace = new_monitors.monitors_dictionary[(OR1_ID, None)]
+    assert trace == [devices.BLANK, devices.LOW]
+    assert (trace.start, len(trace.signals)) == (1, 1)
+    snapshot = new_monitors.snapshot()
+    new_monitors.reset_monitors()
+    new_monitors.restore(snapshot)
+    assert new_monitors.monitors_dictionary[(OR1_ID, None)].start == 1
+
+
+def test_snapshot_and_restore(new_monitors):
+    """Test if monitors and their traces can be saved and restored."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+
+    LOW = devices.LOW
+    new_monitors.record_signals()
+    snapshot = new_monitors.snapshot()
+    new_monitors.record_signals()
+    new_monitors.remove_monitor(SW2_ID, None)
+
+    new_monitors.restore(snapshot)
+    assert new_monitors.monitors_dictionary == {(SW1_ID, None): [LOW],
+                                                (SW2_ID, None): [LOW],
+                                                (OR1_ID, None): [LOW]}
+    assert list(new_monitors.monitors_dictionary) == [(SW1_ID, None),
+                                                      (SW2_ID, None),
+                                                      (OR1_ID, None)]
+
+
 def test_display_signals(capsys, new_monitors):
     """Test if signal traces are displayed correctly on the console."""
     names = new_monitors.names
@@ -197,3 +271,291 @@ def test_display_signals(capsys, new_monitors):
             "Clock1: -__--__--__--__--__-" in traces)
 
     assert "" in traces  # additional empty line at the end
+
+
+def test_ring_trace_keeps_last_cycles():
+    """Test if a ring trace holds its last cycles at their absolute index."""
+    trace = RingTrace(4, 3, 1)
+    assert (len(trace), trace.first_cycle, trace.tolist()) == (1, 0, [4])
+    trace.extend([0, 1, 1, 0])
+    assert (len(trace), trace.first_cycle) == (5, 2)
+    assert trace == [1, 1, 0]
+    assert (trace[2], trace[4], trace[-1], trace[3:]) == (1, 0, 0, [1, 0])
+    with pytest.raises(IndexError):
+        trace[1]
+    assert (len(trace.signals), trace[:3]) == (3, [1])
+
+    # A long repeat only writes the cycles that end up in the buffer
+    trace.repeat([0, 1], 1001)
+    assert (len(trace), trace.first_cycle) == (1006, 1003)
+    assert trace == [0, 1, 0]
+    assert len(trace.signals) == 3
+
+    del trace[1005:]
+    assert trace == [0, 1]
+    copy = trace.copy()
+    trace.append(1)
+    assert copy == [0, 1] and trace == [0, 1, 1]
+
+    # A single cycle can be deleted, like a slice, if it is the last
+    del trace[-1]
+    assert (len(trace), trace) == (1005, [0, 1])
+    del trace[1004]
+    assert (len(trace), trace) == (1004, [0])
+    with pytest.raises(IndexError):
+        del trace[1000]  # no longer held
+    with pytest.raises(IndexError):
+        del trace[1004]  # not recorded yet
+    trace.append(1)
+    with pytest.raises(IndexError):
+        del trace[1003]  # not the last cycle
+
+
+def test_monitor_capacity(capsys, new_monitors):
+    """Test if monitors with a capacity display their last cycles."""
+    names = new_monitors.names
+    devices = new_monitors.devices
+    network = new_monitors.network
+    [SW1_ID, SW2_ID, OR1_ID] = names.lookup(["Sw1", "Sw2", "Or1"])
+    new_monitors.remove_monitor(SW2_ID, None)
+    new_monitors.remove_monitor(OR1_ID, None)
+    new_monitors.capacity = 4
+    new_monitors.make_monitor(OR1_ID, None)
+    new_monitors.make_monitor(SW2_ID, None, capacity=6)
+
+    for cycle in range(10):
+        devices.set_switch(SW1_ID, cycle % 2)
+        assert network.run(1, new_monitors) == (True, 1)
+    traces = new_monitors.monitors_dictionary
+    assert traces[(OR1_ID, None)] == [0, 1, 0, 1]
+    assert len(traces[(OR1_ID, None)]) == 10
+    assert len(traces[(SW2_ID, None)].signals) == 6
+    assert new_monitors.get_first_cycle() == 6
+
+    new_monitors.display_signals()
+    out, _ = capsys.readouterr()
+    assert out.split("\n") == ["Cycle: 6",
+                               "Sw1  : _-_-",
+                               "Or1  : _-_-",
+                               "Sw2  : ____",
+                               ""]
+
+    # Resetting the monitors keeps their capacity
+    new_monitors.reset_monitors()
+    assert traces[(OR1_ID, None)].capacity == 4
+    assert new_monitors.get_first_cycle() == 0
+
+
+def test_change_trace_queries():
+    """Test if a change trace stores changes and answers range queries."""
+    [LOW, HIGH, BLANK] = [0, 1, 4]
+    trace = ChangeTrace(BLANK, 2)
+    signals = [LOW] * 3 + [HIGH] * 4 + [LOW, HIGH, HIGH]
+    trace.extend(signals)
+    assert trace == [BLANK, BLANK] + signals
+    assert len(trace) == 12
+    assert (trace.changes.tolist(), trace.values.tolist()) == (
+        [0, 2, 5, 9, 10], [BLANK, LOW, HIGH, LOW, HIGH])
+
+    assert [trace.value_at(cycle) for cycle in [0, 2, 4, 5, 8, 9, 11]] == [
+        BLANK, LOW, LOW, HIGH, HIGH, LOW, HIGH]
+    assert (trace[-1], trace[::5]) == (HIGH, [BLANK, HIGH, HIGH])
+    assert trace[3:7] == [LOW, LOW, HIGH, HIGH]
+    with pytest.raises(IndexError):
+        trace[12]
+
+    assert trace.edges(HIGH) == [5, 10]
+    assert trace.edges(LOW) == [9]  # the first LOW follows BLANK cycles
+    assert trace.edges(HIGH, 6, 11) == [10]
+    assert trace.edges(HIGH, 5, 10) == [5]
+    assert trace.slice(4, 10) == [(4, LOW), (5, HIGH), (9, LOW)]
+    assert trace.slice(20, 30) == []
+
+    trace[6] = LOW
+    assert trace == [BLANK, BLANK] + [LOW] * 3 + [HIGH, LOW, HIGH, HIGH,
+                                                  LOW, HIGH, HIGH]
+    del trace[6:]
+    assert trace.edges(HIGH) == [5]
+    copy = trace.copy()
+    trace.append(HIGH)
+    assert copy == [BLANK, BLANK, LOW, LOW, LOW, HIGH]
+    assert trace.changes == copy.changes and len(trace) == 7
+
+    # A single cycle can be deleted, like a slice, if it is the last
+    del trace[-1]
+    assert trace == copy
+    del trace[5]
+    assert (trace, trace.edges(HIGH)) == ([BLANK, BLANK, LOW, LOW, LOW], [])
+    with pytest.raises(IndexError):
+        del trace[5]  # not recorded yet
+    with pytest.raises(IndexError):
+        del trace[-6]
+    with pytest.raises(IndexError):
+        del trace[3]  # not the last cycle
+
+
+def test_change_trace_edges_match_trace():
+    """Test if the edges of a change trace are those of the signal list."""
+    [LOW, HIGH, BLANK] = [0, 1, 4]
+    generator = random.Random(0)
+    for start in [0, 3]:
+        signals = [generator.choice([LOW, LOW, HIGH]) for cycle in range(50)]
+        trace = Trace(BLANK, start, signals)
+        change_trace = ChangeTrace(BLANK, start)
+        change_trace.extend(signals)
+        assert change_trace == trace
+        for kind in [LOW, HIGH]:
+            for first, end in [(0, len(trace)), (0, 10), (start, start + 1),
+                               (7, 40), (generator.randrange(len(trace)),
+                                         len(trace))]:
+                assert change_trace.edges(kind, first, end) == [
+                    cycle for cycle in range(max(first, 1), end)
+                    if trace[cycle] == kind and
+                    trace[cycle - 1] not in [kind, BLANK]]
+
+
+def test_change_trace_is_small_for_slow_signals():
+    """Test if a slowly changing signal stores one entry per change."""
+    trace = ChangeTrace(4)
+    for cycle in range(10):
+        trace.repeat([cycle % 2], 100000)
+    trace.repeat([0, 0, 1, 1], 6)
+    assert len(trace) == 1000006
+    assert len(trace.changes) == 13
+    assert trace.value_at(250000) == 0 and trace.value_at(350000) == 1
+    assert trace.edges(1, 0, 500000) == [100000, 300000]
+    assert trace[-6:] == [0, 0, 1, 1, 0, 0]
+
+
+def test_compact_monitors(capsys):
+    """Test if compact monitors record change traces like ordinary ones."""
+    outputs = []
+    for compact in [False, True]:
+        names = Names()
+        devices = Devices(names, seed=2)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network, compact)
+        [SW1_ID, CL1_ID] = names.lookup(["Sw1", "Clock1"])
+        devices.make_device(SW1_ID, devices.SWITCH, 0)
+        devices.make_device(CL1_ID, devices.CLOCK, 5)
+        monitors.make_monitor(SW1_ID, None)
+        monitors.make_monitor(CL1_ID, None)
+        assert network.run(12, monitors) == (True, 12)
+        devices.set_switch(SW1_ID, devices.HIGH)
+        assert network.execute_network()
+        monitors.record_signals()
+        monitors.display_signals()
+        outputs.append(capsys.readouterr()[0])
+        trace = monitors.monitors_dictionary[(SW1_ID, None)]
+        assert isinstance(trace, ChangeTrace) == compact
+        monitors.reset_monitors()
+        assert isinstance(monitors.monitors_dictionary[(SW1_ID, None)],
+                          ChangeTrace) == compact
+    assert outputs[0] == outputs[1]
+    assert "Sw1   : ____________-" in outputs[1]
+
+
+def test_compact_snapshot_and_restore():
+    """Test if a snapshot of compact monitors keeps its number of cycles."""
+    names = Names()
+    devices = Devices(names, seed=0)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network, compact=True)
+    [CL1_ID] = names.lookup(["Clock1"])
+    devices.make_device(CL1_ID, devices.CLOCK, 2)
+    monitors.make_monitor(CL1_ID, None)
+
+    assert network.run(10, monitors) == (True, 10)
+    trace = monitors.monitors_dictionary[(CL1_ID, None)]
+    expected = trace.tolist()
+    snapshot = monitors.snapshot()
+    assert network.run(5, monitors) == (True, 5)
+    assert [len(trace) for device_id, output_id, trace in snapshot] == [10]
+    assert len(trace.copy()) == 15
+
+    monitors.restore(snapshot)
+    trace = monitors.monitors_dictionary[(CL1_ID, None)]
+    assert len(trace) == 10
+    assert trace.tolist() == expected
+
+    # The restored trace records the next cycles as before
+    assert network.run(3, monitors) == (True, 3)
+    assert len(trace) == 13
+    assert trace.tolist()[:10] == expected
+    monitors.restore(snapshot)
+    assert len(monitors.monitors_dictionary[(CL1_ID, None)]) == 10
+
+
+@pytest.mark.parametrize("engine", ["SWEEP", "EVENT", "LEVELIZED",
+                                    "VECTORIZED", "COMPILED", "PARTITIONED"])
+def test_compact_monitors_record_changes(engine):
+    """Test if recording only changed outputs gives the full traces."""
+    if engine == "VECTORIZED":
+        pytest.importorskip("numpy")
+    results = []
+    for compact in [False, True]:
+        names = Names()
+        devices = Devices(names, seed=3)
+        network = Network(names, devices)
+        monitors = Monitors(names, devices, network, compact)
+        scanner = Scanner("logsim/tests/ir2_counter.txt", names)
+        assert Parser(names, devices, network, monitors,
+                      scanner).parse_network()
+        assert network.set_engine(getattr(network, engine))
+        network.partitioned_engine.workers = 2
+        outputs = [(device.device_id, output_id)
+                   for device in devices.devices_list
+                   for output_id in device.outputs]
+        for device_id, output_id in outputs[:-3]:
+            monitors.make_monitor(device_id, output_id)
+        switches = devices.find_devices(devices.SWITCH)
+        stimulus = random.Random(1)
+
+        for cycle in range(40):
+            if cycle % 7 == 3:
+                devices.set_switch(stimulus.choice(switches),
+                                   stimulus.choice([0, 1]))
+            if cycle == 20:
+                devices.cold_startup()
+                monitors.remove_monitor(*outputs[0])
+                for device_id, output_id in outputs[-3:]:
+                    monitors.make_monitor(device_id, output_id, cycle)
+            assert network.execute_network()
+            monitors.record_signals()
+        assert network.run(10, monitors) == (True, 10)
+        network.partitioned_engine.stop()
+        results.append({output: trace.tolist() for output, trace in
+                        monitors.monitors_dictionary.items()})
+
+    assert results[0] == results[1]
+    assert all(len(trace) == 50 for trace in results[1].values())
+
+
+def test_quiet_monitors_are_not_touched():
+    """Test if compact monitors only touch the traces of changed outputs."""
+    names = Names()
+    devices = Devices(names, seed=0)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network, compact=True)
+    network.set_engine(network.LEVELIZED)
+    [SW1_ID, CL1_ID] = names.lookup(["Sw1", "Clock1"])
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(CL1_ID, devices.CLOCK, 4)
+    monitors.make_monitor(SW1_ID, None)
+    monitors.make_monitor(CL1_ID, None)
+    switch_trace = monitors.monitors_dictionary[(SW1_ID, None)]
+    clock_trace = monitors.monitors_dictionary[(CL1_ID, None)]
+
+    assert network.run(3, monitors) == (True, 3)
+    recorded = (switch_trace.recorded, clock_trace.recorded)
+    assert network.run(3, monitors) == (True, 3)
+    # The switch trace only grows through the shared clock
+    assert switch_trace.recorded == recorded[0]
+    assert clock_trace.recorded > recorded[1]
+    assert switch_trace == [devices.LOW] * 6
+    assert len(clock_trace) == 6 and clock_trace.edges(devices.HIGH)
+
+    devices.set_switch(SW1_ID, devices.HIGH)
+    assert network.run(2, monitors) == (True, 2)
+    assert switch_trace.edges(devices.HIGH) == [6]
+    assert switch_trace.slice(0, 8) == [(0, devices.LOW), (6, devices.HIGH)]
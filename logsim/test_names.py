@@ -55,3 +55,23 @@ def test_get_name_string():
                                       for ID in IDs]
     # Check that an unused ID number returns None
     assert (new_names.get_name_string(3) is None)
+
+
+def test_intern():
+    """Check single names are interned consistently with lookup."""
+    new_names = Names()
+    assert new_names.intern("Zero") == 0
+    assert new_names.lookup(["One", "Zero"]) == [1, 0]
+    assert new_names.intern("One") == 1
+    assert new_names.intern("Two") == 2
+    assert new_names.names_list == ["Zero", "One", "Two"]
+    with pytest.raises(TypeError):
+        new_names.intern(3)
+
+
+def test_get_name_string_invalid_ids():
+    """Check invalid IDs return None instead of indexing the names list."""
+    new_names = Names()
+    new_names.lookup(["Zero", "One"])
+    assert new_names.get_name_string(-1) is None
+    assert new_names.get_name_string(None) is None
@@ -1,9 +1,12 @@
 """Test the network module."""
+import random
+
 import pytest
 
 from names import Names
 from devices import Devices
 from network import Network
+from monitors import Monitors
 
 
 @pytest.fixture
@@ -351,3 +354,331 @@ def test_oscillating_network(new_network):
     network.make_connection(NOR1, None, NOR1, I1)
 
     assert not network.execute_network()
+
+
+def test_sweep_plan_follows_new_devices(new_network):
+    """Test if the cached sweep plan is rebuilt when devices are added."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SW1_ID, NOT1_ID, I1] = names.lookup(["Sw1", "Not1", "I1"])
+
+    devices.make_device(SW1_ID, devices.SWITCH, 1)
+    assert network.execute_network()
+    assert len(network.sweep_plan) == 1
+
+    devices.make_device(NOT1_ID, devices.NOT)
+    network.make_connection(SW1_ID, None, NOT1_ID, I1)
+    assert network.execute_network()
+    assert len(network.sweep_plan) == 2
+    assert network.get_output_signal(NOT1_ID, None) == devices.LOW
+
+
+def test_loop_queries(new_network):
+    """Test if feedback loops are found and kept up to date."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SW1_ID, SW2_ID, NAND1_ID, NAND2_ID, NOT1_ID, CL_ID, D_ID, I1,
+     I2] = names.lookup(["Sw1", "Sw2", "Nand1", "Nand2", "Not1", "Clock1",
+                         "D1", "I1", "I2"])
+
+    devices.make_device(SW1_ID, devices.SWITCH, 1)
+    devices.make_device(SW2_ID, devices.SWITCH, 1)
+    devices.make_device(NAND1_ID, devices.NAND, 2)
+    devices.make_device(NAND2_ID, devices.NAND, 2)
+    devices.make_device(NOT1_ID, devices.NOT)
+    devices.make_device(CL_ID, devices.CLOCK, 1)
+    devices.make_device(D_ID, devices.D_TYPE)
+
+    # A cross-coupled NAND latch driving a NOT gate
+    network.make_connection(SW1_ID, None, NAND1_ID, I1)
+    network.make_connection(NAND2_ID, None, NAND1_ID, I2)
+    network.make_connection(SW2_ID, None, NAND2_ID, I1)
+    network.make_connection(NAND1_ID, None, NAND2_ID, I2)
+    network.make_connection(NAND1_ID, None, NOT1_ID, I1)
+
+    # A D-type feeding back to its own DATA input is not a loop
+    network.make_connection(D_ID, devices.QBAR_ID, D_ID, devices.DATA_ID)
+    network.make_connection(CL_ID, None, D_ID, devices.CLK_ID)
+    network.make_connection(SW1_ID, None, D_ID, devices.SET_ID)
+    network.make_connection(SW2_ID, None, D_ID, devices.CLEAR_ID)
+
+    assert network.get_loops() == [[NAND1_ID, NAND2_ID]]
+    assert network.get_loop(NAND2_ID) == [NAND1_ID, NAND2_ID]
+    assert network.get_loop(NOT1_ID) is None
+    assert network.get_loop(D_ID) is None
+
+    components = network.get_components()
+    assert sorted(device_id for component in components
+                  for device_id in component) == sorted(
+                      devices.find_devices())
+    position = {device_id: number for number, component in
+                enumerate(components) for device_id in component}
+    assert position[SW1_ID] < position[NAND1_ID] < position[NOT1_ID]
+
+    # Breaking the latch removes the loop
+    network.remove_connection(NAND1_ID, None, NAND2_ID, I2)
+    network.make_connection(SW1_ID, None, NAND2_ID, I2)
+    assert network.get_loops() == []
+
+
+def test_iteration_limit_follows_depth(new_network):
+    """Test if the iteration limit is derived from the logic depth."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SW1_ID, I1] = names.lookup(["Sw1", "I1"])
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    previous_id = SW1_ID
+    for number in range(30):
+        gate_id = names.intern("".join(["Not", str(number)]))
+        devices.make_device(gate_id, devices.NOT)
+        network.make_connection(previous_id, None, gate_id, I1)
+        previous_id = gate_id
+
+    assert network.get_logic_depth() == 31
+    assert network.get_iteration_limit() == 64
+    network.iteration_limit = 5
+    assert network.get_iteration_limit() == 5
+
+
+@pytest.mark.parametrize("engine", [lambda network: network.SWEEP,
+                                    lambda network: network.EVENT,
+                                    lambda network: network.LEVELIZED,
+                                    lambda network: network.COMPILED])
+def test_oscillation_diagnosis(new_network, engine):
+    """Test if the oscillating devices, loop and period are reported."""
+    network = new_network
+    devices = network.devices
+    assert network.set_engine(engine(network))
+    names = devices.names
+    [SW1_ID, NOT1_ID, NOT2_ID, NOT3_ID, AND1_ID, OR1_ID, I1,
+     I2] = names.lookup(["Sw1", "Not1", "Not2", "Not3", "And1", "Or1", "I1",
+                         "I2"])
+
+    # A ring of three NOT gates, gated by a switch, driving an OR gate
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(AND1_ID, devices.AND, 2)
+    devices.make_device(NOT1_ID, devices.NOT)
+    devices.make_device(NOT2_ID, devices.NOT)
+    devices.make_device(NOT3_ID, devices.NOT)
+    devices.make_device(OR1_ID, devices.OR, 2)
+    network.make_connection(SW1_ID, None, AND1_ID, I1)
+    network.make_connection(NOT3_ID, None, AND1_ID, I2)
+    network.make_connection(AND1_ID, None, NOT1_ID, I1)
+    network.make_connection(NOT1_ID, None, NOT2_ID, I1)
+    network.make_connection(NOT2_ID, None, NOT3_ID, I1)
+    network.make_connection(NOT3_ID, None, OR1_ID, I1)
+    network.make_connection(SW1_ID, None, OR1_ID, I2)
+
+    assert network.execute_network()
+    assert network.oscillation is None
+
+    devices.set_switch(SW1_ID, devices.HIGH)  # closes the ring
+    assert not network.execute_network()
+    oscillation = network.oscillation
+    assert set(oscillation.devices) >= {AND1_ID, NOT1_ID, NOT2_ID, NOT3_ID}
+    assert SW1_ID not in oscillation.devices
+    assert oscillation.loops == [[AND1_ID, NOT1_ID, NOT2_ID, NOT3_ID]]
+    assert oscillation.period is not None and oscillation.period > 1
+
+    # Unconnected inputs are not reported as oscillations
+    network.remove_connection(SW1_ID, None, OR1_ID, I2)
+    assert not network.execute_network()
+    assert network.oscillation is None
+
+
+@pytest.mark.parametrize("engine", [lambda network: network.SWEEP,
+                                    lambda network: network.EVENT])
+def test_slow_settling_is_not_an_oscillation(new_network, engine):
+    """Test if a cycle that settles too slowly is not an oscillation."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    assert network.set_engine(engine(network))
+    [SW1_ID, I1] = names.lookup(["Sw1", "I1"])
+    chain = names.lookup(["".join(["Not", str(i)]) for i in range(10)])
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    for gate_id in reversed(chain):
+        devices.make_device(gate_id, devices.NOT)
+    network.make_connection(SW1_ID, None, chain[0], I1)
+    for previous_id, gate_id in zip(chain, chain[1:]):
+        network.make_connection(previous_id, None, gate_id, I1)
+    assert network.execute_network()
+
+    network.iteration_limit = 3
+    devices.set_switch(SW1_ID, devices.HIGH)
+    assert not network.execute_network()
+    assert network.oscillation is None
+
+
+@pytest.mark.parametrize("engine", [lambda network: network.SWEEP,
+                                    lambda network: network.LEVELIZED,
+                                    lambda network: network.COMPILED])
+def test_snapshot_and_rerun(engine):
+    """Test if a restored snapshot runs exactly as it did the first time."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    assert network.set_engine(engine(network))
+
+    [SW1_ID, CL_ID, D_ID, XOR1_ID, I1, I2] = names.lookup(
+        ["Sw1", "Clock1", "D1", "Xor1", "I1", "I2"])
+    devices.make_device(SW1_ID, devices.SWITCH, 0)
+    devices.make_device(CL_ID, devices.CLOCK, 2)
+    devices.make_device(D_ID, devices.D_TYPE)
+    devices.make_device(XOR1_ID, devices.XOR)
+    network.make_connection(D_ID, devices.QBAR_ID, D_ID, devices.DATA_ID)
+    network.make_connection(CL_ID, None, D_ID, devices.CLK_ID)
+    network.make_connection(SW1_ID, None, D_ID, devices.SET_ID)
+    network.make_connection(SW1_ID, None, D_ID, devices.CLEAR_ID)
+    network.make_connection(D_ID, devices.Q_ID, XOR1_ID, I1)
+    network.make_connection(CL_ID, None, XOR1_ID, I2)
+    monitors.make_monitor(XOR1_ID, None)
+    monitors.make_monitor(D_ID, devices.Q_ID)
+
+    for cycle in range(5):
+        assert network.execute_network()
+        monitors.record_signals()
+    snapshot = network.snapshot(monitors)
+
+    runs = []
+    for run in range(2):
+        for cycle in range(12):
+            assert network.execute_network()
+            monitors.record_signals()
+        network.sync_clocks()
+        runs.append((devices.get_state(),
+                     dict(monitors.monitors_dictionary)))
+        assert network.restore(snapshot, monitors)
+        assert all(len(trace) == 5
+                   for trace in monitors.monitors_dictionary.values())
+    assert runs[0] == runs[1]
+
+
+def test_run_records_monitors(new_network):
+    """Test if a batch run records the same traces as a cycle by cycle run."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    monitors = Monitors(names, devices, network)
+    [SW1_ID, CL_ID, XOR1_ID, NOR1_ID, I1, I2] = names.lookup(
+        ["Sw1", "Clock1", "Xor1", "Nor1", "I1", "I2"])
+    devices.make_device(SW1_ID, devices.SWITCH, 1)
+    devices.make_device(CL_ID, devices.CLOCK, 3)
+    devices.make_device(XOR1_ID, devices.XOR)
+    network.make_connection(SW1_ID, None, XOR1_ID, I1)
+    network.make_connection(CL_ID, None, XOR1_ID, I2)
+    monitors.make_monitor(XOR1_ID, None)
+    monitors.make_monitor(CL_ID, None, 2)
+
+    state = devices.get_state()
+    for cycle in range(20):
+        assert network.execute_network()
+        monitors.record_signals()
+    expected_traces = monitors.monitors_dictionary
+    expected_state = devices.get_state()
+
+    devices.set_state(state)
+    monitors.monitors_dictionary = type(expected_traces)(
+        (output, trace[:2] if output == (CL_ID, None) else [])
+        for output, trace in expected_traces.items())
+    assert network.run(20, monitors) == (True, 20)
+    assert monitors.monitors_dictionary == expected_traces
+    assert devices.get_state() == expected_state
+
+    # An oscillation stops the run, and the traces end with the last cycle
+    devices.make_device(NOR1_ID, devices.NOR, 1)
+    network.make_connection(NOR1_ID, None, NOR1_ID, I1)
+    assert network.run(5, monitors) == (False, 0)
+    assert [len(trace) for trace in
+            monitors.monitors_dictionary.values()] == [20, 22]
+
+
+def test_iter_run_yields_chunks(new_network):
+    """Test if a streamed run yields the same signals a chunk at a time."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    monitors = Monitors(names, devices, network)
+    [CL_ID, NOT1_ID, I1] = names.lookup(["Clock1", "Not1", "I1"])
+    devices.make_device(CL_ID, devices.CLOCK, 2)
+    devices.make_device(NOT1_ID, devices.NOT)
+    network.make_connection(CL_ID, None, NOT1_ID, I1)
+    monitors.make_monitor(NOT1_ID, None)
+    monitors.make_monitor(CL_ID, None)
+
+    state = devices.get_state()
+    assert network.run(25, monitors) == (True, 25)
+    expected_traces = {output: list(trace) for output, trace in
+                       monitors.monitors_dictionary.items()}
+    devices.set_state(state)
+    monitors.reset_monitors()
+
+    chunks = list(network.iter_run(25, monitors, chunk=10))
+    assert [(chunk.first_cycle, chunk.cycles_completed, chunk.progress)
+            for chunk in chunks] == [(0, 10, 0.4), (10, 20, 0.8),
+                                     (20, 25, 1.0)]
+    assert all(chunk.settled for chunk in chunks)
+    assert all(len(trace) == 0
+               for trace in monitors.monitors_dictionary.values())
+    for output, trace in expected_traces.items():
+        assert [signal for chunk in chunks
+                for signal in chunk.samples[output]] == trace
+
+    # Stopping early leaves the network after the chunks that were taken
+    devices.set_state(state)
+    run = network.iter_run(25, monitors, chunk=10)
+    first_chunk = next(run)
+    run.close()
+    network.sync_clocks()
+    assert first_chunk.cycles_completed == 10
+    devices.set_state(state)
+    assert network.run(10) == (True, 10)
+    network.sync_clocks()
+    state_after_ten = devices.get_state()
+    devices.set_state(state)
+    next(network.iter_run(25, chunk=10))
+    network.sync_clocks()
+    assert devices.get_state() == state_after_ten
+
+
+@pytest.mark.parametrize("engine", ["EVENT", "LEVELIZED", "VECTORIZED",
+                                    "COMPILED", "PARTITIONED"])
+@pytest.mark.parametrize("path", ["logsim/tests/ir2_counter.txt",
+                                  "logsim/tests/ir2_adder.txt",
+                                  "logsim/tests/ir2_nandnor.txt",
+                                  "logsim/tests/nandnornot.txt",
+                                  "logsim/tests/gated_clock.txt"])
+def test_engine_matches_sweep(parse_network, get_all_signals, path, engine):
+    """Test if every engine gives the same results as the sweep engine."""
+    if engine == "VECTORIZED":
+        pytest.importorskip("numpy")
+    results = []
+    for engine_name in ["SWEEP", engine]:
+        random.seed(0)
+        devices, network = parse_network(
+            path, lambda network: getattr(network, engine_name))
+        # Split even these small circuits between several processes
+        network.partitioned_engine.workers = 3
+        network.partitioned_engine.partition_size = 1
+        network.partitioned_engine.grain = 1
+        switches = devices.find_devices(devices.SWITCH)
+        stimulus = random.Random(1)
+        cycles = []
+        for cycle in range(60):
+            if cycle % 7 == 3:
+                devices.set_switch(stimulus.choice(switches),
+                                   stimulus.choice([0, 1]))
+            if cycle == 40:
+                devices.cold_startup()
+            cycles.append((network.execute_network(), network.steady_state,
+                           get_all_signals(devices, network),
+                           [devices.get_device(device_id).dtype_memory
+                            for device_id in
+                            devices.find_devices(devices.D_TYPE)]))
+        network.partitioned_engine.stop()
+        results.append(cycles)
+    assert results[0] == results[1]
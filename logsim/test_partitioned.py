@@ -0,0 +1,185 @@
+"""Test the partitioned module."""
+import os
+import time
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+
+
+@pytest.fixture
+def new_network():
+    """Return a new Network instance using the PARTITIONED engine."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    network = Network(new_names, new_devices)
+    network.set_engine(network.PARTITIONED)
+    network.partitioned_engine.workers = 2
+    network.partitioned_engine.partition_size = 1
+    network.partitioned_engine.grain = 1
+    yield network
+    network.partitioned_engine.stop()
+
+
+def test_wide_circuit_is_split(new_network):
+    """Test if a wide circuit is balanced between the workers."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    engine = network.partitioned_engine
+    engine.workers = 4
+    [I1, I2] = names.lookup(["I1", "I2"])
+
+    # Eight independent chains of NAND gates fed by the same two switches
+    switch_ids = names.lookup(["Sw1", "Sw2"])
+    for switch_id in switch_ids:
+        devices.make_device(switch_id, devices.SWITCH, 0)
+    chains = []
+    for chain in range(8):
+        chain_ids = names.lookup(["".join(["Nand", str(chain), "_", str(i)])
+                                  for i in range(10)])
+        for position, gate_id in enumerate(chain_ids):
+            devices.make_device(gate_id, devices.NAND, 2)
+            if position == 0:
+                network.make_connection(switch_ids[0], None, gate_id, I1)
+            else:
+                network.make_connection(chain_ids[position - 1], None,
+                                        gate_id, I1)
+            network.make_connection(switch_ids[1], None, gate_id, I2)
+        chains.append(chain_ids)
+
+    engine.build()
+    # Every worker gets two whole chains, so no barrier is needed
+    assert sorted(engine.owners.count(worker)
+                  for worker in range(4)) == [20, 20, 20, 20]
+    assert len(engine.segments) == 1
+    assert network.execute_network()
+    assert [network.get_output_signal(chain_ids[-1], None)
+            for chain_ids in chains] == [devices.HIGH] * 8
+
+    devices.set_switch(switch_ids[1], devices.HIGH)
+    assert network.execute_network()
+    assert [network.get_output_signal(chain_ids[-1], None)
+            for chain_ids in chains] == [devices.LOW] * 8
+
+
+def make_chains(network, chains, length):
+    """Make chains of NAND gates, all driven by a clock and a switch.
+
+    Return the IDs of the clock, the switch and the last gate of each chain.
+    """
+    devices = network.devices
+    names = devices.names
+    [CL1, SW1, I1, I2] = names.lookup(["Clock1", "Sw1", "I1", "I2"])
+    devices.make_device(CL1, devices.CLOCK, 50)
+    devices.make_device(SW1, devices.SWITCH, 1)
+    ends = []
+    for chain in range(chains):
+        previous_id = CL1
+        for position in range(length):
+            [gate_id] = names.lookup(["".join(["Nand", str(chain), "_",
+                                               str(position)])])
+            devices.make_device(gate_id, devices.NAND, 2)
+            network.make_connection(previous_id, None, gate_id, I1)
+            network.make_connection(SW1, None, gate_id, I2)
+            previous_id = gate_id
+        ends.append(previous_id)
+    return (CL1, SW1, ends)
+
+
+def test_partitions_are_large_enough(new_network):
+    """Test if small networks are not split, and run as compiled instead."""
+    network = new_network
+    devices = network.devices
+    engine = network.partitioned_engine
+    engine.workers = 8
+    engine.partition_size = 30
+    (CL1, SW1, ends) = make_chains(network, 4, 20)
+
+    # 80 gates only make two partitions, however many workers there are
+    engine.build()
+    assert engine.partitions == 2
+    assert len(engine.processes) == 1
+    engine.stop()
+
+    # and a network with fewer gates than a partition is not split at all
+    engine.partition_size = 100
+    engine.build()
+    assert network.execute_network()
+    assert engine.partitions == 1
+    assert engine.processes == []
+    assert network.compiled_engine.function is not None
+    assert [network.get_output_signal(end_id, None)
+            for end_id in ends] == [devices.get_device(CL1).outputs[None]] * 4
+    devices.set_switch(SW1, devices.LOW)
+    assert network.execute_network()
+    assert [network.get_output_signal(end_id, None)
+            for end_id in ends] == [devices.HIGH] * 4
+
+
+@pytest.mark.skipif(not os.environ.get("LOGSIM_BENCHMARK"),
+                    reason="set LOGSIM_BENCHMARK=1 to run benchmarks")
+@pytest.mark.skipif((os.cpu_count() or 1) < 4,
+                    reason="needs at least four processor cores")
+def test_partitioned_is_faster_than_compiled():
+    """Benchmark a wide network on the partitioned and compiled engines.
+
+    Timings depend on the machine and its load, so this only runs when the
+    LOGSIM_BENCHMARK environment variable is set.
+    """
+    rates = []
+    for engine in [lambda network: network.COMPILED,
+                   lambda network: network.PARTITIONED]:
+        names = Names()
+        devices = Devices(names, seed=0)
+        network = Network(names, devices)
+        network.set_engine(engine(network))
+        network.partitioned_engine.workers = 4
+        make_chains(network, 8, 5000)
+        assert network.execute_network()
+        start = time.perf_counter()
+        for cycle in range(200):
+            assert network.execute_network()
+        rates.append(200 / (time.perf_counter() - start))
+        network.partitioned_engine.stop()
+    # Four partitions of 10000 gates give a clear speed-up
+    assert rates[1] > 1.5 * rates[0]
+
+
+def test_partitioned_latch(new_network):
+    """Test if a latch settles and holds its state."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SET, RESET, NAND1, NAND2, I1, I2] = names.lookup(
+        ["Set", "Reset", "Nand1", "Nand2", "I1", "I2"])
+
+    devices.make_device(SET, devices.SWITCH, 1)
+    devices.make_device(RESET, devices.SWITCH, 1)
+    devices.make_device(NAND1, devices.NAND, 2)
+    devices.make_device(NAND2, devices.NAND, 2)
+    network.make_connection(SET, None, NAND1, I1)
+    network.make_connection(NAND2, None, NAND1, I2)
+    network.make_connection(RESET, None, NAND2, I1)
+    network.make_connection(NAND1, None, NAND2, I2)
+
+    devices.set_switch(RESET, devices.LOW)  # reset the latch
+    assert network.execute_network()
+    devices.set_switch(RESET, devices.HIGH)  # and hold it
+    assert network.execute_network()
+    assert [network.get_output_signal(NAND1, None),
+            network.get_output_signal(NAND2, None)] == [devices.LOW,
+                                                        devices.HIGH]
+
+
+def test_partitioned_oscillation(new_network):
+    """Test if the partitioned engine returns False for oscillating loops."""
+    network = new_network
+    devices = network.devices
+    [NOR1, I1] = devices.names.lookup(["Nor1", "I1"])
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+
+    assert not network.execute_network()
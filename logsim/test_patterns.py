@@ -0,0 +1,150 @@
+"""Test the patterns module."""
+import itertools
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from patterns import PatternSimulator
+
+
+def monitor_all_outputs(devices, network):
+    """Return a Monitors instance monitoring every output in the network."""
+    monitors = Monitors(devices.names, devices, network)
+    for device in devices.devices_list:
+        for output_id in device.outputs:
+            monitors.make_monitor(device.device_id, output_id)
+    return monitors
+
+
+@pytest.mark.parametrize("path", ["logsim/tests/ir2_counter.txt",
+                                  "logsim/tests/ir2_adder.txt",
+                                  "logsim/tests/ir2_nandnor.txt",
+                                  "logsim/tests/nandnornot.txt",
+                                  "logsim/tests/gated_clock.txt"])
+def test_patterns_match_sweep(parse_network, path):
+    """Test if every pattern gives the same traces as a sweep engine run."""
+    random.seed(0)
+    devices, network = parse_network(path, lambda network: network.SWEEP)
+    monitors = monitor_all_outputs(devices, network)
+    switches = devices.find_devices(devices.SWITCH)
+    patterns = [dict(zip(switches, states)) for states in
+                itertools.product([0, 1], repeat=len(switches))][:70]
+
+    simulator = PatternSimulator(network, monitors)
+    traces = simulator.run(patterns, 30)
+    assert len(traces) == len(patterns)
+
+    for pattern, trace in zip(patterns, traces):
+        random.seed(0)
+        devices, network = parse_network(path,
+                                         lambda network: network.SWEEP)
+        monitors = monitor_all_outputs(devices, network)
+        for switch_id, switch_state in pattern.items():
+            devices.set_switch(switch_id, switch_state)
+        for cycle in range(30):
+            assert network.execute_network()
+            monitors.record_signals()
+        assert trace == monitors.monitors_dictionary
+
+
+def test_patterns_settle_loops_like_sweep():
+    """Test if a loop settles in each pattern as it does with a sweep."""
+    # An even loop: G32 = AND(G31, G28, G8), G28 = NAND(G34), G34 = NOT(G32)
+    traces = []
+    for patterns in [None, [{}]]:
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        [G31, G8, G32, G28, G34, I1, I2, I3] = names.lookup(
+            ["G31", "G8", "G32", "G28", "G34", "I1", "I2", "I3"])
+        devices.make_device(G31, devices.SWITCH, 1)
+        devices.make_device(G8, devices.SWITCH, 1)
+        devices.make_device(G32, devices.AND, 3)
+        devices.make_device(G28, devices.NAND, 1)
+        devices.make_device(G34, devices.NOT)
+        network.make_connection(G31, None, G32, I1)
+        network.make_connection(G28, None, G32, I2)
+        network.make_connection(G8, None, G32, I3)
+        network.make_connection(G34, None, G28, I1)
+        network.make_connection(G32, None, G34, I1)
+        monitors = monitor_all_outputs(devices, network)
+        if patterns is None:
+            for cycle in range(3):
+                assert network.execute_network()
+                monitors.record_signals()
+            traces.append(monitors.monitors_dictionary)
+        else:
+            traces.extend(PatternSimulator(network, monitors).run(patterns,
+                                                                  3))
+    assert traces[1] == traces[0]
+
+
+@pytest.fixture
+def new_simulator():
+    """Return a PatternSimulator for a network with an XOR and a NAND."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    [SW1, SW2, XOR1, NAND1, I1, I2] = names.lookup(
+        ["Sw1", "Sw2", "Xor1", "Nand1", "I1", "I2"])
+    devices.make_device(SW1, devices.SWITCH, 0)
+    devices.make_device(SW2, devices.SWITCH, 0)
+    devices.make_device(XOR1, devices.XOR)
+    devices.make_device(NAND1, devices.NAND, 2)
+    for gate_id in [XOR1, NAND1]:
+        network.make_connection(SW1, None, gate_id, I1)
+        network.make_connection(SW2, None, gate_id, I2)
+    monitors.make_monitor(XOR1, None)
+    monitors.make_monitor(NAND1, None)
+    return PatternSimulator(network, monitors)
+
+
+def test_run_truth_table(new_simulator):
+    """Test if each pattern gets its own gate outputs."""
+    names = new_simulator.devices.names
+    [SW1, SW2, XOR1, NAND1] = names.lookup(["Sw1", "Sw2", "Xor1", "Nand1"])
+    patterns = [{SW1: 0, SW2: 0}, {SW1: 0, SW2: 1}, {SW1: 1, SW2: 0},
+                {SW1: 1, SW2: 1}]
+    traces = new_simulator.run(patterns, 2)
+    assert [trace[(XOR1, None)] for trace in traces] == [[0, 0], [1, 1],
+                                                         [1, 1], [0, 0]]
+    assert [trace[(NAND1, None)] for trace in traces] == [[1, 1], [1, 1],
+                                                          [1, 1], [0, 0]]
+    # The devices themselves are left unchanged
+    assert new_simulator.devices.get_device(SW1).outputs[None] == 0
+
+
+def test_run_many_patterns(new_simulator):
+    """Test if more patterns than fit in a machine word can be run."""
+    names = new_simulator.devices.names
+    [SW1, SW2, XOR1] = names.lookup(["Sw1", "Sw2", "Xor1"])
+    patterns = [{SW1: number % 2, SW2: (number // 3) % 2}
+                for number in range(200)]
+    traces = new_simulator.run(patterns, 1)
+    assert [trace[(XOR1, None)] for trace in traces] == [
+        [(number % 2) ^ ((number // 3) % 2)] for number in range(200)]
+
+
+def test_run_invalid_patterns(new_simulator):
+    """Test if run returns None for patterns that are not switch states."""
+    names = new_simulator.devices.names
+    [SW1, XOR1] = names.lookup(["Sw1", "Xor1"])
+    assert new_simulator.run([{XOR1: 1}], 1) is None
+    assert new_simulator.run([{SW1: 2}], 1) is None
+
+
+def test_run_oscillation():
+    """Test if run returns None if a loop does not settle."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    [NOR1, I1] = names.lookup(["Nor1", "I1"])
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+    assert PatternSimulator(network, monitors).run([{}], 1) is None
@@ -0,0 +1,129 @@
+"""Test the periodic module."""
+import random
+import tracemalloc
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from periodic import PeriodicRunner
+
+
+def parse_counter():
+    """Return the devices, network and monitors of the ripple counter."""
+    random.seed(0)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    scanner = Scanner("logsim/tests/ir2_counter.txt", names)
+    parser = Parser(names, devices, network, monitors, scanner)
+    assert parser.parse_network()
+    for device in devices.devices_list:
+        for output_id in device.outputs:
+            monitors.make_monitor(device.device_id, output_id)
+    return devices, network, monitors
+
+
+def make_counter(bits):
+    """Return the devices, network and monitors of a ripple counter."""
+    random.seed(0)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    [CLK_ID, SW_ID, DATA, CLK, SET, CLEAR, Q, QBAR] = names.lookup(
+        ["Clk", "Sw", "DATA", "CLK", "SET", "CLEAR", "Q", "QBAR"])
+    devices.make_device(CLK_ID, devices.CLOCK, 1)
+    devices.make_device(SW_ID, devices.SWITCH, 0)
+    previous = (CLK_ID, None)
+    for bit in range(bits):
+        [FF_ID] = names.lookup(["Ff" + str(bit)])
+        devices.make_device(FF_ID, devices.D_TYPE)
+        network.make_connection(FF_ID, QBAR, FF_ID, DATA)
+        network.make_connection(SW_ID, None, FF_ID, SET)
+        network.make_connection(SW_ID, None, FF_ID, CLEAR)
+        network.make_connection(previous[0], previous[1], FF_ID, CLK)
+        previous = (FF_ID, Q)
+    return devices, network, monitors
+
+
+def test_run_matches_full_simulation():
+    """Test if extrapolated traces and state match simulating every cycle."""
+    devices, network, monitors = parse_counter()
+    for cycle in range(1000):
+        assert network.execute_network()
+        monitors.record_signals()
+    expected_traces = monitors.monitors_dictionary
+    expected_state = devices.get_state()
+
+    devices, network, monitors = parse_counter()
+    runner = PeriodicRunner(network, monitors)
+    assert runner.run(1000)
+    assert runner.period is not None
+    assert runner.cycles_simulated < 100
+    assert monitors.monitors_dictionary == expected_traces
+    assert devices.get_state() == expected_state
+
+    # Continuing on from the extrapolated state gives the same result
+    for cycle in range(37):
+        assert network.execute_network()
+        monitors.record_signals()
+    devices, network, expected_monitors = parse_counter()
+    assert PeriodicRunner(network, expected_monitors).run(1037)
+    assert monitors.monitors_dictionary == \
+        expected_monitors.monitors_dictionary
+
+
+def test_run_without_period():
+    """Test if the run is simulated in full when no period is found."""
+    devices, network, monitors = parse_counter()
+    runner = PeriodicRunner(network, monitors)
+    runner.history_limit = 2
+    assert runner.run(50)
+    assert runner.period is None
+    assert runner.cycles_simulated == runner.cycles_completed == 50
+    assert all(len(trace) == 50
+               for trace in monitors.monitors_dictionary.values())
+
+
+def test_run_oscillation():
+    """Test if run returns False if the network oscillates."""
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    [NOR1, I1] = names.lookup(["Nor1", "I1"])
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+    assert not PeriodicRunner(network, monitors).run(10)
+
+
+def test_run_memory_does_not_grow_with_cycles():
+    """Test if the runner keeps no state per cycle while searching."""
+    devices, network, monitors = make_counter(10)  # period of 2048 cycles
+    runner = PeriodicRunner(network, monitors)
+    tracemalloc.start()
+    assert runner.run(1500)
+    (current, peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert runner.period is None
+    assert peak < 100000
+
+    # The period is still found once the run is long enough
+    devices, network, monitors = make_counter(3)
+    for device in devices.devices_list:
+        monitors.make_monitor(device.device_id, None)
+    runner = PeriodicRunner(network, monitors)
+    assert runner.run(1000)
+    assert runner.period == 16
+    assert runner.cycles_simulated < 100
+    expected_devices, expected_network, expected_monitors = make_counter(3)
+    for device in expected_devices.devices_list:
+        expected_monitors.make_monitor(device.device_id, None)
+    assert expected_network.run(1000, expected_monitors) == (True, 1000)
+    assert monitors.monitors_dictionary == \
+        expected_monitors.monitors_dictionary
+    assert devices.get_state() == expected_devices.get_state()
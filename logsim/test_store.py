@@ -0,0 +1,138 @@
+"""Test the store module."""
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+
+
+def make_network(compact, seed=None):
+    """Return a Network built on Devices with the given storage mode."""
+    new_names = Names()
+    new_devices = Devices(new_names, compact=compact, seed=seed)
+    return Network(new_names, new_devices)
+
+
+@pytest.fixture
+def compact_network():
+    """Return a Network whose devices are held in a DeviceStore."""
+    return make_network(True)
+
+
+def build_counter(network):
+    """Build a two-bit counter with a switch and return the device IDs."""
+    devices = network.devices
+    names = devices.names
+    [CL, SW, D1, D2, X1] = names.lookup(["Clk", "Sw", "D1", "D2", "X1"])
+    [I1, I2] = names.lookup(["I1", "I2"])
+
+    devices.make_device(CL, devices.CLOCK, 1)
+    devices.make_device(SW, devices.SWITCH, 0)
+    devices.make_device(D1, devices.D_TYPE)
+    devices.make_device(D2, devices.D_TYPE)
+    devices.make_device(X1, devices.XOR)
+
+    network.make_connection(CL, None, D1, devices.CLK_ID)
+    network.make_connection(D1, devices.QBAR_ID, D1, devices.DATA_ID)
+    network.make_connection(D1, devices.Q_ID, X1, I1)
+    network.make_connection(D2, devices.Q_ID, X1, I2)
+    network.make_connection(CL, None, D2, devices.CLK_ID)
+    network.make_connection(X1, None, D2, devices.DATA_ID)
+    for device_id in [D1, D2]:
+        network.make_connection(SW, None, device_id, devices.SET_ID)
+        network.make_connection(SW, None, device_id, devices.CLEAR_ID)
+    return [CL, SW, D1, D2, X1]
+
+
+def test_device_view(compact_network):
+    """Test if views in the store behave like Device objects."""
+    devices = compact_network.devices
+    names = devices.names
+    [CL, SW, D1, D2, X1] = build_counter(compact_network)
+    [I1, I2] = names.lookup(["I1", "I2"])
+
+    assert devices.find_devices() == [CL, SW, D1, D2, X1]
+    assert devices.find_devices(devices.D_TYPE) == [D1, D2]
+    assert len(devices.devices_list) == 5
+    assert [device.device_id for device in devices.devices_list] == \
+        [CL, SW, D1, D2, X1]
+
+    xor = devices.get_device(X1)
+    assert xor == devices.get_device(X1)
+    assert xor != devices.get_device(D1)
+    assert xor.device_kind == devices.XOR
+    assert xor.inputs == {I1: (D1, devices.Q_ID), I2: (D2, devices.Q_ID)}
+    assert xor.outputs == {None: devices.LOW}
+    assert xor.clock_half_period is None
+
+    switch = devices.get_device(SW)
+    assert switch.switch_state == devices.LOW
+    devices.set_switch(SW, devices.HIGH)
+    assert switch.switch_state == devices.HIGH
+
+    assert devices.get_device(CL).clock_half_period == 1
+    assert devices.get_device(D1).dtype_memory in [devices.LOW, devices.HIGH]
+    assert devices.get_device(I1) is None
+
+
+def test_fan_in_table(compact_network):
+    """Test if the CSR fan-in table points at the connected output slots."""
+    devices = compact_network.devices
+    store = devices.store
+    [CL, SW, D1, D2, X1] = build_counter(compact_network)
+
+    xor_index = store.indexes[X1]
+    start = store.input_starts[xor_index]
+    sources = store.input_sources[start:start + store.input_counts[xor_index]]
+    assert list(sources) == [store.get_output_slot(D1, devices.Q_ID),
+                             store.get_output_slot(D2, devices.Q_ID)]
+
+    # Disconnecting an input clears its entry in the table
+    compact_network.remove_connection(D1, devices.Q_ID, X1,
+                                      devices.names.query("I1"))
+    assert store.input_sources[start] == -1
+
+
+def test_ports_added_out_of_order(compact_network):
+    """Test if adding a port to an earlier device keeps connections valid."""
+    devices = compact_network.devices
+    names = devices.names
+    [SW1, SW2, OR1, I1, I2, I3, EXTRA] = names.lookup(
+        ["Sw1", "Sw2", "Or1", "I1", "I2", "I3", "Extra"])
+
+    devices.make_device(SW1, devices.SWITCH, 1)
+    devices.make_device(OR1, devices.OR, 2)
+    devices.make_device(SW2, devices.SWITCH, 0)
+    compact_network.make_connection(SW1, None, OR1, I1)
+    compact_network.make_connection(SW2, None, OR1, I2)
+
+    # Both of these blocks are no longer at the end of their arrays
+    assert devices.add_output(SW1, EXTRA)
+    assert devices.add_input(OR1, I3)
+    compact_network.make_connection(SW1, EXTRA, OR1, I3)
+
+    assert devices.get_device(OR1).inputs == {I1: (SW1, None),
+                                              I2: (SW2, None),
+                                              I3: (SW1, EXTRA)}
+    assert devices.get_device(SW1).outputs == {None: devices.LOW,
+                                               EXTRA: devices.LOW}
+
+
+def test_compact_matches_objects():
+    """Test if compact and object storage simulate identically."""
+    traces = []
+    for compact in [False, True]:
+        network = make_network(compact, seed=1)
+        devices = network.devices
+        [CL, SW, D1, D2, X1] = build_counter(network)
+        trace = []
+        for cycle in range(20):
+            devices.set_switch(SW, cycle // 10)
+            assert network.execute_network()
+            trace.append([network.get_output_signal(device_id, port_id)
+                          for device_id, port_id in [
+                              (CL, None), (D1, devices.Q_ID),
+                              (D2, devices.Q_ID), (X1, None)]])
+        traces.append(trace)
+    assert traces[0] == traces[1]
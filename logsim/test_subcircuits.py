@@ -0,0 +1,95 @@
+"""Test the subcircuits module."""
+import random
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from scanner import Scanner
+from parse import Parser
+from subcircuits import SubcircuitRunner
+
+
+def parse_counter_adder():
+    """Return the devices, network and monitors of the counter and adder."""
+    random.seed(0)
+    names = Names()
+    devices = Devices(names)
+    network = Network(names, devices)
+    monitors = Monitors(names, devices, network)
+    scanner = Scanner("logsim/tests/ir2_counter_adder.txt", names)
+    parser = Parser(names, devices, network, monitors, scanner)
+    assert parser.parse_network()
+    return devices, network, monitors
+
+
+def test_get_subcircuits():
+    """Test if the counter and the adder are found as separate subcircuits."""
+    devices, network, monitors = parse_counter_adder()
+    names = devices.names
+    subcircuits = network.get_subcircuits()
+    assert [sorted(subcircuit) for subcircuit in subcircuits] == [
+        sorted(names.lookup(["ff0", "ff1", "ff2", "ff3", "clk", "clear",
+                             "set"])),
+        sorted(names.lookup(["a", "b", "c", "xor1", "xor2", "and1", "and2",
+                             "or1"]))]
+
+    # Connecting them makes one subcircuit
+    [C, CLEAR, AND1, I1] = names.lookup(["c", "clear", "and1", "I1"])
+    network.remove_connection(C, None, AND1, I1)
+    network.make_connection(CLEAR, None, AND1, I1)
+    assert len(network.get_subcircuits()) == 1
+
+
+def test_run_matches_whole_network():
+    """Test if subcircuits give the same traces and state as one network."""
+    devices, network, monitors = parse_counter_adder()
+    network.set_engine(network.LEVELIZED)
+    [B] = devices.names.lookup(["b"])
+    for cycle in range(50):
+        assert network.execute_network()
+        monitors.record_signals()
+    devices.set_switch(B, devices.HIGH)
+    for cycle in range(30):
+        assert network.execute_network()
+        monitors.record_signals()
+    network.sync_clocks()
+    expected_traces = monitors.monitors_dictionary
+    expected_state = devices.get_state()
+
+    devices, network, monitors = parse_counter_adder()
+    network.set_engine(network.LEVELIZED)
+    runner = SubcircuitRunner(network, monitors)
+    runner.processes = 2
+    try:
+        assert runner.run(50)
+        assert runner.subcircuits_simulated == 2
+        devices.set_switch(B, devices.HIGH)
+        assert runner.run(20)
+        assert runner.subcircuits_simulated == 2
+
+        # The adder has settled, so only the counter is simulated again
+        assert runner.run(10)
+        assert runner.subcircuits_simulated == 1
+    finally:
+        runner.close()
+    network.sync_clocks()
+    assert list(monitors.monitors_dictionary) == list(expected_traces)
+    assert monitors.monitors_dictionary == expected_traces
+    assert devices.get_state() == expected_state
+
+
+def test_oscillating_subcircuit():
+    """Test if an oscillating subcircuit is diagnosed on the whole network."""
+    devices, network, monitors = parse_counter_adder()
+    names = devices.names
+    [NOR1, I1] = names.lookup(["Nor1", "I1"])
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+    runner = SubcircuitRunner(network, monitors)
+    runner.processes = 2
+    try:
+        assert not runner.run(10)
+    finally:
+        runner.close()
+    assert network.oscillation.devices == [NOR1]
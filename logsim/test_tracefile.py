@@ -0,0 +1,132 @@
+"""Test the tracefile module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from periodic import PeriodicRunner
+from tracefile import TraceFileWriter, TraceFile
+
+
+@pytest.fixture
+def new_monitors():
+    """Return a Monitors instance monitoring a clock, a switch and a gate."""
+    new_names = Names()
+    new_devices = Devices(new_names, seed=0)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, CL1_ID, AND1_ID, I1, I2] = new_names.lookup(
+        ["Sw1", "Clock1", "And1", "I1", "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 1)
+    new_devices.make_device(CL1_ID, new_devices.CLOCK, 3)
+    new_devices.make_device(AND1_ID, new_devices.AND, 2)
+    new_network.make_connection(SW1_ID, None, AND1_ID, I1)
+    new_network.make_connection(CL1_ID, None, AND1_ID, I2)
+
+    for device_id in [SW1_ID, CL1_ID, AND1_ID]:
+        new_monitors.make_monitor(device_id, None)
+    return new_monitors
+
+
+def test_trace_file_matches_traces(tmp_path, new_monitors):
+    """Test if a trace file written during runs reads back every cycle."""
+    monitors = new_monitors
+    devices = monitors.devices
+    network = monitors.network
+    [SW1_ID, AND1_ID] = devices.names.lookup(["Sw1", "And1"])
+    path = str(tmp_path / "run.trace")
+    runner = PeriodicRunner(network, monitors)
+
+    writer = TraceFileWriter(devices, monitors, path)
+    writer.capacity = 4  # grow the columns several times
+    writer.chunk = 3
+    writer.move_size = 2
+    assert writer.start()
+    assert writer.run(runner, 10) == (True, 10)
+
+    # The file can be read while it is still being written
+    trace_file = TraceFile(path)
+    assert trace_file.open()
+    assert trace_file.cycles == 10
+    trace_file.close()
+
+    devices.set_switch(SW1_ID, devices.LOW)
+    monitors.remove_monitor(AND1_ID, None)
+    assert writer.run(runner, 15) == (True, 15)
+    writer.close()
+    assert writer.capacity == 32
+
+    assert trace_file.open()
+    assert trace_file.names == ["Sw1", "Clock1", "And1"]
+    assert trace_file.cycles == 25
+    columns = trace_file.get_traces()
+    traces = monitors.monitors_dictionary
+    assert columns["Sw1"].tolist() == traces[(SW1_ID, None)].tolist()
+    assert columns["Clock1"].tolist() == traces[
+        devices.names.lookup(["Clock1"])[0], None].tolist()
+    # The removed monitor is BLANK once it is no longer recorded
+    assert columns["And1"][10:].tolist() == [devices.BLANK] * 15
+    assert columns["And1"][12] == devices.BLANK
+    assert len(columns["And1"]) == 25
+
+    if trace_file.get_array(0) is not None:
+        assert trace_file.get_array(0).tolist() == columns["Sw1"].tolist()
+    del columns
+    trace_file.close()
+
+
+def test_load_monitors(capsys, tmp_path, new_monitors):
+    """Test if a trace file is displayed as the monitors' traces."""
+    monitors = new_monitors
+    devices = monitors.devices
+    network = monitors.network
+    path = str(tmp_path / "display.trace")
+    writer = TraceFileWriter(devices, monitors, path)
+    assert writer.start()
+    assert writer.run(PeriodicRunner(network, monitors), 12) == (True, 12)
+    writer.close()
+    monitors.display_signals()
+    expected, _ = capsys.readouterr()
+
+    monitors.reset_monitors()
+    trace_file = TraceFile(path)
+    assert trace_file.open()
+    assert trace_file.load_monitors(monitors)
+    # The loaded columns keep the map open once the file is closed
+    trace_file.close()
+    monitors.display_signals()
+    out, _ = capsys.readouterr()
+    assert out == expected
+
+    # A new run records ordinary traces again
+    monitors.reset_monitors()
+    assert PeriodicRunner(network, monitors).run(2)
+    assert [len(trace) for trace in
+            monitors.monitors_dictionary.values()] == [2, 2, 2]
+
+
+def test_open_fails_for_bad_files(tmp_path, new_monitors):
+    """Test if open and load_monitors return False for unusable files."""
+    assert not TraceFile(str(tmp_path / "missing.trace")).open()
+    empty_path = tmp_path / "empty.trace"
+    empty_path.write_bytes(b"")
+    assert not TraceFile(str(empty_path)).open()
+    other_path = tmp_path / "other.trace"
+    other_path.write_bytes(b"$date today $end\n" * 10)
+    assert not TraceFile(str(other_path)).open()
+
+    # A trace file of another circuit does not load
+    other_names = Names()
+    other_devices = Devices(other_names)
+    other_monitors = Monitors(other_names, other_devices,
+                              Network(other_names, other_devices))
+    path = str(tmp_path / "run.trace")
+    writer = TraceFileWriter(new_monitors.devices, new_monitors, path)
+    assert writer.start()
+    writer.close()
+    trace_file = TraceFile(path)
+    assert trace_file.open()
+    assert not trace_file.load_monitors(other_monitors)
+    assert other_monitors.monitors_dictionary == {}
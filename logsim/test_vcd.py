@@ -0,0 +1,132 @@
+"""Test the vcd module."""
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+from monitors import Monitors
+from periodic import PeriodicRunner
+from vcd import VcdWriter, get_identifier
+
+
+@pytest.fixture
+def new_monitors():
+    """Return a Monitors instance monitoring a clock, a switch and a gate."""
+    new_names = Names()
+    new_devices = Devices(new_names, seed=0)
+    new_network = Network(new_names, new_devices)
+    new_monitors = Monitors(new_names, new_devices, new_network)
+
+    [SW1_ID, CL1_ID, AND1_ID, I1, I2] = new_names.lookup(
+        ["Sw1", "Clock1", "And1", "I1", "I2"])
+    new_devices.make_device(SW1_ID, new_devices.SWITCH, 1)
+    new_devices.make_device(CL1_ID, new_devices.CLOCK, 3)
+    new_devices.make_device(AND1_ID, new_devices.AND, 2)
+    new_network.make_connection(SW1_ID, None, AND1_ID, I1)
+    new_network.make_connection(CL1_ID, None, AND1_ID, I2)
+
+    for device_id in [SW1_ID, CL1_ID, AND1_ID]:
+        new_monitors.make_monitor(device_id, None)
+    return new_monitors
+
+
+def read_vcd(path):
+    """Return the {name: [value of every cycle]} recorded in a VCD file."""
+    with open(path) as vcd_file:
+        lines = vcd_file.read().split("\n")
+    names = {}  # stores {identifier: name}
+    values = {}  # stores {identifier: [value]}
+    current = {}
+    time = None
+    for line in lines:
+        if line.startswith("$var"):
+            [_, _, _, code, name, _] = line.split()
+            names[code] = name
+            values[code] = []
+        elif line.startswith("#"):
+            if time is not None:
+                for code in values:
+                    values[code].extend([current.get(code)] *
+                                        (int(line[1:]) - time))
+            time = int(line[1:])
+        elif line and not line.startswith("$"):
+            current[line[1:]] = line[0]
+    return {names[code]: value_list for code, value_list in values.items()}
+
+
+def test_get_identifier():
+    """Test if every variable gets a different printable identifier."""
+    codes = [get_identifier(number) for number in range(20000)]
+    assert codes[:3] == ["!", "\"", "#"]
+    assert codes[93:96] == ["~", "!!", "!\""]
+    assert len(set(codes)) == 20000
+    assert all(33 <= ord(character) <= 126
+               for code in codes for character in code)
+
+
+def test_vcd_matches_traces(tmp_path, new_monitors):
+    """Test if the VCD file holds the monitored signals of every cycle."""
+    monitors = new_monitors
+    devices = monitors.devices
+    network = monitors.network
+    [SW1_ID] = devices.names.lookup(["Sw1"])
+    path = str(tmp_path / "run.vcd")
+    runner = PeriodicRunner(network, monitors)
+
+    writer = VcdWriter(devices, monitors, path)
+    writer.chunk = 4
+    assert writer.start()
+    assert writer.run(runner, 10) == (True, 10)
+    devices.set_switch(SW1_ID, devices.LOW)
+    assert writer.run(runner, 7) == (True, 7)
+    writer.close()
+
+    characters = {devices.LOW: "0", devices.HIGH: "1",
+                  devices.RISING: "1", devices.FALLING: "0"}
+    assert read_vcd(path) == {
+        devices.get_signal_name(device_id, output_id):
+        [characters[signal] for signal in trace]
+        for (device_id, output_id), trace in
+        monitors.monitors_dictionary.items()}
+
+    # Only changes are written: the switch changes once after cycle 0
+    with open(path) as vcd_file:
+        text = vcd_file.read()
+    switch_code = get_identifier(0)
+    assert text.count("\n1" + switch_code + "\n") == 1
+    assert text.count("\n0" + switch_code + "\n") == 1
+
+
+def test_vcd_with_ring_monitors(tmp_path, new_monitors):
+    """Test if a run longer than the monitors' capacity is fully written."""
+    monitors = new_monitors
+    devices = monitors.devices
+    network = monitors.network
+    for output, trace in list(monitors.monitors_dictionary.items()):
+        monitors.remove_monitor(*output)
+        monitors.make_monitor(output[0], output[1], capacity=5)
+    path = str(tmp_path / "ring.vcd")
+
+    writer = VcdWriter(devices, monitors, path)
+    assert writer.start()
+    assert writer.run(PeriodicRunner(network, monitors), 50) == (True, 50)
+    writer.close()
+
+    recorded = read_vcd(path)
+    [CL1_ID] = devices.names.lookup(["Clock1"])
+    clock = recorded[devices.get_signal_name(CL1_ID, None)]
+    assert len(clock) == 50
+    # The clock has a half period of 3, whatever its phase
+    assert "".join(clock)[6:12] in ["000111", "001110", "011100",
+                                    "111000", "110001", "100011"]
+    assert set(recorded[devices.get_signal_name(
+        devices.names.query("Sw1"), None)]) == {"1"}
+
+
+def test_start_fails_for_bad_path(tmp_path, new_monitors):
+    """Test if start returns False if the file cannot be created."""
+    writer = VcdWriter(new_monitors.devices, new_monitors,
+                       str(tmp_path / "missing" / "run.vcd"))
+    assert not writer.start()
+    writer.write_cycles()  # nothing to write to
+    writer.close()
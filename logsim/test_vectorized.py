@@ -0,0 +1,172 @@
+"""Test the vectorized module."""
+import random
+
+import pytest
+
+from names import Names
+from devices import Devices
+from network import Network
+
+pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def new_network():
+    """Return a new Network instance using the VECTORIZED engine."""
+    new_names = Names()
+    new_devices = Devices(new_names)
+    network = Network(new_names, new_devices)
+    assert network.set_engine(network.VECTORIZED)
+    return network
+
+
+def make_random_gates(network, generator, outputs, count, first):
+    """Add count gates of random kinds, driven by random outputs.
+
+    The gates are named from G<first>, and are appended to outputs, a list
+    of (device ID, port ID).
+    """
+    devices = network.devices
+    names = devices.names
+    for i in range(first, first + count):
+        gate_id = names.intern("".join(["G", str(i)]))
+        kind = generator.choice(devices.gate_types)
+        if kind in [devices.XOR, devices.NOT]:
+            devices.make_device(gate_id, kind)
+            input_count = 2 if kind == devices.XOR else 1
+        else:
+            input_count = generator.randint(1, 5)
+            devices.make_device(gate_id, kind, input_count)
+        for input_number in range(input_count):
+            input_id = names.intern("".join(["I", str(input_number + 1)]))
+            network.make_connection(*(generator.choice(outputs) +
+                                      (gate_id, input_id)))
+        outputs.append((gate_id, None))
+
+
+def test_wide_random_circuit(get_all_signals):
+    """Test if many gates of mixed kinds are executed correctly together.
+
+    The circuit has clocks, and D-types clocked through gates, and is
+    compared with the sweep engine.
+    """
+    results = []
+    for engine in [lambda network: network.SWEEP,
+                   lambda network: network.VECTORIZED]:
+        names = Names()
+        devices = Devices(names, seed=0)
+        network = Network(names, devices)
+        assert network.set_engine(engine(network))
+        generator = random.Random(4)
+
+        switch_ids = names.lookup(["".join(["Sw", str(i)]) for i in range(8)])
+        for switch_id in switch_ids:
+            devices.make_device(switch_id, devices.SWITCH, 0)
+        clock_ids = names.lookup(["Clk1", "Clk2"])
+        devices.make_device(clock_ids[0], devices.CLOCK, 3)
+        devices.make_device(clock_ids[1], devices.CLOCK, 5)
+        outputs = [(device_id, None) for device_id in switch_ids + clock_ids]
+        make_random_gates(network, generator, outputs, 300, 0)
+
+        dtype_ids = names.lookup(["".join(["D", str(i)]) for i in range(6)])
+        for dtype_id in dtype_ids:
+            devices.make_device(dtype_id, devices.D_TYPE)
+            for input_id in [devices.CLK_ID, devices.DATA_ID,
+                             devices.SET_ID, devices.CLEAR_ID]:
+                network.make_connection(*(generator.choice(outputs) +
+                                          (dtype_id, input_id)))
+        for dtype_id in dtype_ids:
+            outputs.extend([(dtype_id, devices.Q_ID),
+                            (dtype_id, devices.QBAR_ID)])
+        make_random_gates(network, generator, outputs, 30, 300)
+
+        cycles = []
+        for cycle in range(40):
+            devices.set_switch(generator.choice(switch_ids),
+                               generator.choice([0, 1]))
+            cycles.append((network.execute_network(),
+                           get_all_signals(devices, network),
+                           [devices.get_device(dtype_id).dtype_memory
+                            for dtype_id in dtype_ids]))
+        results.append(cycles)
+    assert results[0] == results[1]
+
+
+def test_vectorized_latch(new_network):
+    """Test if a latch settles and holds its state."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+    [SET, RESET, NAND1, NAND2, I1, I2] = names.lookup(
+        ["Set", "Reset", "Nand1", "Nand2", "I1", "I2"])
+
+    devices.make_device(SET, devices.SWITCH, 1)
+    devices.make_device(RESET, devices.SWITCH, 1)
+    devices.make_device(NAND1, devices.NAND, 2)
+    devices.make_device(NAND2, devices.NAND, 2)
+    network.make_connection(SET, None, NAND1, I1)
+    network.make_connection(NAND2, None, NAND1, I2)
+    network.make_connection(RESET, None, NAND2, I1)
+    network.make_connection(NAND1, None, NAND2, I2)
+
+    devices.set_switch(SET, devices.LOW)  # set the latch
+    assert network.execute_network()
+    devices.set_switch(SET, devices.HIGH)  # and hold it
+    assert network.execute_network()
+    assert [network.get_output_signal(NAND1, None),
+            network.get_output_signal(NAND2, None)] == [devices.HIGH,
+                                                        devices.LOW]
+
+
+def test_vectorized_oscillation(new_network):
+    """Test if the vectorized engine returns False for oscillating loops."""
+    network = new_network
+    devices = network.devices
+    names = devices.names
+
+    [NOR1, I1] = names.lookup(["Nor1", "I1"])
+    devices.make_device(NOR1, devices.NOR, 1)
+    network.make_connection(NOR1, None, NOR1, I1)
+
+    assert not network.execute_network()
+    # The signals are reloaded from the devices in the next cycle
+    assert network.vectorized_engine.state_version is None
+
+
+def test_vectorized_unconnected_input(new_network):
+    """Test if the vectorized engine returns False for unconnected inputs."""
+    network = new_network
+    devices = network.devices
+    [AND1] = devices.names.lookup(["And1"])
+    devices.make_device(AND1, devices.AND, 2)
+
+    assert not network.execute_network()
+
+
+def test_vectorized_reloads_signals_after_oscillation(get_all_signals):
+    """Test if a cycle after an oscillation starts from the device outputs."""
+    results = []
+    for engine in [lambda network: network.SWEEP,
+                   lambda network: network.VECTORIZED]:
+        names = Names()
+        devices = Devices(names)
+        network = Network(names, devices)
+        assert network.set_engine(engine(network))
+        [SW1, NOR1, NOT1, I1, I2] = names.lookup(
+            ["Sw1", "Nor1", "Not1", "I1", "I2"])
+        devices.make_device(SW1, devices.SWITCH, 1)
+        devices.make_device(NOR1, devices.NOR, 2)
+        devices.make_device(NOT1, devices.NOT)
+        network.make_connection(SW1, None, NOR1, I1)
+        network.make_connection(NOR1, None, NOR1, I2)
+        network.make_connection(NOR1, None, NOT1, I1)
+
+        cycles = []
+        for switch_state in [1, 0, 1, 1]:
+            devices.set_switch(SW1, switch_state)
+            cycles.append((network.execute_network(),
+                           get_all_signals(devices, network)))
+        results.append(cycles)
+    assert [settled for settled, signals in results[1]] == \
+        [True, False, True, True]
+    assert results[0] == results[1]
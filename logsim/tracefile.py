@@ -0,0 +1,359 @@
+"""Write and read monitor traces in a memory-mapped binary file.
+
+Used in the Logic Simulator project to keep the traces of very long runs on
+disk, and to reopen them instantly for display or offline analysis without
+loading the whole file. NumPy is optional: if it is installed, the columns
+can also be read as NumPy arrays.
+
+The file starts with a header: the magic bytes b"LOGSIMTR", then the
+little-endian fields (version, number of monitors, column capacity, cycles
+recorded, data offset) and, for each monitor, its signal name as a
+length-prefixed UTF-8 string. The data starts at the data offset, a multiple
+of mmap.ALLOCATIONGRANULARITY, with one column of capacity bytes per
+monitor, in the order of the names. Byte c of a column is the signal of that
+monitor in cycle c, for the cycles recorded.
+
+Classes
+-------
+TraceFileWriter - writes the monitored signals to a trace file as they are
+                  recorded.
+TraceColumn - gives list-like access to one column of a trace file.
+TraceFile - reads a trace file through a memory map.
+"""
+import collections
+import mmap
+import struct
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # columns are only read as memoryviews without NumPy
+    np = None
+
+from writer import MonitorWriter
+
+MAGIC = b"LOGSIMTR"
+VERSION = 1
+# (version, monitors, capacity, cycles, data offset) after the magic bytes
+HEADER = struct.Struct("<IIQQQ")
+CAPACITY_OFFSET = len(MAGIC) + 8  # byte offset of the capacity field
+CYCLES_OFFSET = len(MAGIC) + 16  # byte offset of the cycles field
+NAME_LENGTH = struct.Struct("<H")
+
+
+class TraceFileWriter(MonitorWriter):
+    """Write the monitored signals to a trace file as they are recorded.
+
+    Every monitor gets a column of capacity bytes, reserved on disk when the
+    file is started (as a sparse file where the file system allows it). If a
+    run goes beyond the capacity, it is at least doubled and the columns are
+    moved apart, so the cost of growing is spread over the run.
+
+    write_cycles() writes the cycles the monitors have recorded since it was
+    last called, and updates the number of cycles in the header, and run()
+    (from writer.MonitorWriter) runs the network a chunk of cycles at a time,
+    writing each chunk as soon as it is recorded. Cycles a monitor does not
+    hold, because it has been removed or has a capacity (see
+    monitors.RingTrace), are written as BLANK. Monitors made after start()
+    are not in the file until it is started again.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    monitors: instance of the monitors.Monitors() class.
+    path: path of the trace file.
+
+    Public methods
+    --------------
+    start(self): Creates the file and writes its header, and returns True if
+                 successful.
+
+    grow(self, cycles): Moves the columns apart to hold at least the
+                        specified number of cycles.
+
+    write_cycles(self): Writes the signals of the cycles recorded since the
+                        last call.
+
+    run(self, runner, cycles): Runs the network for the specified number of
+                               cycles, writing every chunk as it is recorded,
+                               and returns (settled, cycles_completed).
+
+    close(self): Closes the file.
+    """
+
+    def __init__(self, devices, monitors, path):
+        """Initialise the writer with no open file."""
+        super().__init__(devices, monitors, path)
+
+        self.capacity = 1 << 20  # cycles first reserved in every column
+        self.move_size = 1 << 20  # bytes moved at a time by grow()
+
+        self.outputs = []  # list of (device_id, output_id), one per column
+        self.data_offset = 0
+
+    def start(self):
+        """Create the file and write its header, declaring every monitor.
+
+        The monitors' traces are written from cycle 0 onwards. Return True
+        if successful, or False if the file cannot be created.
+        """
+        self.close()
+        try:
+            self.file = open(self.path, "w+b")
+        except OSError:
+            return False
+        self.outputs = list(self.monitors.monitors_dictionary)
+        self.cycles_written = 0
+
+        names = bytearray()
+        for device_id, output_id in self.outputs:
+            name = self.devices.get_signal_name(device_id,
+                                                output_id).encode("utf-8")
+            names.extend(NAME_LENGTH.pack(len(name)))
+            names.extend(name)
+        header_size = len(MAGIC) + HEADER.size + len(names)
+        granularity = mmap.ALLOCATIONGRANULARITY
+        self.data_offset = -(-header_size // granularity) * granularity
+
+        self.file.write(MAGIC)
+        self.file.write(HEADER.pack(VERSION, len(self.outputs),
+                                    self.capacity, 0, self.data_offset))
+        self.file.write(names)
+        self.file.truncate(self.data_offset +
+                           len(self.outputs) * self.capacity)
+        self.file.flush()
+        return True
+
+    def grow(self, cycles):
+        """Move the columns apart so that each holds at least cycles."""
+        capacity = max(2 * self.capacity, cycles)
+        recorded = self.cycles_written
+        self.file.truncate(self.data_offset + len(self.outputs) * capacity)
+        # The last column moves furthest, so columns are moved last first,
+        # and each column from its end, so nothing is overwritten unread
+        for number in reversed(range(1, len(self.outputs))):
+            old_offset = self.data_offset + number * self.capacity
+            new_offset = self.data_offset + number * capacity
+            end = recorded
+            while end > 0:
+                size = min(self.move_size, end)
+                self.file.seek(old_offset + end - size)
+                data = self.file.read(size)
+                self.file.seek(new_offset + end - size)
+                self.file.write(data)
+                end -= size
+        self.capacity = capacity
+        self.file.seek(CAPACITY_OFFSET)
+        self.file.write(struct.pack("<Q", capacity))
+
+    def write_cycles(self):
+        """Write the signals of the cycles recorded since the last call."""
+        if self.file is None:
+            return
+        traces = self.monitors.monitors_dictionary
+        end = max([len(traces[output]) for output in self.outputs
+                   if output in traces] or [self.cycles_written])
+        if end > self.capacity:
+            self.grow(end)
+
+        for number, output in enumerate(self.outputs):
+            column = array("b", [self.devices.BLANK]) * (
+                end - self.cycles_written)
+            if output in traces:
+                trace = traces[output]
+                first = max(self.cycles_written, trace.first_cycle)
+                column[first - self.cycles_written:] = array(
+                    "b", trace[first:end])
+            self.file.seek(self.data_offset + number * self.capacity +
+                           self.cycles_written)
+            self.file.write(column.tobytes())
+        self.cycles_written = end
+        self.file.seek(CYCLES_OFFSET)
+        self.file.write(struct.pack("<Q", end))
+        self.file.flush()
+
+    def close(self):
+        """Close the file."""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class TraceColumn:
+    """Give list-like access to one column of a trace file.
+
+    A column behaves as a read-only monitors.Trace, so it can be displayed
+    like one, but indexing and slicing read the memory-mapped file directly:
+    a slice is a memoryview of the file, not a copy.
+
+    Parameters
+    ----------
+    signals: memoryview of the column's signals, in "b" format.
+
+    Public methods
+    --------------
+    copy(self): Returns a column viewing the same signals.
+
+    tolist(self): Returns the column as a list of signals.
+    """
+
+    def __init__(self, signals):
+        """Initialise the column."""
+        self.signals = signals
+        self.capacity = None  # every recorded cycle is held
+        self.first_cycle = 0
+
+    def __len__(self):
+        """Return the number of cycles recorded."""
+        return len(self.signals)
+
+    def __iter__(self):
+        """Iterate over the signals."""
+        return iter(self.signals)
+
+    def __getitem__(self, index):
+        """Return the signal of a cycle, or a memoryview for a slice."""
+        return self.signals[index]
+
+    def __repr__(self):
+        """Return the column as the list of its signals."""
+        return repr(self.tolist())
+
+    def copy(self):
+        """Return a column viewing the same signals."""
+        return TraceColumn(self.signals)
+
+    def tolist(self):
+        """Return the column as a list of signals."""
+        return self.signals.tolist()
+
+
+class TraceFile:
+    """Read a trace file through a memory map.
+
+    Opening the file only reads its header, however long the run, and every
+    column is then read on demand from the memory map, so any range of
+    cycles can be accessed without loading the rest.
+
+    Parameters
+    ----------
+    path: path of the trace file.
+
+    Public methods
+    --------------
+    open(self): Maps the file and reads its header, and returns True if
+                successful.
+
+    get_column(self, number): Returns a memoryview of the signals of a
+                              monitor.
+
+    get_array(self, number): Returns a NumPy array of the signals of a
+                             monitor.
+
+    get_traces(self): Returns an ordered dictionary of {name: TraceColumn}.
+
+    load_monitors(self, monitors): Shows the traces of the file as the
+                                   monitors' traces.
+
+    close(self): Unmaps the file.
+    """
+
+    def __init__(self, path):
+        """Initialise the trace file with nothing mapped."""
+        self.path = path
+        self.map = None
+        self.names = []  # signal name of every column
+        self.capacity = 0
+        self.cycles = 0
+        self.data_offset = 0
+
+    def open(self):
+        """Map the file and read its header.
+
+        Return True if successful, or False if the file cannot be read or is
+        not a trace file.
+        """
+        self.close()
+        try:
+            with open(self.path, "rb") as trace_file:
+                self.map = mmap.mmap(trace_file.fileno(), 0,
+                                     access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # ValueError if the file is empty
+            return False
+        data = self.map
+        if len(data) < len(MAGIC) + HEADER.size or \
+                data[:len(MAGIC)] != MAGIC:
+            self.close()
+            return False
+        (version, monitors, self.capacity, self.cycles,
+         self.data_offset) = HEADER.unpack_from(data, len(MAGIC))
+        if version != VERSION:
+            self.close()
+            return False
+
+        self.names = []
+        position = len(MAGIC) + HEADER.size
+        for number in range(monitors):
+            [length] = NAME_LENGTH.unpack_from(data, position)
+            position += NAME_LENGTH.size
+            self.names.append(data[position:position + length].decode(
+                "utf-8"))
+            position += length
+        return True
+
+    def get_column(self, number):
+        """Return a memoryview of the signals of the monitor number."""
+        offset = self.data_offset + number * self.capacity
+        return memoryview(self.map)[offset:offset + self.cycles].cast("b")
+
+    def get_array(self, number):
+        """Return a NumPy int8 array of the signals of the monitor number.
+
+        The array views the memory map, so nothing is copied. Return None if
+        NumPy is not installed.
+        """
+        if np is None:
+            return None
+        return np.frombuffer(self.map, dtype=np.int8, count=self.cycles,
+                             offset=self.data_offset + number * self.capacity)
+
+    def get_traces(self):
+        """Return an ordered dictionary of {name: TraceColumn}."""
+        return collections.OrderedDict(
+            (name, TraceColumn(self.get_column(number)))
+            for number, name in enumerate(self.names))
+
+    def load_monitors(self, monitors):
+        """Show the traces of the file as the monitors' traces.
+
+        Every name in the file must be a signal of the monitors' devices.
+        The monitors are replaced by those of the file, viewing its columns,
+        so they can be displayed (a new run resets them to ordinary traces).
+        Return True if successful, or False if a name is not a signal.
+        """
+        devices = monitors.devices
+        traces = collections.OrderedDict()
+        for name, column in self.get_traces().items():
+            name_ids = [devices.names.query(name_string)
+                        for name_string in name.split(".")]
+            device = devices.get_device(name_ids[0])
+            output_id = name_ids[1] if len(name_ids) == 2 else None
+            if device is None or output_id not in device.outputs:
+                return False
+            device_id = name_ids[0]
+            traces[(device_id, output_id)] = column
+        monitors.monitors_dictionary = traces
+        return True
+
+    def close(self):
+        """Unmap the file.
+
+        If columns or arrays still view it, it is unmapped once they are
+        gone.
+        """
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                pass
+            self.map = None
@@ -7,6 +7,9 @@ Classes:
 --------
 UserInterface - reads and parses user commands.
 """
+from periodic import PeriodicRunner
+from vcd import VcdWriter
+from tracefile import TraceFileWriter, TraceFile
 
 
 class UserInterface:
@@ -60,9 +63,17 @@ class UserInterface:
     run_network(self, cycles): Runs the network for the specified number of
                                simulation cycles.
 
+    print_oscillation(self): Prints the devices, loops and period of an
+                             oscillating network.
+
     run_command(self): Runs the simulation from scratch.
 
     continue_command(self): Continues a previously run simulation.
+
+    write_command(self): Starts or stops writing the monitored signals to a
+                         file.
+
+    open_command(self): Displays the traces of a trace file.
     """
 
     def __init__(self, names, devices, network, monitors):
@@ -71,6 +82,10 @@ class UserInterface:
         self.devices = devices
         self.monitors = monitors
         self.network = network
+        # Runs the network, skipping ahead once its state repeats
+        self.runner = PeriodicRunner(network, monitors)
+        # Writes the monitored signals to a file, if one has been given
+        self.trace_writer = None
 
         self.cycles_completed = 0  # number of simulation cycles completed
 
@@ -97,10 +112,16 @@ class UserInterface:
                 self.run_command()
             elif command == "c":
                 self.continue_command()
+            elif command == "w":
+                self.write_command()
+            elif command == "o":
+                self.open_command()
             else:
                 print("Invalid command. Enter 'h' for help.")
             self.get_line()  # get the user entry
             command = self.read_command()  # read the first character
+        if self.trace_writer is not None:
+            self.trace_writer.close()
 
     def get_line(self):
         """Print prompt for the user and update the user entry."""
@@ -206,6 +227,10 @@ class UserInterface:
         print("s X N     - set switch X to N (0 or 1)")
         print("m X       - set a monitor on signal X")
         print("z X       - zap the monitor on signal X")
+        print("w F       - write the monitored signals to file F (a binary")
+        print("            trace file if F ends in .trace, or else VCD)")
+        print("w         - stop writing the file")
+        print("o F       - display the traces of trace file F")
         print("h         - help (this command)")
         print("q         - quit the program")
 
@@ -247,15 +272,36 @@ class UserInterface:
 
         Return True if successful.
         """
-        for _ in range(cycles):
-            if self.network.execute_network():
-                self.monitors.record_signals()
-            else:
-                print("Error! Network oscillating.")
-                return False
+        if self.trace_writer is None:
+            settled = self.runner.run(cycles)
+            cycles_completed = self.runner.cycles_completed
+        else:  # write the file as the cycles are recorded
+            (settled, cycles_completed) = self.trace_writer.run(self.runner,
+                                                                cycles)
+        # Count every cycle the monitors recorded, even if the run stopped
+        self.cycles_completed += cycles_completed
+        if not settled:
+            print("Error! Network oscillating.")
+            self.print_oscillation()
+            return False
         self.monitors.display_signals()
         return True
 
+    def print_oscillation(self):
+        """Print the devices, loops and period of an oscillating network."""
+        oscillation = self.network.oscillation
+        if oscillation is None:
+            return
+        print(" ".join(["Oscillating devices:"] + [
+            self.names.get_name_string(device_id)
+            for device_id in oscillation.devices]))
+        for loop in oscillation.loops:
+            print(" ".join(["Feedback loop:"] + [
+                self.names.get_name_string(device_id) for device_id in loop]))
+        if oscillation.period is not None:
+            print("".join(["Period: ", str(oscillation.period),
+                           " settle iterations"]))
+
     def run_command(self):
         """Run the simulation from scratch."""
         self.cycles_completed = 0
@@ -263,10 +309,11 @@ class UserInterface:
 
         if cycles is not None:  # if the number of cycles provided is valid
             self.monitors.reset_monitors()
+            if self.trace_writer is not None:  # start the file again
+                self.trace_writer.start()
             print("".join(["Running for ", str(cycles), " cycles"]))
             self.devices.cold_startup()
-            if self.run_network(cycles):
-                self.cycles_completed += cycles
+            self.run_network(cycles)
 
     def continue_command(self):
         """Continue a previously run simulation."""
@@ -275,6 +322,49 @@ class UserInterface:
             if self.cycles_completed == 0:
                 print("Error! Nothing to continue. Run first.")
             elif self.run_network(cycles):
-                self.cycles_completed += cycles
                 print(" ".join(["Continuing for", str(cycles), "cycles.",
                                 "Total:", str(self.cycles_completed)]))
+
+    def write_command(self):
+        """Start or stop writing the monitored signals to a file.
+
+        The rest of the line is the path of the file, which records the
+        monitors made so far: a binary trace file (see tracefile) if the path
+        ends in .trace, or a VCD file if not. With no path, the current file
+        is closed.
+        """
+        path = self.line[self.cursor:].strip()
+        if self.trace_writer is not None:
+            self.trace_writer.close()
+            self.trace_writer = None
+        if not path:
+            print("Stopped writing file.")
+            return
+        if path.endswith(".trace"):
+            trace_writer = TraceFileWriter(self.devices, self.monitors, path)
+        else:
+            trace_writer = VcdWriter(self.devices, self.monitors, path)
+        if trace_writer.start():
+            trace_writer.write_cycles()  # the cycles recorded so far
+            self.trace_writer = trace_writer
+            print("Writing file.")
+        else:
+            print("Error! Could not create file.")
+
+    def open_command(self):
+        """Display the traces of the trace file named by the rest of the line.
+
+        The traces replace the monitors until the next run.
+        """
+        trace_file = TraceFile(self.line[self.cursor:].strip())
+        try:
+            if not trace_file.open():
+                print("Error! Could not read trace file.")
+            elif not trace_file.load_monitors(self.monitors):
+                print("Error! Trace file does not match the circuit.")
+            else:
+                self.cycles_completed = 0  # the traces cannot be continued
+                self.monitors.display_signals()
+        finally:
+            # The monitors' columns keep the map open as long as they need it
+            trace_file.close()
@@ -0,0 +1,164 @@
+"""Write the monitored signals to a Value Change Dump file.
+
+Used in the Logic Simulator project to stream the monitor traces of long runs
+to disk, so they can be viewed in standard waveform tools.
+
+Classes
+-------
+VcdWriter - writes the monitored signals to a VCD file as they are recorded.
+
+Functions
+---------
+get_identifier - returns the VCD identifier code of a variable number.
+"""
+import heapq
+import itertools
+import time
+
+from writer import MonitorWriter
+
+
+def get_identifier(number):
+    """Return the VCD identifier code of the variable with this number.
+
+    Identifier codes are made of the printable ASCII characters from "!" to
+    "~", the shortest codes first.
+    """
+    code = chr(33 + number % 94)
+    number //= 94
+    while number:
+        number -= 1
+        code = chr(33 + number % 94) + code
+        number //= 94
+    return code
+
+
+class VcdWriter(MonitorWriter):
+    """Write the monitored signals to a VCD file as they are recorded.
+
+    The file declares one single-bit wire for every monitor, named by
+    Devices.get_signal_name(), and one VCD time unit per simulation cycle.
+    Only value changes are written: HIGH and RISING are written as 1, LOW and
+    FALLING as 0, and BLANK (cycles before a monitor was made) as x. Output
+    is collected in a file buffer of buffer_size bytes.
+
+    write_cycles() writes the cycles the monitors have recorded since it was
+    last called, so the file can be kept up to date while the simulation
+    runs, and run() (from writer.MonitorWriter) runs the network a chunk of
+    cycles at a time, writing each chunk as soon as it is recorded. Together
+    with monitors that have a capacity (see monitors.RingTrace), a run of any
+    length can be written without holding the whole trace in memory.
+
+    Monitors made after start() are not in the file until it is started
+    again, and removed monitors keep their last value.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    monitors: instance of the monitors.Monitors() class.
+    path: path of the VCD file.
+
+    Public methods
+    --------------
+    start(self): Creates the file and writes its header, and returns True if
+                 successful.
+
+    write_cycles(self): Writes the value changes of the cycles recorded since
+                        the last call.
+
+    run(self, runner, cycles): Runs the network for the specified number of
+                               cycles, writing every chunk as it is recorded,
+                               and returns (settled, cycles_completed).
+
+    close(self): Writes the end time and closes the file.
+    """
+
+    def __init__(self, devices, monitors, path):
+        """Initialise the writer with no open file."""
+        super().__init__(devices, monitors, path)
+
+        self.buffer_size = 1 << 16  # bytes buffered before writing to disk
+        self.timescale = "1 ns"  # duration of one cycle
+
+        self.identifiers = {}  # stores {(device_id, output_id): code}
+        self.values = {}  # stores {(device_id, output_id): last value written}
+
+        self.characters = {devices.LOW: "0", devices.HIGH: "1",
+                           devices.RISING: "1", devices.FALLING: "0",
+                           devices.BLANK: "x"}
+
+    def start(self):
+        """Create the file and write its header, declaring every monitor.
+
+        The monitors' traces are written from cycle 0 onwards. Return True
+        if successful, or False if the file cannot be created.
+        """
+        self.close()
+        try:
+            self.file = open(self.path, "w", buffering=self.buffer_size)
+        except OSError:
+            return False
+        self.identifiers = {}
+        self.values = {}
+        self.cycles_written = 0
+
+        lines = ["$date " + time.asctime() + " $end",
+                 "$version Logic Simulator $end",
+                 "$timescale " + self.timescale + " $end",
+                 "$scope module logsim $end"]
+        for number, (device_id, output_id) in enumerate(
+                self.monitors.monitors_dictionary):
+            code = get_identifier(number)
+            self.identifiers[(device_id, output_id)] = code
+            lines.append(" ".join(["$var wire 1", code,
+                                   self.devices.get_signal_name(device_id,
+                                                                output_id),
+                                   "$end"]))
+        lines.extend(["$upscope $end", "$enddefinitions $end", ""])
+        self.file.write("\n".join(lines))
+        return True
+
+    def write_cycles(self):
+        """Write the value changes of the cycles recorded since the last call.
+
+        Cycles a monitor with a capacity no longer holds are skipped for that
+        monitor.
+        """
+        if self.file is None:
+            return
+        traces = self.monitors.monitors_dictionary
+        end = max([len(traces[output]) for output in self.identifiers
+                   if output in traces] or [self.cycles_written])
+
+        changes = []  # list of sorted [(cycle, line)] lists, one per monitor
+        for output, code in self.identifiers.items():
+            if output not in traces:
+                continue
+            trace = traces[output]
+            first = max(self.cycles_written, trace.first_cycle)
+            value = self.values.get(output)
+            monitor_changes = []
+            for cycle, signal in enumerate(trace[first:end], first):
+                character = self.characters[signal]
+                if character != value:
+                    value = character
+                    monitor_changes.append((cycle, character + code))
+            self.values[output] = value
+            changes.append(monitor_changes)
+
+        lines = []
+        for cycle, cycle_changes in itertools.groupby(
+                heapq.merge(*changes), lambda change: change[0]):
+            lines.append("#" + str(cycle))
+            lines.extend([line for cycle, line in cycle_changes])
+        lines.append("")
+        self.file.write("\n".join(lines))
+        self.cycles_written = end
+
+    def close(self):
+        """Write the end time of the last cycle and close the file."""
+        if self.file is None:
+            return
+        self.file.write("#" + str(self.cycles_written) + "\n")
+        self.file.close()
+        self.file = None
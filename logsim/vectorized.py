@@ -0,0 +1,237 @@
+"""Execute the logic gates of the network with NumPy.
+
+Used in the Logic Simulator project to simulate very large gate networks
+quickly. NumPy is optional: if it is not installed, this engine is simply not
+available.
+
+Classes
+-------
+VectorizedEngine - executes the network in levelized order with NumPy.
+"""
+try:
+    import numpy as np
+except ImportError:  # the engine is unavailable without NumPy
+    np = None
+
+from levels import LevelizedEngine
+
+
+class VectorizedEngine(LevelizedEngine):
+    """Execute the network in levelized order with NumPy.
+
+    This gives the same results as levels.LevelizedEngine. Every output signal
+    is held in one int8 array, and the fan-in of each gate is an array of
+    indexes into it. All the gates of one kind in one level are then executed
+    together as a single array reduction, including the RISING and FALLING
+    transition encoding. Switches, clocks, D-types and loops are executed one
+    by one, and a cycle in which a loop or a D-type needs executing is
+    settled by the event engine, as in LevelizedEngine.
+
+    Changed signals are copied back into the Device objects, so the rest of
+    the simulator (monitors, user interfaces) sees the usual device outputs.
+
+    Parameters
+    ----------
+    network: instance of the network.Network() class.
+
+    Public methods
+    --------------
+    is_available(self): Returns True if NumPy is installed.
+
+    build(self): Builds the levelized schedule and the signal arrays.
+
+    load_signals(self): Copies every device output into the signal array.
+
+    execute_network(self): Executes every device in the network once, in
+                           levelized order, for one simulation cycle.
+    """
+
+    def __init__(self, network):
+        """Initialise the engine with no schedule."""
+        super().__init__(network)
+        self.slots = {}  # stores {(device_id, output_id): slot}
+        self.slot_outputs = []  # slot_outputs[slot] is (device, output_id)
+        self.signals = None
+        # steps[level] is ([block, ...], [(kind, output slots, fan-in), ...])
+        self.steps = []
+        self.unconnected = False
+        self.state_version = None
+
+    def is_available(self):
+        """Return True if NumPy is installed."""
+        return np is not None
+
+    def build(self):
+        """Build the levelized schedule and the signal arrays."""
+        super().build()
+        devices = self.devices
+
+        self.slots = {}
+        self.slot_outputs = []
+        for device in self.device_list:
+            for output_id in device.outputs:
+                self.slots[(device.device_id, output_id)] = \
+                    len(self.slot_outputs)
+                self.slot_outputs.append((device, output_id))
+        # Two extra slots are always LOW and HIGH, for padding the fan-in
+        self.low_slot = len(self.slot_outputs)
+        self.high_slot = self.low_slot + 1
+
+        # Lookup tables for settling signals and encoding transitions
+        self.settle_table = np.arange(5, dtype=np.int8)
+        self.settle_table[devices.RISING] = devices.HIGH
+        self.settle_table[devices.FALLING] = devices.LOW
+        self.transition_table = np.empty((5, 5), dtype=np.int8)
+        for start in range(5):
+            for target in range(5):
+                self.transition_table[start, target] = \
+                    self.transition(start, target)
+
+        self.unconnected = False
+        self.steps = []
+        groups = {}  # stores {(level, kind): [rank, ...]}
+        for level, block, is_loop in self.schedule:
+            while len(self.steps) <= level:
+                self.steps.append(([], []))
+            kind = self.device_list[block[0]].device_kind
+            if is_loop or kind not in devices.gate_types:
+                self.steps[level][0].append(block)
+            else:
+                groups.setdefault((level, kind), []).extend(block)
+
+        for (level, kind), ranks in sorted(groups.items()):
+            # Pad the fan-in with signals that do not affect the result
+            if kind in [devices.AND, devices.NAND]:
+                padding = self.high_slot
+            else:
+                padding = self.low_slot
+            width = max(len(self.sources[rank]) for rank in ranks)
+            fanin = np.full((len(ranks), width), padding, dtype=np.intp)
+            output_slots = np.empty(len(ranks), dtype=np.intp)
+            for row, rank in enumerate(ranks):
+                output_slots[row] = self.slots[(self.order[rank], None)]
+                for column, (input_id, source, port_id) in enumerate(
+                        self.sources[rank]):
+                    if source is None:
+                        self.unconnected = True
+                        continue
+                    fanin[row, column] = self.slots[(source.device_id,
+                                                     port_id)]
+            self.steps[level][1].append((kind, output_slots, fanin))
+
+        # Gate outputs only need copying into the Device objects straight
+        # away if a device executed in Python reads them later in the pass
+        self.last_python_level = max(
+            [level for level, (python_blocks, gate_groups) in
+             enumerate(self.steps) if python_blocks], default=-1)
+
+        self.signals = np.zeros(self.high_slot + 1, dtype=np.int8)
+        self.load_signals()
+
+    def load_signals(self):
+        """Copy every device output into the signal array."""
+        for slot, (device, output_id) in enumerate(self.slot_outputs):
+            self.signals[slot] = device.outputs[output_id]
+        self.signals[self.low_slot] = self.devices.LOW
+        self.signals[self.high_slot] = self.devices.HIGH
+        self.state_version = self.devices.state_version
+
+    def execute_gates(self, kind, output_slots, fanin):
+        """Execute a group of gates of one kind together.
+
+        Return the array of output slots that changed.
+        """
+        devices = self.devices
+        signals = self.signals
+        values = self.settle_table[signals[fanin]]
+        if kind == devices.XOR:
+            targets = values[:, 0] != values[:, 1]
+        elif kind in [devices.AND, devices.NAND]:
+            targets = (values == devices.HIGH).all(axis=1)
+        else:  # OR, NOR and NOT
+            targets = (values == devices.HIGH).any(axis=1)
+        if kind in [devices.NAND, devices.NOR, devices.NOT]:
+            targets = ~targets
+        targets = targets.astype(np.int8)  # LOW is 0 and HIGH is 1
+
+        starts = signals[output_slots]
+        new_signals = self.transition_table[starts, targets]
+        signals[output_slots] = new_signals
+        return output_slots[new_signals != starts]
+
+    def execute_network(self):
+        """Execute every device once, in levelized order, for one cycle.
+
+        Return True if successful and the network settles.
+        """
+        network = self.network
+        if self.is_stale():
+            self.build()
+        elif self.state_version != self.devices.state_version:
+            self.load_signals()
+        if self.unconnected:
+            network.steady_state = False
+            return False
+
+        signals = self.signals
+        slots = self.slots
+        slot_outputs = self.slot_outputs
+
+        # This sets clock signals to RISING or FALLING, where necessary
+        network.update_clocks()
+        if self.is_sequential_dirty():
+            if not self.execute_events():
+                self.state_version = None  # reload the signals next cycle
+                return False
+            self.load_signals()
+            return True
+
+        changed = []  # (device, output_id) changed by Python execution
+        for device_id in network.clock_scheduler.toggled:
+            signals[slots[(device_id, None)]] = \
+                self.devices.get_device(device_id).outputs[None]
+            changed.append((self.devices.get_device(device_id), None))
+
+        changed_slots = []  # arrays of slots changed by NumPy execution
+        for level, (python_blocks, gate_groups) in enumerate(self.steps):
+            for block in python_blocks:
+                first_change = len(changed)
+                if not self.execute_block(block, changed):
+                    self.state_version = None  # reload the signals next cycle
+                    self.settled_version = None
+                    network.steady_state = False
+                    return False
+                for device, output_id in changed[first_change:]:
+                    signals[slots[(device.device_id, output_id)]] = \
+                        device.outputs[output_id]
+            for kind, output_slots, fanin in gate_groups:
+                group_changed = self.execute_gates(kind, output_slots, fanin)
+                if not len(group_changed):
+                    continue
+                changed_slots.append(group_changed)
+                if level < self.last_python_level:
+                    # Devices executed in Python read the Device objects
+                    for slot in group_changed.tolist():
+                        device, output_id = slot_outputs[slot]
+                        device.outputs[output_id] = int(signals[slot])
+
+        # Every output has now reached its target, so settle the edges
+        for device, output_id in changed:
+            device.outputs[output_id] = self.settle(device.outputs[output_id])
+        changed_outputs = []  # (device, output_id) changed by NumPy
+        if changed_slots:
+            all_changed = np.concatenate(changed_slots)
+            signals[all_changed] = self.settle_table[signals[all_changed]]
+            for slot in all_changed.tolist():
+                device, output_id = slot_outputs[slot]
+                device.outputs[output_id] = int(signals[slot])
+                changed_outputs.append((device, output_id))
+        for device, output_id in changed:
+            signals[slots[(device.device_id, output_id)]] = \
+                device.outputs[output_id]
+
+        self.settled_version = self.devices.state_version
+        self.switch_version = self.devices.switch_version
+        network.changed_outputs = changed + changed_outputs
+        network.steady_state = True
+        return True
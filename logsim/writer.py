@@ -0,0 +1,71 @@
+"""Stream the monitored signals to a file while the network runs.
+
+Used in the Logic Simulator project by the VCD and trace file writers, which
+share the loop that runs the network a chunk of cycles at a time.
+
+Classes
+-------
+MonitorWriter - base class of the writers that stream monitor traces to disk.
+"""
+
+
+class MonitorWriter:
+    """Base class of the writers that stream monitor traces to a file.
+
+    A writer keeps the number of cycles it has written in cycles_written, and
+    its write_cycles() writes the cycles the monitors have recorded since.
+    run() runs the network a chunk of cycles at a time and writes each chunk
+    as soon as it is recorded, so a run of any length can be written without
+    holding the whole trace in memory.
+
+    Parameters
+    ----------
+    devices: instance of the devices.Devices() class.
+    monitors: instance of the monitors.Monitors() class.
+    path: path of the file.
+
+    Public methods
+    --------------
+    write_cycles(self): Writes the signals of the cycles recorded since the
+                        last call.
+
+    run(self, runner, cycles): Runs the network for the specified number of
+                               cycles, writing every chunk as it is recorded,
+                               and returns (settled, cycles_completed).
+    """
+
+    def __init__(self, devices, monitors, path):
+        """Initialise the writer with no open file."""
+        self.devices = devices
+        self.monitors = monitors
+        self.path = path
+
+        self.chunk = 1000  # most cycles run() runs before writing them
+
+        self.file = None
+        self.cycles_written = 0
+
+    def write_cycles(self):
+        """Write the signals of the cycles recorded since the last call."""
+        raise NotImplementedError
+
+    def run(self, runner, cycles):
+        """Run the network for a number of cycles, writing every chunk.
+
+        runner is a periodic.PeriodicRunner (or anything with its run()
+        method and cycles_completed attribute). The cycles are run chunk at
+        a time, or fewer if a monitor has a smaller capacity, and written
+        after each one. Return (settled, cycles_completed), where settled is
+        False if the network oscillates.
+        """
+        chunk = min([self.chunk] + [
+            trace.capacity for trace in
+            self.monitors.monitors_dictionary.values()
+            if trace.capacity is not None])
+        cycles_completed = 0
+        settled = True
+        while settled and cycles_completed < cycles:
+            settled = runner.run(min(chunk, cycles - cycles_completed))
+            cycles_completed += runner.cycles_completed
+            self.write_cycles()
+        return (settled, cycles_completed)